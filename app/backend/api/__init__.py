@@ -1,15 +1,32 @@
-from .auth import auth_bp
-from .profile import profile_bp
-from .posts import posts_bp
-from .feed import feed_bp
-from .jobs import jobs_bp
-from .messaging import messaging_bp
+from importlib import import_module
+
+# Blueprints are resolved lazily so importing one route module (or the
+# package itself) does not drag in every other module and its dependencies.
+_BLUEPRINT_MODULES = {
+    'auth_bp': '.auth',
+    'profile_bp': '.profile',
+    'posts_bp': '.posts',
+    'comments_bp': '.comments',
+    'feed_bp': '.feed',
+    'jobs_bp': '.jobs',
+    'search_bp': '.search',
+    'messaging_bp': '.messaging',
+    'notifications_bp': '.notifications',
+}
 
 __all__ = [
     'auth_bp',
     'profile_bp',
     'posts_bp',
+    'comments_bp',
     'feed_bp',
     'jobs_bp',
-    'messaging_bp'
-] 
\ No newline at end of file
+    'search_bp',
+    'messaging_bp',
+    'notifications_bp'
+]
+
+def __getattr__(name):
+    if name in _BLUEPRINT_MODULES:
+        return getattr(import_module(_BLUEPRINT_MODULES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -5,6 +5,8 @@ from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from models.user import User
 from models import db
+from serializers import USER_SCHEMA
+from people_index import refresh_people_entries
 import re
 import traceback
 
@@ -52,6 +54,8 @@ def signup():
         password_hash = generate_password_hash(password)
         user = User(username=username, email=email, password_hash=password_hash)
         db.session.add(user)
+        db.session.flush()
+        refresh_people_entries([user.id])
         db.session.commit()
         return jsonify({'message': 'User created successfully.'}), 201
     except Exception as e:
@@ -77,7 +81,7 @@ def login():
         access_token = create_access_token(identity=str(user.id))
         return jsonify({
             'token': access_token,
-            'user': user.to_dict()
+            'user': USER_SCHEMA.dump(user)
         }), 200
     except Exception as e:
         current_app.logger.error(f"Login error: {e}\n{traceback.format_exc()}")
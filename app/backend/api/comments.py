@@ -0,0 +1,122 @@
+import base64
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db
+from models.archive import find_post
+from models.comment import Comment, MAX_DEPTH, add_comment, delete_comment
+from models.notification import notify
+from loaders import loader
+
+comments_bp = Blueprint('comments', __name__)
+
+MAX_COMMENT_LENGTH = 2000
+MAX_PAGE_SIZE = 100
+
+def _serialize(comments):
+    """Comment dicts with usernames, resolved in one query for the page."""
+    users = loader('user')
+    users.prime(c.user_id for c in comments if c.status != 'deleted')
+    items = []
+    for c in comments:
+        item = c.to_dict()
+        author = users.load(c.user_id) if item['user_id'] else None
+        item['username'] = author.username if author else None
+        items.append(item)
+    return items
+
+def _limit():
+    return min(max(request.args.get('limit', 20, type=int), 1), MAX_PAGE_SIZE)
+
+@comments_bp.route('/<int:post_id>/comments', methods=['GET'])
+def list_comments(post_id):
+    """Top-level comments newest first, paginated by id (before_id).
+
+    Replies are not included: fetch them with /posts/comments/<id>/replies
+    for comments whose reply_count is above zero.
+    """
+    if not find_post(post_id):
+        return jsonify({'error': 'Post not found.'}), 404
+    limit = _limit()
+    query = Comment.query.filter(Comment.post_id == post_id, Comment.depth == 0)
+    before_id = request.args.get('before_id', type=int)
+    if before_id:
+        query = query.filter(Comment.id < before_id)
+    comments = query.order_by(Comment.id.desc()).limit(limit).all()
+    return jsonify({
+        'comments': _serialize(comments),
+        'next_before_id': comments[-1].id if len(comments) == limit else None
+    }), 200
+
+@comments_bp.route('/comments/<int:comment_id>/replies', methods=['GET'])
+def list_replies(comment_id):
+    """All replies below a comment, depth-first, oldest first among siblings.
+
+    One range query on (post_id, path) per page, however deep the thread.
+    Continue with ?cursor=<next_cursor>.
+    """
+    parent = db.session.get(Comment, comment_id)
+    if not parent:
+        return jsonify({'error': 'Comment not found.'}), 404
+    limit = _limit()
+    low, high = parent.subtree_bounds()
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            after = base64.urlsafe_b64decode(cursor.encode()).decode()
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor.'}), 400
+        if not low < after < high:
+            return jsonify({'error': 'Invalid cursor.'}), 400
+        path_filter = Comment.path > after
+    else:
+        path_filter = Comment.path > low
+    replies = Comment.query.filter(
+        Comment.post_id == parent.post_id, path_filter, Comment.path < high
+    ).order_by(Comment.path).limit(limit).all()
+    next_cursor = None
+    if len(replies) == limit:
+        next_cursor = base64.urlsafe_b64encode(replies[-1].path.encode()).decode()
+    return jsonify({'replies': _serialize(replies), 'next_cursor': next_cursor}), 200
+
+@comments_bp.route('/<int:post_id>/comments', methods=['POST'])
+@jwt_required()
+def create_comment(post_id):
+    """Comment on a post, or reply to a comment with parent_id."""
+    user_id = int(get_jwt_identity())
+    # Archived posts take comments where they are
+    post = find_post(post_id)
+    if not post:
+        return jsonify({'error': 'Post not found.'}), 404
+    data = request.get_json() or {}
+    content = (data.get('content') or '').strip()
+    if not content:
+        return jsonify({'error': 'content is required.'}), 400
+    if len(content) > MAX_COMMENT_LENGTH:
+        return jsonify({'error': f'Comment must be {MAX_COMMENT_LENGTH} characters or less.'}), 400
+    parent = None
+    parent_id = data.get('parent_id')
+    if parent_id is not None:
+        parent = db.session.get(Comment, parent_id) if isinstance(parent_id, int) else None
+        if not parent or parent.post_id != post_id:
+            return jsonify({'error': 'Parent comment not found on this post.'}), 404
+        if parent.depth + 1 >= MAX_DEPTH:
+            return jsonify({'error': 'Replies are nested too deeply.'}), 400
+    comment = add_comment(post, user_id, content, parent)
+    notify('post_commented', user_id, [post.user_id], 'post', post.id)
+    if parent:
+        notify('comment_replied', user_id, [parent.user_id], 'comment', parent.id)
+    db.session.commit()
+    return jsonify({'comment': _serialize([comment])[0]}), 201
+
+@comments_bp.route('/comments/<int:comment_id>', methods=['DELETE'])
+@jwt_required()
+def remove_comment(comment_id):
+    user_id = int(get_jwt_identity())
+    comment = db.session.get(Comment, comment_id)
+    if not comment or comment.status == 'deleted':
+        return jsonify({'error': 'Comment not found.'}), 404
+    if comment.user_id != user_id:
+        return jsonify({'error': 'You can only delete your own comments.'}), 403
+    delete_comment(comment)
+    db.session.commit()
+    return jsonify({'message': 'Comment deleted.'}), 200
@@ -1,5 +1,51 @@
-from flask import Blueprint
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db
+from models.job import Job
+from models.profile import Profile
+from models.user import User
+from matching import jobs_for_profile, candidates_for_job
 
 jobs_bp = Blueprint('jobs', __name__)
- 
-# Routes will be implemented here 
\ No newline at end of file
+
+MAX_MATCHES = 100
+
+def _limit():
+    return min(max(request.args.get('limit', 20, type=int), 1), MAX_MATCHES)
+
+@jobs_bp.route('/api/jobs/recommended', methods=['GET'])
+@jwt_required()
+def recommended_jobs():
+    """Jobs best matching the current user's profile, best first."""
+    user_id = int(get_jwt_identity())
+    profile_id = db.session.query(Profile.id).filter_by(user_id=user_id).scalar()
+    if profile_id is None:
+        return jsonify({'jobs': []}), 200
+    matches = jobs_for_profile(profile_id, _limit())
+    jobs = {job.id: job for job in Job.query.filter(Job.id.in_([m[0] for m in matches]))}
+    return jsonify({'jobs': [{
+        'id': job_id,
+        'title': jobs[job_id].title,
+        'company': jobs[job_id].company,
+        'location': jobs[job_id].location,
+        'score': round(score, 4)
+    } for job_id, score in matches if job_id in jobs]}), 200
+
+@jobs_bp.route('/api/jobs/<int:job_id>/candidates', methods=['GET'])
+@jwt_required()
+def job_candidates(job_id):
+    """Profiles best matching a job, best first."""
+    if not db.session.get(Job, job_id):
+        return jsonify({'error': 'Job not found.'}), 404
+    matches = candidates_for_job(job_id, _limit())
+    # Profiles deleted since the index last synced drop out here
+    rows = db.session.query(Profile.id, Profile.user_id, Profile.location, User.username).join(
+        User, User.id == Profile.user_id).filter(Profile.id.in_([m[0] for m in matches]))
+    profiles = {row.id: row for row in rows}
+    return jsonify({'candidates': [{
+        'profile_id': profile_id,
+        'user_id': profiles[profile_id].user_id,
+        'username': profiles[profile_id].username,
+        'location': profiles[profile_id].location,
+        'score': round(score, 4)
+    } for profile_id, score in matches if profile_id in profiles]}), 200
@@ -1,5 +1,113 @@
-from flask import Blueprint
+import click
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import or_, and_
+from models import db
+from models.user import User
+from models.message import (
+    Message, UnreadCounter, record_sent_message, mark_read, reconcile_unread_counters
+)
+from models.notification import notify
 
 messaging_bp = Blueprint('messaging', __name__)
- 
-# Routes will be implemented here 
\ No newline at end of file
+
+MAX_MESSAGE_LENGTH = 5000
+MAX_PAGE_SIZE = 100
+
+@messaging_bp.route('/api/messages', methods=['POST'])
+@jwt_required()
+def send_message():
+    """Send a message and bump the recipient's unread counter in one transaction."""
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    recipient_id = data.get('recipient_id')
+    content = (data.get('content') or '').strip()
+    if not isinstance(recipient_id, int) or not content:
+        return jsonify({'error': 'recipient_id and content are required.'}), 400
+    if len(content) > MAX_MESSAGE_LENGTH:
+        return jsonify({'error': f'Message must be {MAX_MESSAGE_LENGTH} characters or less.'}), 400
+    if recipient_id == user_id:
+        return jsonify({'error': 'Cannot send a message to yourself.'}), 400
+    if not db.session.get(User, recipient_id):
+        return jsonify({'error': 'Recipient not found.'}), 404
+    message = Message(sender_id=user_id, recipient_id=recipient_id, content=content)
+    db.session.add(message)
+    db.session.flush()
+    record_sent_message(message)
+    # Coalesces into "<sender> sent you N messages" until the recipient reads it
+    notify('message', user_id, [recipient_id], 'user', user_id)
+    db.session.commit()
+    return jsonify({'message': message.to_dict()}), 201
+
+@messaging_bp.route('/api/messages', methods=['GET'])
+@jwt_required()
+def list_messages():
+    """List one conversation newest-first, paginated by message id."""
+    user_id = int(get_jwt_identity())
+    peer_id = request.args.get('peer_id', type=int)
+    if peer_id is None:
+        return jsonify({'error': 'peer_id is required.'}), 400
+    before_id = request.args.get('before_id', type=int)
+    limit = min(request.args.get('limit', 50, type=int), MAX_PAGE_SIZE)
+    query = Message.query.filter(or_(
+        and_(Message.sender_id == user_id, Message.recipient_id == peer_id),
+        and_(Message.sender_id == peer_id, Message.recipient_id == user_id)
+    ))
+    if before_id:
+        query = query.filter(Message.id < before_id)
+    messages = query.order_by(Message.id.desc()).limit(limit).all()
+    counter = db.session.get(UnreadCounter, (user_id, peer_id))
+    return jsonify({
+        'messages': [m.to_dict() for m in messages],
+        'next_before_id': messages[-1].id if len(messages) == limit else None,
+        'last_read_message_id': counter.last_read_message_id if counter else 0
+    })
+
+@messaging_bp.route('/api/messages/read', methods=['POST'])
+@jwt_required()
+def mark_messages_read():
+    """Mark conversations read up to a message id.
+
+    Accepts a single {"peer_id", "up_to_id"} pair or a batch under
+    "conversations" so a client can flush several read receipts at once.
+    """
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    items = data.get('conversations')
+    if items is None:
+        items = [data]
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'No conversations provided.'}), 400
+    # Collapse duplicates so each conversation is updated once with its highest id
+    watermarks = {}
+    for item in items:
+        peer_id = item.get('peer_id') if isinstance(item, dict) else None
+        up_to_id = item.get('up_to_id') if isinstance(item, dict) else None
+        if not isinstance(peer_id, int) or not isinstance(up_to_id, int):
+            return jsonify({'error': 'Each conversation needs integer peer_id and up_to_id.'}), 400
+        watermarks[peer_id] = max(watermarks.get(peer_id, 0), up_to_id)
+    counters = [mark_read(user_id, peer_id, up_to_id)
+                for peer_id, up_to_id in sorted(watermarks.items())]
+    db.session.commit()
+    return jsonify({'conversations': [c.to_dict() for c in counters]}), 200
+
+@messaging_bp.route('/api/messages/unread', methods=['GET'])
+@jwt_required()
+def get_unread_counts():
+    """Unread badge data, read straight from the counter rows."""
+    user_id = int(get_jwt_identity())
+    counters = UnreadCounter.query.filter(
+        UnreadCounter.user_id == user_id,
+        UnreadCounter.unread_count > 0
+    ).all()
+    return jsonify({
+        'total': sum(c.unread_count for c in counters),
+        'conversations': [c.to_dict() for c in counters]
+    })
+
+@messaging_bp.cli.command('reconcile-unread')
+@click.option('--batch-size', default=1000, show_default=True)
+def reconcile_unread_command(batch_size):
+    """Repair unread counters that drifted from the messages table."""
+    repaired = reconcile_unread_counters(batch_size=batch_size)
+    click.echo(f'Repaired {repaired} unread counters')
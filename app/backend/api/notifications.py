@@ -0,0 +1,81 @@
+import base64
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import tuple_
+from models import db
+from models.notification import (
+    Notification, mark_notifications_read, unread_notification_count
+)
+from loaders import loader
+
+notifications_bp = Blueprint('notifications', __name__)
+
+MAX_PAGE_SIZE = 100
+
+def _encode_cursor(notification):
+    raw = f'{notification.updated_at.isoformat()}|{notification.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor):
+    updated_at, notification_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(updated_at), int(notification_id)
+
+@notifications_bp.route('/api/notifications', methods=['GET'])
+@jwt_required()
+def list_notifications():
+    """Grouped notifications, most recent activity first.
+
+    Paginated with ?cursor=<next_cursor>; the (user_id, updated_at, id)
+    index serves every page as a range scan.
+    """
+    user_id = int(get_jwt_identity())
+    limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_PAGE_SIZE)
+    query = Notification.query.filter(Notification.user_id == user_id)
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            query = query.filter(tuple_(Notification.updated_at, Notification.id) < _decode_cursor(cursor))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor.'}), 400
+    notifications = query.order_by(Notification.updated_at.desc(), Notification.id.desc()) \
+        .limit(limit + 1).all()
+    has_more = len(notifications) > limit
+    notifications = notifications[:limit]
+
+    # Actor names for the whole page in one query
+    actors = loader('user')
+    actors.prime(n.last_actor_id for n in notifications)
+    items = []
+    for n in notifications:
+        item = n.to_dict()
+        actor = actors.load(n.last_actor_id)
+        item['last_actor_username'] = actor.username if actor else None
+        items.append(item)
+    return jsonify({
+        'notifications': items,
+        'next_cursor': _encode_cursor(notifications[-1]) if has_more else None,
+        'unread_count': unread_notification_count(user_id)
+    }), 200
+
+@notifications_bp.route('/api/notifications/read', methods=['POST'])
+@jwt_required()
+def read_notifications():
+    """Mark notifications read: {"ids": [...]} or {"all": true}."""
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    ids = data.get('ids')
+    if data.get('all') is True:
+        ids = None
+    elif not isinstance(ids, list) or not all(isinstance(i, int) for i in ids) or not ids:
+        return jsonify({'error': 'Provide a list of notification ids or "all": true.'}), 400
+    marked = mark_notifications_read(user_id, ids)
+    db.session.commit()
+    return jsonify({'marked': marked, 'unread_count': unread_notification_count(user_id)}), 200
+
+@notifications_bp.route('/api/notifications/unread', methods=['GET'])
+@jwt_required()
+def unread_notifications():
+    """Badge count, read from the per-user counter."""
+    user_id = int(get_jwt_identity())
+    return jsonify({'unread_count': unread_notification_count(user_id)}), 200
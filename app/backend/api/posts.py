@@ -1,42 +1,74 @@
 from flask import Blueprint, request, jsonify, current_app, send_from_directory
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
-from models import db, Post
+from models import db, Post, insert_or_ignore
 from models.user import User
 from datetime import datetime
+import hashlib
 import os
-from sqlalchemy import or_, desc
+from sqlalchemy import or_, desc, func, literal_column, select
 from collections import Counter
+from itertools import chain
+from instrumentation import timed
+from http_cache import conditional
+from serializers import POST_SCHEMA, STREAM_CHUNK_ROWS, list_response, parse_fields
+from models.outbox import enqueue
+from models.archive import ArchivedPost, archived_count, find_post
+from models.engagement import like_post, unlike_post, record_view
+from models.generation import generation
+from tasks.media import needs_preview
+from idempotency import idempotent
+from people_index import refresh_people_entries
 
 posts_bp = Blueprint('posts', __name__)
 
 UPLOAD_FOLDER = 'uploads/posts'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'mp4', 'mov', 'avi', 'pdf'}
 
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+@posts_bp.record_once
+def _create_upload_folder(state):
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def author_id(identifier):
+    """Id of the user a post's user_id field names, creating the user if unknown.
+
+    The field holds a user id or an email. Unknown users are inserted with
+    INSERT ... ON CONFLICT DO NOTHING in the caller's transaction, so
+    concurrent requests for the same new user neither fail nor duplicate it.
+    Whoever inserts the user also writes its people search entry.
+    """
+    if identifier.isdigit():
+        user = db.session.get(User, int(identifier))
+        if user:
+            return user.id
+        email = f'{identifier}@example.com'
+    else:
+        email = identifier if '@' in identifier else f'{identifier}@example.com'
+    email = email.lower()
+    # Unique username derived from the email; '!' is no valid password hash
+    local = email.split('@')[0][:60]
+    created = insert_or_ignore(User, {
+        'email': email,
+        'username': f"{local}_{hashlib.sha256(email.encode()).hexdigest()[:8]}",
+        'password_hash': '!'})
+    user_id = db.session.query(User.id).filter_by(email=email).scalar()
+    if created:
+        refresh_people_entries([user_id])
+    return user_id
+
 @posts_bp.route('/', methods=['POST'])
+@idempotent
 def create_post():
     user_id = request.form.get('user_id')
     content = request.form.get('content')
     file = request.files.get('media')
-    from models import User
-    user = None
-    if user_id:
-        # Try to find by id or email
-        if user_id.isdigit():
-            user = User.query.get(int(user_id))
-        else:
-            user = User.query.filter_by(email=user_id).first()
-        if not user:
-            # Auto-create user if not found
-            user = User(email=user_id if '@' in user_id else f'{user_id}@example.com')
-            db.session.add(user)
-            db.session.commit()
-    if not user or not content:
+    if not user_id or not content:
+        return jsonify({'error': 'user_id and content are required.'}), 400
+    author = author_id(user_id)
+    if author is None:
         return jsonify({'error': 'user_id and content are required.'}), 400
     media_url = None
     if file:
@@ -48,11 +80,17 @@ def create_post():
             os.makedirs(UPLOAD_FOLDER)
         filename = secure_filename(f"{datetime.utcnow().timestamp()}_{file.filename}")
         filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
+        with timed('io'):
+            file.save(filepath)
         media_url = f"/posts/media/{filename}"
     from models import Post
-    post = Post(user_id=user.id, content=content, media_url=media_url)
+    post = Post(user_id=author, content=content, media_url=media_url)
     db.session.add(post)
+    if file and needs_preview(filename):
+        # Poster frame / first page are made by the worker after commit
+        post.media_status = 'pending'
+        db.session.flush()
+        enqueue('media.derive', {'post_id': post.id, 'path': filepath}, max_attempts=3)
     db.session.commit()
     return jsonify({'message': 'Post created successfully.'}), 201
 
@@ -60,24 +98,38 @@ def create_post():
 def get_media(filename):
     return send_from_directory(UPLOAD_FOLDER, filename)
 
-@posts_bp.route('/', methods=['GET'])
-def list_posts():
-    # Query params
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
-    category = request.args.get('category')
-    visibility = request.args.get('visibility')
-    search = request.args.get('search')
-    tags = request.args.get('tags')  # comma-separated
-    sort_by = request.args.get('sort_by', 'created_at')
-    sort_order = request.args.get('sort_order', 'desc')
+@posts_bp.route('/previews/<path:name>', methods=['GET'])
+def get_preview(name):
+    # Content-addressed: a name never changes what it points to
+    return send_from_directory(os.path.join(UPLOAD_FOLDER, 'previews'), name, max_age=31536000)
+
+# Columns list_posts can sort by; each has a matching index (see Post.__table_args__)
+SORTABLE_COLUMNS = {
+    'created_at': Post.created_at,
+    'likes_count': Post.likes_count,
+    'views_count': Post.views_count,
+    'trending': Post.hot_score,
+    'id': Post.id,
+}
+
+def build_posts_query(args):
+    """Filtered, sorted Post query for the list_posts query string."""
+    category = args.get('category')
+    visibility = args.get('visibility')
+    search = args.get('search')
+    tags = args.get('tags')  # comma-separated
+    sort_by = args.get('sort_by', 'created_at')
+    sort_order = args.get('sort_order', 'desc')
 
     query = Post.query
 
     # Filtering
     if category:
         query = query.filter(Post.category == category)
-    if visibility:
+    if visibility == 'public':
+        # Inlined rather than bound so SQLite can match the partial indexes
+        query = query.filter(Post.visibility == literal_column("'public'"))
+    elif visibility:
         query = query.filter(Post.visibility == visibility)
     if search:
         query = query.filter(or_(Post.content.ilike(f'%{search}%'), Post.tags.ilike(f'%{search}%')))
@@ -87,51 +139,140 @@ def list_posts():
             query = query.filter(Post.tags.ilike(f'%{tag}%'))
 
     # Sorting
-    sort_column = getattr(Post, sort_by, Post.created_at)
+    sort_column = SORTABLE_COLUMNS.get(sort_by, Post.created_at)
     if sort_order == 'desc':
         sort_column = desc(sort_column)
-    query = query.order_by(sort_column)
-
-    # Pagination
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    posts = pagination.items
-    total = pagination.total
-    pages = pagination.pages
-
-    from models.user import User
-    result = [
-        {
-            'id': p.id,
-            'user_id': p.user_id,
-            'username': User.query.get(p.user_id).username if User.query.get(p.user_id) else None,
-            'content': p.content,
-            'media_url': p.media_url,
-            'created_at': p.created_at.isoformat(),
-            'category': p.category,
-            'tags': p.tags,
-            'visibility': p.visibility,
-            'likes_count': p.likes_count,
-            'views_count': p.views_count
-        } for p in posts
-    ]
-    return jsonify({
-        'posts': result,
+    return query.order_by(sort_column)
+
+# Sorts that continue from the oldest hot post into the archive
+ARCHIVE_SORTABLE_COLUMNS = {
+    'created_at': ArchivedPost.created_at,
+    'id': ArchivedPost.id,
+}
+
+def build_archive_query(args):
+    """Archived posts continuing a list_posts listing, or None if it stops at hot posts.
+
+    Only time-ordered listings reach the archive. Popularity rankings cover
+    recent posts, and search and tag filters (LIKE '%...%', which reads
+    every row) never scan cold storage.
+    """
+    category = args.get('category')
+    visibility = args.get('visibility')
+    sort_by = args.get('sort_by', 'created_at')
+    if sort_by not in SORTABLE_COLUMNS:
+        sort_by = 'created_at'
+    if sort_by not in ARCHIVE_SORTABLE_COLUMNS or args.get('search') or args.get('tags'):
+        return None
+    query = ArchivedPost.query
+    if category:
+        query = query.filter(ArchivedPost.category == category)
+    if visibility:
+        query = query.filter(ArchivedPost.visibility == visibility)
+    sort_column = ARCHIVE_SORTABLE_COLUMNS[sort_by]
+    if args.get('sort_order', 'desc') == 'desc':
+        sort_column = desc(sort_column)
+    return query.order_by(sort_column)
+
+def page_queries(parts, offset, limit):
+    """Queries for rows offset..offset+limit of the concatenated [(query, count), ...]."""
+    queries = []
+    for query, count in parts:
+        if limit <= 0:
+            break
+        if offset >= count:
+            offset -= count
+            continue
+        take = min(count - offset, limit)
+        queries.append(query.limit(take).offset(offset))
+        limit -= take
+        offset = 0
+    return queries
+
+def posts_version():
+    """Cheap change token for posts, hot and archived.
+
+    max(id) catches inserts, max(updated_at) edits and the 'posts'
+    generation deletes, archiving and changes to archived posts. Each is
+    one index lookup, so the token covers every listing, filtered or not,
+    without counting rows.
+    """
+    return tuple(db.session.execute(select(
+        select(func.max(Post.id)).scalar_subquery(),
+        select(func.max(Post.updated_at)).scalar_subquery(),
+        generation('posts'))).one())
+
+def page_args(args):
+    """(page, per_page) of a listing request, per_page capped at POSTS_MAX_PER_PAGE."""
+    page = max(int(args.get('page', 1)), 1)
+    per_page = int(args.get('per_page', 10))
+    return page, min(per_page if per_page > 0 else 10, current_app.config['POSTS_MAX_PER_PAGE'])
+
+def listing_version():
+    """posts_version, plus the ranking itself for trending listings.
+
+    Engagement and decay move hot_score without touching updated_at, so
+    for sort_by=trending the token also hashes (id, hot_score) of the posts
+    up to the end of the requested page: the same index range the listing
+    reads.
+    """
+    version = posts_version()
+    if request.args.get('sort_by') != 'trending':
+        return version
+    page, per_page = page_args(request.args)
+    ranking = build_posts_query(request.args).with_entities(Post.id, Post.hot_score) \
+        .limit(page * per_page).all()
+    return version + (hashlib.sha256(repr(ranking).encode()).hexdigest(),)
+
+@posts_bp.route('/', methods=['GET'])
+@conditional(listing_version)
+def list_posts():
+    page, per_page = page_args(request.args)
+    try:
+        fields = parse_fields(request.args.get('fields'), POST_SCHEMA)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    query = build_posts_query(request.args)
+    archive = build_archive_query(request.args)
+
+    # Pagination. Archived posts are older than every hot post, so they come
+    # after the hot ones newest first and before them oldest first.
+    parts = [(query, query.order_by(None).count())]
+    if archive is not None:
+        key = (request.args.get('category'), request.args.get('visibility'))
+        archived = (archive, archived_count(archive, key))
+        parts = parts + [archived] if request.args.get('sort_order', 'desc') == 'desc' \
+            else [archived] + parts
+    total = sum(count for _, count in parts)
+    queries = page_queries(parts, (page - 1) * per_page, per_page)
+    stream = per_page >= current_app.config['JSON_STREAM_MIN_ITEMS']
+    if stream:
+        rows = chain.from_iterable(q.yield_per(STREAM_CHUNK_ROWS) for q in queries)
+    else:
+        rows = [row for q in queries for row in q.all()]
+
+    return list_response('posts', rows, POST_SCHEMA.dumper(fields), {
         'total': total,
-        'pages': pages,
+        'pages': -(-total // per_page),
         'page': page,
         'per_page': per_page
-    })
+    }, stream=stream)
 
 # Endpoint to get all categories
 @posts_bp.route('/categories', methods=['GET'])
+@conditional(posts_version)
 def get_categories():
-    categories = db.session.query(Post.category).distinct().filter(Post.category.isnot(None)).all()
-    return jsonify([c[0] for c in categories if c[0]])
+    # Archived posts count: listings can still filter them by category
+    categories = db.session.query(Post.category).filter(Post.category.isnot(None)).union(
+        db.session.query(ArchivedPost.category).filter(ArchivedPost.category.isnot(None))).all()
+    return jsonify(sorted(c[0] for c in categories if c[0]))
 
 # Endpoint to get popular tags
 @posts_bp.route('/popular-tags', methods=['GET'])
+@conditional(posts_version)
 def get_popular_tags():
-    tags = db.session.query(Post.tags).filter(Post.tags.isnot(None)).all()
+    tags = db.session.query(Post.tags).filter(Post.tags.isnot(None)).union_all(
+        db.session.query(ArchivedPost.tags).filter(ArchivedPost.tags.isnot(None))).all()
     tag_list = []
     for t in tags:
         if t[0]:
@@ -139,3 +280,28 @@ def get_popular_tags():
     counter = Counter(tag_list)
     popular = counter.most_common(20)
     return jsonify([{'tag': tag, 'count': count} for tag, count in popular])
+
+@posts_bp.route('/<int:post_id>/like', methods=['POST', 'DELETE'])
+@jwt_required()
+def like(post_id):
+    """Like (POST) or unlike (DELETE) a post; repeating either is a no-op."""
+    user_id = int(get_jwt_identity())
+    post = find_post(post_id)
+    if not post:
+        return jsonify({'error': 'Post not found.'}), 404
+    if request.method == 'POST':
+        like_post(post, user_id)
+    else:
+        unlike_post(post, user_id)
+    db.session.commit()
+    db.session.refresh(post)
+    return jsonify({'liked': request.method == 'POST', 'likes_count': post.likes_count or 0}), 200
+
+@posts_bp.route('/<int:post_id>/view', methods=['POST'])
+def view(post_id):
+    post = find_post(post_id)
+    if not post:
+        return jsonify({'error': 'Post not found.'}), 404
+    record_view(post)
+    db.session.commit()
+    return '', 204
@@ -1,11 +1,20 @@
+import io
 import os
 import time
 from flask import Blueprint, jsonify, request, current_app, url_for, send_from_directory, abort
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.user import User, db
 from werkzeug.utils import secure_filename
-from PIL import Image
+from instrumentation import timed
+from serializers import PROFILE_SCHEMA, USER_SCHEMA, parse_fields
 import uuid
+from datetime import date
+from urllib.parse import urlparse
+from sqlalchemy.exc import IntegrityError
+from models.outbox import enqueue
+from models.profile import Profile, Skill, Experience, Education, bump_version, diff_children
+from matching import refresh_profile_vectors
+from people_index import refresh_people_entries
 
 profile_bp = Blueprint('profile', __name__)
  
@@ -14,13 +23,35 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 MAX_CONTENT_LENGTH = 5 * 1024 * 1024  # 5MB
 THUMBNAIL_SIZE = (128, 128)
 PROFILE_SIZE = (400, 400)
+# Scope key under which asgi.py hands over images it already resized
+PREPARED_IMAGES_KEY = 'backend.profile_images'
 
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+@profile_bp.record_once
+def _create_upload_folder(state):
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def _jpeg(img, quality):
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+def make_profile_images(stream):
+    """JPEG bytes of the profile-size image and of its thumbnail.
+
+    CPU-bound: asgi.py runs it on an executor before the request reaches
+    a worker thread.
+    """
+    # PIL is heavy to import; only load it once an image actually arrives
+    from PIL import Image
+    img = Image.open(stream).convert('RGB')
+    img.thumbnail(PROFILE_SIZE)
+    thumb = img.copy()
+    thumb.thumbnail(THUMBNAIL_SIZE)
+    return _jpeg(img, 85), _jpeg(thumb, 70)
+
 @profile_bp.route('/api/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
@@ -28,14 +59,25 @@ def get_profile():
     user = User.query.get(user_id)
     if not user:
         return jsonify({'error': 'User not found.'}), 404
+    schema = PROFILE_SCHEMA if user.profile else USER_SCHEMA
+    try:
+        fields = parse_fields(request.args.get('fields'), schema)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     if user.profile:
-        return jsonify({'profile': user.profile.to_dict()}), 200
-    return jsonify({'user': user.to_dict()}), 200 
+        response = jsonify({'profile': PROFILE_SCHEMA.dump(user.profile, fields)})
+        response.set_etag(_profile_etag(user.profile), weak=True)
+        return response, 200
+    return jsonify({'user': USER_SCHEMA.dump(user, fields)}), 200
 
 @profile_bp.route('/api/profile', methods=['PUT'])
 @jwt_required()
 def update_profile():
-    """Update the current user's profile."""
+    """Update the current user's profile.
+
+    If-Match is optional here, for existing clients; when sent, a profile
+    changed since that ETag gets 412 as with PATCH.
+    """
     user_id = get_jwt_identity()
     user = User.query.get(user_id)
     if not user:
@@ -43,13 +85,13 @@ def update_profile():
     data = request.get_json()
     if not data:
         return jsonify({'error': 'No data provided.'}), 400
-    # Get or create profile
     profile = user.profile
-    if not profile:
-        from models.profile import Profile
-        profile = Profile(user_id=user.id)
-        db.session.add(profile)
-    # Validate and update fields
+    conditional = bool(request.if_match)
+    if profile is not None and conditional:
+        error = _precondition_failed(profile)
+        if error:
+            return error
+    # Validate fields
     allowed_fields = ['bio', 'location']
     for field in allowed_fields:
         if field in data:
@@ -58,10 +100,186 @@ def update_profile():
                 return jsonify({'error': 'Bio must be 500 characters or less.'}), 400
             if field == 'location' and value is not None and len(value) > 120:
                 return jsonify({'error': 'Location must be 120 characters or less.'}), 400
-            setattr(profile, field, value)
+    # Get or create profile
+    if profile is None:
+        profile = _create_profile(user)
+        if profile is None:
+            return jsonify({'error': 'Profile was changed by another request.'}), 412
+    elif not bump_version(profile.id, expected=profile.version if conditional else None):
+        # Changed between the check above and this write
+        db.session.rollback()
+        return jsonify({'error': 'Profile was changed by another request.'}), 412
+    for field in allowed_fields:
+        if field in data:
+            setattr(profile, field, data[field])
+    db.session.flush()
+    refresh_profile_vectors([profile.id])
+    refresh_people_entries([user.id])
     # Save changes
     db.session.commit()
-    return jsonify({'profile': profile.to_dict()}), 200
+    response = jsonify({'profile': PROFILE_SCHEMA.dump(profile)})
+    response.set_etag(_profile_etag(profile), weak=True)
+    return response, 200
+
+def _profile_etag(profile):
+    return f'{profile.id}-{profile.version}'
+
+def _precondition_failed(profile):
+    """The 428/412 response for a write without the profile's current ETag, else None."""
+    if not request.if_match:
+        return jsonify({'error': 'If-Match with the profile ETag is required.'}), 428
+    if not request.if_match.contains_weak(_profile_etag(profile)):
+        return jsonify({'error': 'Profile was changed by another request.'}), 412
+    return None
+
+def _create_profile(user):
+    """A new, flushed profile for user; None if a concurrent request created one first."""
+    profile = Profile(user_id=user.id)
+    db.session.add(profile)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        # uq_profiles_user_id
+        db.session.rollback()
+        return None
+    return profile
+
+MAX_SKILLS = 50
+MAX_EXPERIENCES = 50
+MAX_EDUCATIONS = 20
+EXPERIENCE_FIELDS = ('title', 'company', 'start_date', 'end_date', 'description')
+EDUCATION_FIELDS = ('school', 'degree', 'field_of_study', 'start_year', 'end_year')
+
+def _text(item, name, max_length, required=False):
+    value = item.get(name)
+    if value is None or (isinstance(value, str) and not value.strip()):
+        if required:
+            raise ValueError(f'{name} is required.')
+        return None
+    if not isinstance(value, str) or len(value) > max_length:
+        raise ValueError(f'{name} must be text of {max_length} characters or less.')
+    return value.strip()
+
+def _date(item, name):
+    value = item.get(name)
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a YYYY-MM-DD date.')
+
+def _year(item, name):
+    value = item.get(name)
+    if value is None:
+        return None
+    if not isinstance(value, int) or isinstance(value, bool) or not 1900 <= value <= 2100:
+        raise ValueError(f'{name} must be a year.')
+    return value
+
+def _items(data, name, max_items, parse):
+    items = data[name]
+    if not isinstance(items, list) or len(items) > max_items:
+        raise ValueError(f'{name} must be a list of at most {max_items} items.')
+    parsed = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError(f'{name} items must be objects.')
+        row_id = item.get('id')
+        if row_id is not None and (not isinstance(row_id, int) or isinstance(row_id, bool)):
+            raise ValueError(f'{name} ids must be integers.')
+        parsed.append(dict(parse(item), id=row_id))
+    return parsed
+
+def _experience(item):
+    return {'title': _text(item, 'title', 120, required=True),
+            'company': _text(item, 'company', 120),
+            'start_date': _date(item, 'start_date'),
+            'end_date': _date(item, 'end_date'),
+            'description': _text(item, 'description', 2000)}
+
+def _education(item):
+    return {'school': _text(item, 'school', 120, required=True),
+            'degree': _text(item, 'degree', 120),
+            'field_of_study': _text(item, 'field_of_study', 120),
+            'start_year': _year(item, 'start_year'),
+            'end_year': _year(item, 'end_year')}
+
+def _skill_items(data, current):
+    """Skill names as diff_children items; unchanged names keep their row."""
+    names = data['skills']
+    if not isinstance(names, list) or len(names) > MAX_SKILLS:
+        raise ValueError(f'skills must be a list of at most {MAX_SKILLS} names.')
+    by_name = {skill.name.lower(): skill.id for skill in current}
+    items = {}
+    for name in names:
+        name = _text({'skill': name}, 'skill', 80, required=True)
+        items.setdefault(name.lower(), {'id': by_name.get(name.lower()), 'name': name})
+    return list(items.values())
+
+@profile_bp.route('/api/profile', methods=['PATCH'])
+@jwt_required()
+def patch_profile():
+    """Save the full profile document, writing only what changed.
+
+    Any of bio, location, skills (names), experiences and educations may
+    be sent; a list replaces the current rows, where items with an id edit
+    that row. Send the ETag from GET /api/profile as If-Match: a profile
+    changed since then gets 412 instead of being overwritten.
+    """
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    if not user:
+        return jsonify({'error': 'User not found.'}), 404
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'A JSON object is required.'}), 400
+    profile = user.profile
+    if profile is not None:
+        error = _precondition_failed(profile)
+        if error:
+            return error
+    try:
+        fields = {}
+        if 'bio' in data:
+            fields['bio'] = _text(data, 'bio', 500)
+        if 'location' in data:
+            fields['location'] = _text(data, 'location', 120)
+        experiences = _items(data, 'experiences', MAX_EXPERIENCES, _experience) \
+            if 'experiences' in data else None
+        educations = _items(data, 'educations', MAX_EDUCATIONS, _education) \
+            if 'educations' in data else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if profile is None:
+        profile = _create_profile(user)
+        if profile is None:
+            return jsonify({'error': 'Profile was changed by another request.'}), 412
+    elif not bump_version(profile.id, expected=profile.version):
+        # Changed between the check above and this write
+        db.session.rollback()
+        return jsonify({'error': 'Profile was changed by another request.'}), 412
+    for name, value in fields.items():
+        setattr(profile, name, value)
+    try:
+        if 'skills' in data:
+            current = Skill.query.filter_by(profile_id=profile.id).all()
+            diff_children(Skill, profile.id, _skill_items(data, current), ('name',))
+        if experiences is not None:
+            diff_children(Experience, profile.id, experiences, EXPERIENCE_FIELDS)
+        if educations is not None:
+            diff_children(Education, profile.id, educations, EDUCATION_FIELDS)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    db.session.flush()
+    refresh_profile_vectors([profile.id])
+    refresh_people_entries([user.id])
+    db.session.commit()
+    response = jsonify({'profile': PROFILE_SCHEMA.dump(profile)})
+    response.set_etag(_profile_etag(profile), weak=True)
+    return response, 200
 
 @profile_bp.route('/api/profile/image', methods=['POST'])
 @jwt_required()
@@ -88,29 +306,42 @@ def upload_profile_image():
         unique_name = f"{user_id}_{timestamp}.{ext}"
         filename = secure_filename(unique_name)
         file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(file_path)
-        try:
-            img = Image.open(file_path)
-            img = img.convert('RGB')
-            img.thumbnail(PROFILE_SIZE)
-            img.save(file_path, format='JPEG', quality=85)
-            thumb_name = f"thumb_{filename}"
-            thumb_path = os.path.join(UPLOAD_FOLDER, thumb_name)
-            img_thumb = img.copy()
-            img_thumb.thumbnail(THUMBNAIL_SIZE)
-            img_thumb.save(thumb_path, format='JPEG', quality=70)
-        except Exception as e:
-            os.remove(file_path)
-            return jsonify({'error': 'Image processing failed.'}), 400
-        profile = user.profile
-        if not profile:
-            from models.profile import Profile
-            profile = Profile(user_id=user.id)
-            db.session.add(profile)
+        thumb_name = f"thumb_{filename}"
+        thumb_path = os.path.join(UPLOAD_FOLDER, thumb_name)
+        images = request.environ.get('asgi.scope', {}).get(PREPARED_IMAGES_KEY)
+        if images is None:
+            try:
+                with timed('pil'):
+                    images = make_profile_images(file.stream)
+            except Exception:
+                return jsonify({'error': 'Image processing failed.'}), 400
+        with timed('io'):
+            for path, data in zip((file_path, thumb_path), images):
+                with open(path, 'wb') as f:
+                    f.write(data)
+        # A profile created concurrently is the one to update
+        profile = user.profile or _create_profile(user) or \
+            Profile.query.filter_by(user_id=user.id).one()
+        # The replaced files are removed by the worker once this commits
+        old_names = {os.path.basename(urlparse(url).path)
+                     for url in (profile.image_url, profile.thumbnail_url) if url}
+        # A re-upload within the same second reuses the same names
+        old_paths = [os.path.join(UPLOAD_FOLDER, name)
+                     for name in sorted(old_names - {filename, thumb_name})]
+        # New image URLs are a new version: cached copies and If-Match on the old ETag go stale
+        if not bump_version(profile.id, expected=profile.version):
+            db.session.rollback()
+            for name in {filename, thumb_name} - old_names:
+                os.remove(os.path.join(UPLOAD_FOLDER, name))
+            return jsonify({'error': 'Profile was changed by another request.'}), 412
+        if old_paths:
+            enqueue('profile.delete_images', {'paths': old_paths})
         profile.image_url = url_for('profile.get_profile_image', filename=filename, _external=True)
         profile.thumbnail_url = url_for('profile.get_profile_image', filename=thumb_name, _external=True)
         db.session.commit()
-        return jsonify({'image_url': profile.image_url, 'thumbnail_url': profile.thumbnail_url}), 200
+        response = jsonify({'image_url': profile.image_url, 'thumbnail_url': profile.thumbnail_url})
+        response.set_etag(_profile_etag(profile), weak=True)
+        return response, 200
     return jsonify({'error': 'Unknown error.'}), 400
 
 @profile_bp.route('/api/profile/image/<filename>', methods=['GET'])
@@ -0,0 +1,26 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from models.people_search import PeopleSearchEntry
+from people_index import get_people_index
+
+search_bp = Blueprint('search', __name__)
+
+MAX_RESULTS = 20
+
+@search_bp.route('/api/search/people', methods=['GET'])
+@jwt_required()
+def search_people():
+    """Autocomplete people by username, skill or location prefix."""
+    q = request.args.get('q', '')
+    if len(q) > 80:
+        return jsonify({'error': 'q must be 80 characters or less.'}), 400
+    limit = min(max(request.args.get('limit', 10, type=int), 1), MAX_RESULTS)
+    hits = get_people_index().search(q, limit)
+    if not hits:
+        return jsonify({'results': []}), 200
+    entries = {e.user_id: e for e in PeopleSearchEntry.query.filter(
+        PeopleSearchEntry.user_id.in_([user_id for user_id, _, _ in hits]))}
+    return jsonify({'results': [
+        dict(entries[user_id].to_dict(), matched_field=field, matched=key)
+        for user_id, field, key in hits if user_id in entries
+    ]}), 200
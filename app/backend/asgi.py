@@ -0,0 +1,365 @@
+"""ASGI entry point for the backend.
+
+Run with:  uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+The Flask app keeps serving every route through a bounded WSGI thread pool,
+while the I/O-heavy paths are handled natively on the event loop:
+
+- media files under /posts/media/ are streamed in chunks read off-loop,
+  with single byte ranges (video seeking) and conditional requests
+- upload bodies are received asynchronously into a spool file before a
+  worker thread is taken, so slow clients no longer pin a thread; profile
+  images are resized on a CPU executor before the upload reaches Flask
+- /api/messages/stream pushes new messages as Server-Sent Events
+
+Startup (the lifespan event) loads the in-memory matching index before
+any request is served.
+
+Blocking calls (SQLite, disk reads) and CPU-bound work (Pillow) run in
+executors, never on the loop.
+Native responses carry the same CORS headers flask_cors adds to Flask's.
+"""
+import asyncio
+import json
+import mimetypes
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate, parsedate_to_datetime
+from tempfile import SpooledTemporaryFile
+from urllib.parse import parse_qs
+
+from a2wsgi import WSGIMiddleware
+from flask_cors.core import get_cors_headers, get_cors_options
+from werkzeug.datastructures import Headers
+from werkzeug.formparser import parse_form_data
+
+from main import create_app
+from api.posts import UPLOAD_FOLDER as POST_MEDIA_FOLDER
+from api.profile import (MAX_CONTENT_LENGTH as MAX_PROFILE_IMAGE_SIZE, PREPARED_IMAGES_KEY,
+                         allowed_file as allowed_profile_image, make_profile_images)
+from matching import warm_index as warm_match_index
+from people_index import warm_index as warm_people_index
+
+CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_MEMORY = 1024 * 1024
+KEEPALIVE_SECONDS = 15
+
+# Loaders of the per-process in-memory indexes, run at startup
+INDEX_WARMERS = (warm_match_index, warm_people_index)
+
+# Routes whose request bodies are uploads and get buffered on the loop
+PROFILE_IMAGE_ROUTE = ('POST', '/api/profile/image')
+UPLOAD_ROUTES = {('POST', '/posts/'), PROFILE_IMAGE_ROUTE}
+
+RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)$')
+
+
+async def _send_simple(send, status, body=b'', content_type=b'application/json', headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type),
+                    (b'content-length', str(len(body)).encode()), *headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _json_error(message):
+    return json.dumps({'error': message}).encode()
+
+
+def _request_headers(scope):
+    return Headers([(name.decode('latin-1'), value.decode('latin-1'))
+                    for name, value in scope['headers']])
+
+
+def _byte_range(header, size):
+    """(start, end) inclusive for a single-range Range header.
+
+    None serves the whole file (no header, a multi-range or malformed
+    one, which RFC 9110 lets a server ignore); False means unsatisfiable.
+    """
+    match = RANGE_RE.match(header.replace(' ', '')) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:  # the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _profile_images(body, content_type, length):
+    """Resized JPEGs of the upload's image part; None leaves the work to the view.
+
+    The view validates the request as usual and reports bad images itself.
+    """
+    _, _, files = parse_form_data({'REQUEST_METHOD': 'POST', 'wsgi.input': body,
+                                   'CONTENT_TYPE': content_type, 'CONTENT_LENGTH': str(length)})
+    try:
+        image = files.get('image')
+        if not image or not allowed_profile_image(image.filename or ''):
+            return None
+        image.stream.seek(0, os.SEEK_END)
+        if image.stream.tell() > MAX_PROFILE_IMAGE_SIZE:
+            return None
+        image.stream.seek(0)
+        try:
+            return make_profile_images(image.stream)
+        except Exception:
+            return None
+    finally:
+        for image in files.values():
+            image.close()
+
+
+def _not_modified(headers, etag, mtime):
+    if 'If-None-Match' in headers:
+        tags = [tag.strip() for tag in headers['If-None-Match'].split(',')]
+        return etag in tags or '*' in tags or f'W/{etag}' in tags
+    if 'If-Modified-Since' in headers:
+        try:
+            return int(mtime) <= parsedate_to_datetime(headers['If-Modified-Since']).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class BackendASGI:
+    """Dispatch async-native routes and hand the rest to Flask."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.config = wsgi_app.config
+        self.wsgi = WSGIMiddleware(wsgi_app, workers=self.config['ASGI_WSGI_WORKERS'])
+        self.io_executor = ThreadPoolExecutor(
+            max_workers=self.config['ASGI_IO_WORKERS'], thread_name_prefix='asgi-io'
+        )
+        self.cpu_executor = ThreadPoolExecutor(
+            max_workers=self.config['ASGI_CPU_WORKERS'], thread_name_prefix='asgi-cpu'
+        )
+        # CORS(app) in main.create_app reads the same options
+        self.cors_options = get_cors_options(wsgi_app)
+
+    def _cors_headers(self, scope, headers):
+        return [(name.lower().encode(), value.encode()) for name, value in
+                get_cors_headers(self.cors_options, headers, scope['method']).items()]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+        method, path = scope['method'], scope['path']
+        if method in ('GET', 'HEAD') and path.startswith('/posts/media/'):
+            return await self._serve_media(scope, send, path[len('/posts/media/'):])
+        if method == 'GET' and path == '/api/messages/stream':
+            return await self._message_stream(scope, receive, send)
+        if (method, path) in UPLOAD_ROUTES:
+            return await self._buffered_upload(scope, receive, send)
+        return await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self._warm_indexes()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.io_executor.shutdown(wait=False)
+                self.cpu_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _warm_indexes(self):
+        """Load the in-memory search indexes before the first request needs them."""
+        for warm in INDEX_WARMERS:
+            try:
+                await self._run_io(warm, self.wsgi_app)
+            except Exception:
+                # Not fatal: the index then loads on first use instead
+                self.wsgi_app.logger.exception('Could not warm %s', warm.__module__)
+
+    async def _run_io(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io_executor, func, *args)
+
+    async def _serve_media(self, scope, send, filename):
+        request_headers = _request_headers(scope)
+        cors = self._cors_headers(scope, request_headers)
+        if not filename or os.path.basename(filename) != filename:
+            return await _send_simple(send, 404, _json_error('Not found.'), headers=cors)
+        file_path = os.path.join(POST_MEDIA_FOLDER, filename)
+        try:
+            handle = await self._run_io(open, file_path, 'rb')
+        except OSError:
+            return await _send_simple(send, 404, _json_error('Not found.'), headers=cors)
+        try:
+            stat = await self._run_io(os.fstat, handle.fileno())
+            size = stat.st_size
+            etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+            headers = [(b'etag', etag.encode()),
+                       (b'last-modified', formatdate(stat.st_mtime, usegmt=True).encode()),
+                       (b'cache-control', b'public, max-age=86400'),
+                       (b'accept-ranges', b'bytes'), *cors]
+            if _not_modified(request_headers, etag, stat.st_mtime):
+                await send({'type': 'http.response.start', 'status': 304, 'headers': headers})
+                return await send({'type': 'http.response.body', 'body': b''})
+            byte_range = None
+            # A stale If-Range (the file changed) asks for the whole new file
+            if request_headers.get('If-Range', etag) == etag:
+                byte_range = _byte_range(request_headers.get('Range'), size)
+            if byte_range is False:
+                return await _send_simple(send, 416, headers=[
+                    (b'content-range', f'bytes */{size}'.encode()), *headers])
+            status, start, length = 200, 0, size
+            if byte_range:
+                start, end = byte_range
+                status, length = 206, end - start + 1
+                headers.append((b'content-range', f'bytes {start}-{end}/{size}'.encode()))
+            content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            await send({
+                'type': 'http.response.start',
+                'status': status,
+                'headers': [(b'content-type', content_type.encode()),
+                            (b'content-length', str(length).encode()), *headers],
+            })
+            if scope['method'] == 'HEAD' or not length:
+                return await send({'type': 'http.response.body', 'body': b''})
+            if start:
+                await self._run_io(handle.seek, start)
+            while length:
+                chunk = await self._run_io(handle.read, min(CHUNK_SIZE, length))
+                length = length - len(chunk) if chunk else 0
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': bool(length)})
+        finally:
+            await self._run_io(handle.close)
+
+    async def _buffered_upload(self, scope, receive, send):
+        """Receive the whole body on the loop, then replay it to Flask."""
+        limit = self.config.get('MAX_CONTENT_LENGTH')
+        spool = SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        received = 0
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                chunk = message.get('body', b'')
+                received += len(chunk)
+                if limit and received > limit:
+                    return await _send_simple(send, 413, _json_error('Request Entity Too Large'))
+                if chunk:
+                    await self._run_io(spool.write, chunk)
+                if not message.get('more_body', False):
+                    break
+            await self._run_io(spool.seek, 0)
+            if (scope['method'], scope['path']) == PROFILE_IMAGE_ROUTE:
+                loop = asyncio.get_running_loop()
+                images = await loop.run_in_executor(
+                    self.cpu_executor, _profile_images, spool,
+                    _request_headers(scope).get('Content-Type', ''), received)
+                if images is not None:
+                    # Not reachable from the client: Flask sees it in environ['asgi.scope']
+                    scope = dict(scope, **{PREPARED_IMAGES_KEY: images})
+                await self._run_io(spool.seek, 0)
+
+            async def replay():
+                chunk = await self._run_io(spool.read, CHUNK_SIZE)
+                return {'type': 'http.request', 'body': chunk,
+                        'more_body': len(chunk) == CHUNK_SIZE}
+
+            await self.wsgi(scope, replay, send)
+        finally:
+            spool.close()
+
+    def _authenticate(self, scope):
+        """Resolve the JWT from the Authorization header or ?token= (EventSource)."""
+        from flask_jwt_extended import decode_token
+        token = None
+        for name, value in scope['headers']:
+            if name == b'authorization' and value.lower().startswith(b'bearer '):
+                token = value[7:].decode()
+        if token is None:
+            token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+        if not token:
+            return None
+        try:
+            with self.wsgi_app.app_context():
+                return int(decode_token(token)['sub'])
+        except Exception:
+            return None
+
+    def _fetch_messages(self, user_id, after_id):
+        from models.message import Message
+        with self.wsgi_app.app_context():
+            messages = Message.query.filter(
+                Message.recipient_id == user_id,
+                Message.id > after_id
+            ).order_by(Message.id).limit(100).all()
+            return [m.to_dict() for m in messages]
+
+    def _latest_message_id(self, user_id):
+        from sqlalchemy import func
+        from models import db
+        from models.message import Message
+        with self.wsgi_app.app_context():
+            latest = db.session.query(func.max(Message.id)).filter(
+                Message.recipient_id == user_id
+            ).scalar()
+            return latest or 0
+
+    async def _message_stream(self, scope, receive, send):
+        cors = self._cors_headers(scope, _request_headers(scope))
+        user_id = await self._run_io(self._authenticate, scope)
+        if user_id is None:
+            return await _send_simple(send, 401, _json_error('Missing or invalid token.'),
+                                      headers=cors)
+        params = parse_qs(scope.get('query_string', b'').decode())
+        after_id = params.get('after_id', [None])[0]
+        last_id = int(after_id) if after_id and after_id.isdigit() else \
+            await self._run_io(self._latest_message_id, user_id)
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'text/event-stream'),
+                        (b'cache-control', b'no-cache'),
+                        (b'x-accel-buffering', b'no'), *cors],
+        })
+        disconnected = asyncio.ensure_future(self._wait_disconnect(receive))
+        poll_interval = self.config['MESSAGE_STREAM_POLL_INTERVAL']
+        idle = 0.0
+        try:
+            while not disconnected.done():
+                messages = await self._run_io(self._fetch_messages, user_id, last_id)
+                for message in messages:
+                    last_id = message['id']
+                    payload = f"id: {last_id}\nevent: message\ndata: {json.dumps(message)}\n\n"
+                    await send({'type': 'http.response.body', 'body': payload.encode(),
+                                'more_body': True})
+                if messages:
+                    idle = 0.0
+                    continue
+                if idle >= KEEPALIVE_SECONDS:
+                    await send({'type': 'http.response.body', 'body': b': keepalive\n\n',
+                                'more_body': True})
+                    idle = 0.0
+                await asyncio.wait([disconnected], timeout=poll_interval)
+                idle += poll_interval
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+
+    @staticmethod
+    async def _wait_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+
+application = BackendASGI(create_app())
@@ -0,0 +1,144 @@
+"""Online data migrations: resumable, throttled backfills in primary key batches.
+
+Alembic revisions should only make cheap schema changes. Rewriting data in
+a revision touches every row in one transaction, and on SQLite it holds the
+write lock for the whole table. So large changes go in three steps instead:
+
+1. expand: a revision adds the new column as nullable or with a server
+   default. Use op.add_column for this, not a batch_alter_table that
+   recreates the table. New code writes the new form from now on.
+2. backfill: a @backfill function rewrites existing rows while the site
+   stays up, via `flask backfill run <name>`.
+3. contract: a later revision adds constraints or drops the old column,
+   once `flask backfill list` shows the backfill as done.
+
+A backfill is a function of a list of primary keys that updates those rows
+with set-based statements:
+
+    @backfill('posts.normalize_tags', Post)
+    def normalize_tags(ids):
+        ...
+
+The runner walks the table in keyset batches (id > last_id ORDER BY id
+LIMIT batch_size). Each batch is its own short transaction, and the batch
+commits together with its checkpoint in backfill_checkpoints, so every row
+is processed once even across crashes and restarts. A pause between
+batches leaves room for live traffic. The walk stops at the highest id
+that existed when the backfill first started; rows created after that are
+written by new code.
+"""
+import time
+from datetime import datetime
+from importlib import import_module
+
+from flask import current_app
+from sqlalchemy import func
+
+from models import db, insert_or_ignore
+from models.backfill import BackfillCheckpoint
+
+BACKFILLS = {}
+
+# Modules that register backfills; imported by `flask backfill`
+BACKFILL_MODULES = ('backfills.posts',)
+
+
+class BackfillConflict(RuntimeError):
+    """Another run moved the checkpoint; only one run per backfill at a time."""
+
+
+class Backfill:
+    def __init__(self, name, model, func, batch_size, description):
+        self.name = name
+        self.model = model
+        self.func = func
+        self.batch_size = batch_size
+        self.description = description
+
+    @property
+    def key(self):
+        return self.model.__mapper__.primary_key[0]
+
+
+def backfill(name, model, batch_size=1000):
+    """Register func(ids) as the backfill called name, over model's rows."""
+    def decorator(func):
+        description = (func.__doc__ or '').strip().split('\n')[0]
+        BACKFILLS[name] = Backfill(name, model, func, batch_size, description)
+        return func
+    return decorator
+
+
+def load_backfills():
+    for module in BACKFILL_MODULES:
+        import_module(module)
+    return BACKFILLS
+
+
+def checkpoint(name):
+    return db.session.get(BackfillCheckpoint, name)
+
+
+def _start(spec):
+    """The backfill's checkpoint, created on its first run."""
+    end_id = db.session.query(func.max(spec.key)).scalar() or 0
+    # Two first runs racing keep whichever checkpoint was written first
+    insert_or_ignore(BackfillCheckpoint, {
+        'name': spec.name, 'last_id': 0, 'end_id': end_id, 'rows_done': 0, 'batches_done': 0,
+        'status': 'running', 'started_at': datetime.utcnow(), 'updated_at': datetime.utcnow()})
+    db.session.commit()
+    return checkpoint(spec.name)
+
+
+def run_backfill(name, batch_size=None, pause=None, max_batches=None, echo=None):
+    """Run (or resume) a backfill until it is done or max_batches have run.
+
+    pause is the number of seconds to sleep between batches, BACKFILL_PAUSE_SECONDS
+    by default. Returns the checkpoint. Raises BackfillConflict if another
+    run advances the same checkpoint.
+    """
+    spec = load_backfills()[name]
+    batch_size = batch_size or spec.batch_size
+    pause = current_app.config['BACKFILL_PAUSE_SECONDS'] if pause is None else pause
+    key = spec.key
+    state = checkpoint(name) or _start(spec)
+    last_id, end_id = state.last_id, state.end_id
+    batches = 0
+    while state.status != 'done' and (max_batches is None or batches < max_batches):
+        started = time.monotonic()
+        ids = [row[0] for row in db.session.query(key).filter(
+            key > last_id, key <= end_id).order_by(key).limit(batch_size)]
+        values = {'updated_at': datetime.utcnow()}
+        if ids:
+            spec.func(ids)
+            values.update(last_id=ids[-1], rows_done=BackfillCheckpoint.rows_done + len(ids),
+                          batches_done=BackfillCheckpoint.batches_done + 1)
+        else:
+            values.update(status='done', finished_at=datetime.utcnow())
+        # Advance only from the position this run read: a concurrent run fails here
+        moved = BackfillCheckpoint.query.filter_by(name=name, last_id=last_id, status='running') \
+            .update(values, synchronize_session=False)
+        if not moved:
+            db.session.rollback()
+            raise BackfillConflict(f'{name}: checkpoint moved by another run')
+        db.session.commit()
+        state = checkpoint(name)
+        if not ids:
+            break
+        last_id = ids[-1]
+        batches += 1
+        if echo:
+            echo(f'{name}: {state.rows_done} rows, id {last_id}/{end_id} '
+                 f'({len(ids)} in {time.monotonic() - started:.2f}s)')
+        if pause:
+            time.sleep(pause)
+    if echo and state.status == 'done':
+        echo(f'{name}: done, {state.rows_done} rows in {state.batches_done} batches')
+    return state
+
+
+def reset_backfill(name):
+    """Forget a backfill's progress, so the next run starts over from the first row."""
+    deleted = BackfillCheckpoint.query.filter_by(name=name).delete(synchronize_session=False)
+    db.session.commit()
+    return bool(deleted)
@@ -0,0 +1,53 @@
+"""Backfills over the posts table."""
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from models import db, Post
+from models.comment import Comment
+from models.trending import initial_hot_score
+from . import backfill
+
+
+def normalize_tags(tags):
+    """'Python, flask,python ' -> 'flask,python': lower case, trimmed, unique, sorted."""
+    if not tags:
+        return tags
+    return ','.join(sorted({tag.strip().lower() for tag in tags.split(',') if tag.strip()})) or None
+
+
+@backfill('posts.normalize_tags', Post)
+def normalize_post_tags(ids):
+    """Rewrite tags as lower case, trimmed, de-duplicated and sorted."""
+    updates = [{'id': post_id, 'tags': normalize_tags(tags)}
+               for post_id, tags in db.session.query(Post.id, Post.tags).filter(Post.id.in_(ids))
+               if tags and normalize_tags(tags) != tags]
+    if updates:
+        db.session.execute(db.update(Post), updates)
+
+
+@backfill('posts.comments_count', Post)
+def recount_post_comments(ids):
+    """Recompute comments_count from the visible comments."""
+    visible = select(func.count(Comment.id)).where(
+        Comment.post_id == Post.id, Comment.status != 'deleted').scalar_subquery()
+    # Only posts whose count changes: listings show it, so their updated_at
+    # (and with it the listing ETags) has to move
+    Post.query.filter(Post.id.in_(ids), Post.comments_count != visible).update(
+        {Post.comments_count: visible}, synchronize_session=False)
+
+
+@backfill('posts.hot_score', Post)
+def seed_hot_scores(ids):
+    """Score posts that predate trending from their like and view counts."""
+    half_life = current_app.config['TRENDING_HALF_LIFE_HOURS']
+    now = datetime.utcnow()
+    updates = [{'id': post_id, 'updated_at': updated_at,
+                'hot_score': initial_hot_score(likes or 0, views or 0,
+                                               (now - created_at).total_seconds(), half_life)}
+               for post_id, likes, views, created_at, updated_at in db.session.query(
+                   Post.id, Post.likes_count, Post.views_count, Post.created_at, Post.updated_at)
+               .filter(Post.id.in_(ids), Post.hot_score == 0)]
+    if updates:
+        db.session.execute(db.update(Post), updates)
@@ -0,0 +1,210 @@
+"""Load benchmark for the backend API.
+
+Seeds a local SQLite database with the deterministic `flask seed` dataset, serves
+the real app on a local port and drives each scenario at a fixed
+concurrency. Prints throughput and p50/p95/p99 latency per scenario and can
+compare the results against a saved baseline.
+
+Usage (from app/backend):
+    python -m benchmarks.run --users 1000 --posts 20000 --concurrency 8
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --baseline bench.json --max-regression 0.15
+
+The run exits with status 1 if any scenario regressed by more than
+--max-regression against the baseline. Higher p95 latency counts as a
+regression, and so do lower throughput and a higher error rate. Nothing leaves the machine.
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from main import create_app  # noqa: E402
+from commands.seed import seed_database, SEED_PASSWORD  # noqa: E402
+
+
+def build_config(db_path):
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        RATELIMIT_ENABLED = False
+        INSTRUMENTATION_ENABLED = False
+    return BenchmarkConfig
+
+
+def scenarios(args, token):
+    """name -> (method, path, json body, headers)"""
+    auth = {'Authorization': f'Bearer {token}'}
+    deep_page = max(1, args.posts // 20 - 1)
+    login = {'username': 'user1', 'password': SEED_PASSWORD}
+    return {
+        'login': ('POST', '/api/login', login, {}),
+        'posts_first_page': ('GET', '/posts/?per_page=20', None, {}),
+        'posts_filtered': ('GET', '/posts/?per_page=20&visibility=public&category=engineering', None, {}),
+        'posts_tag_filter': ('GET', '/posts/?per_page=20&tags=python,remote', None, {}),
+        'posts_search': ('GET', '/posts/?per_page=20&search=hiring', None, {}),
+        'posts_deep_page': ('GET', f'/posts/?per_page=20&page={deep_page}', None, {}),
+        'posts_sorted_likes': ('GET', '/posts/?per_page=20&sort_by=likes_count', None, {}),
+        'popular_tags': ('GET', '/posts/popular-tags', None, {}),
+        'profile': ('GET', '/api/profile', None, auth),
+    }
+
+
+def request_once(base_url, method, path, body, headers):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base_url + path, data=data, method=method,
+                                 headers={'Content-Type': 'application/json', **headers})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req) as resp:
+            resp.read()
+            ok = resp.status < 400
+    except (urllib.error.URLError, http.client.HTTPException, OSError):
+        # HTTP errors, refused or reset connections and timeouts all count
+        # as failed requests rather than ending the run
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(base_url, spec, concurrency, requests, warmup):
+    method, path, body, headers = spec
+    for _ in range(warmup):
+        request_once(base_url, method, path, body, headers)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: request_once(base_url, method, path, body, headers),
+                                range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        'requests': requests,
+        'errors': sum(1 for _, ok in results if not ok),
+        'throughput_rps': requests / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def error_rate(stats):
+    return stats['errors'] / stats['requests'] if stats.get('requests') else 0.0
+
+
+def compare(results, baseline, max_regression):
+    """Return a list of human readable regressions against the baseline."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        if previous['p95_ms'] and current['p95_ms'] > previous['p95_ms'] * (1 + max_regression):
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.1f}ms -> {current['p95_ms']:.1f}ms")
+        if current['throughput_rps'] < previous['throughput_rps'] * (1 - max_regression):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']:.1f} -> "
+                               f"{current['throughput_rps']:.1f} req/s")
+        if error_rate(current) > error_rate(previous):
+            regressions.append(f"{name}: errors {error_rate(previous):.1%} -> {error_rate(current):.1%}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=400, help='requests per scenario')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--only', help='comma-separated scenario names')
+    parser.add_argument('--db', help='SQLite file to use (default: a temp file)')
+    parser.add_argument('--reuse-db', action='store_true', help='skip seeding if --db exists')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--baseline', help='compare against this results JSON')
+    parser.add_argument('--max-regression', type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    db_path = os.path.abspath(args.db or os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    app = create_app(build_config(db_path))
+    from api.auth import limiter
+    limiter.enabled = False
+
+    if not (args.reuse_db and os.path.exists(db_path)):
+        started = time.perf_counter()
+        with app.app_context():
+            seed_database(users=args.users, posts=args.posts, jobs=0, messages=0,
+                          seed=args.seed, reset=True)
+        print(f'Seeded {args.users} users / {args.posts} posts in '
+              f'{time.perf_counter() - started:.1f}s ({db_path})')
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    try:
+        login = scenarios(args, '')['login']
+        req = urllib.request.Request(base_url + login[1], data=json.dumps(login[2]).encode(),
+                                     headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(req) as resp:
+            token = json.loads(resp.read())['token']
+
+        selected = scenarios(args, token)
+        if args.only:
+            wanted = set(args.only.split(','))
+            selected = {name: spec for name, spec in selected.items() if name in wanted}
+
+        results = {}
+        print(f"{'scenario':<22}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for name, spec in selected.items():
+            stats = run_scenario(base_url, spec, args.concurrency, args.requests, args.warmup)
+            results[name] = stats
+            print(f"{name:<22}{stats['throughput_rps']:>10.1f}{stats['p50_ms']:>10.1f}"
+                  f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['errors']:>8}")
+    finally:
+        server.shutdown()
+
+    report = {
+        'params': {'users': args.users, 'posts': args.posts, 'seed': args.seed,
+                   'concurrency': args.concurrency, 'requests': args.requests},
+        'scenarios': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        if baseline.get('params') != report['params']:
+            print('Warning: baseline was recorded with different parameters')
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print('Regressions beyond {:.0%}:'.format(args.max_regression))
+            for line in regressions:
+                print(f'  {line}')
+            return 1
+        print('No regressions beyond {:.0%}'.format(args.max_regression))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,15 +1,16 @@
-from models import db
+from sqlalchemy import select
 from models.user import User
-from main import app
+from main import create_app
+from commands.users import purge_users
+
+# Scripts only need the database, not the routes
+app = create_app(blueprints=())
 
 def clear_all_users():
     with app.app_context():
-        users = User.query.all()
-        count = len(users)
-        for user in users:
-            db.session.delete(user)
-        db.session.commit()
-        print(f'Deleted {count} users successfully')
+        # Same as `flask users purge --all --yes`
+        totals = purge_users(select(User.id))
+        print(f"Deleted {totals.get('users', 0)} users successfully")
 
 if __name__ == "__main__":
     clear_all_users() 
\ No newline at end of file
@@ -0,0 +1,12 @@
+def register_commands(app):
+    """Attach the maintenance CLI commands (`flask users ...`, `flask seed`, `flask worker`, `flask matching ...`, `flask backfill ...`) to the app."""
+    from .users import users_cli
+    from .seed import seed_command
+    from .worker import worker_command
+    from .matching import matching_cli
+    from .backfill import backfill_cli
+    app.cli.add_command(users_cli)
+    app.cli.add_command(seed_command)
+    app.cli.add_command(worker_command)
+    app.cli.add_command(matching_cli)
+    app.cli.add_command(backfill_cli)
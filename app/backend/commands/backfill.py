@@ -0,0 +1,55 @@
+"""`flask backfill list|run|reset`: online data migrations (see backfills/)."""
+import click
+from flask.cli import AppGroup
+
+backfill_cli = AppGroup('backfill', help='Resumable, throttled data migrations.')
+
+
+def _spec(name):
+    from backfills import load_backfills
+    backfills = load_backfills()
+    if name not in backfills:
+        raise click.BadParameter(f"unknown backfill; one of: {', '.join(sorted(backfills))}",
+                                 param_hint='NAME')
+    return backfills[name]
+
+
+@backfill_cli.command('list')
+def list_command():
+    """Show every backfill and its progress."""
+    from backfills import checkpoint, load_backfills
+    for name, spec in sorted(load_backfills().items()):
+        state = checkpoint(name)
+        if state is None:
+            progress = 'not started'
+        elif state.status == 'done':
+            progress = f'done ({state.rows_done} rows, {state.finished_at:%Y-%m-%d %H:%M})'
+        else:
+            progress = f'{state.status} at id {state.last_id}/{state.end_id} ({state.rows_done} rows)'
+        click.echo(f'{name:28} {progress:48} {spec.description}')
+
+
+@backfill_cli.command('run')
+@click.argument('name')
+@click.option('--batch-size', type=click.IntRange(1), help='Rows per transaction (default: per backfill).')
+@click.option('--pause', type=click.FloatRange(0), help='Seconds between batches [default: BACKFILL_PAUSE_SECONDS].')
+@click.option('--max-batches', type=click.IntRange(1), help='Stop after this many batches; run again to resume.')
+def run_command(name, batch_size, pause, max_batches):
+    """Run or resume a backfill. Safe to interrupt at any point."""
+    from backfills import BackfillConflict, run_backfill
+    _spec(name)
+    try:
+        run_backfill(name, batch_size=batch_size, pause=pause, max_batches=max_batches,
+                     echo=click.echo)
+    except BackfillConflict as e:
+        raise click.ClickException(str(e))
+
+
+@backfill_cli.command('reset')
+@click.argument('name')
+@click.confirmation_option(prompt='Forget this backfill\'s progress?')
+def reset_command(name):
+    """Forget a backfill's progress so the next run starts from the first row."""
+    from backfills import reset_backfill
+    _spec(name)
+    click.echo(f'{name}: reset' if reset_backfill(name) else f'{name}: not started')
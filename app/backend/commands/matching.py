@@ -0,0 +1,15 @@
+"""`flask matching rebuild`: recompute the match vectors and people search entries."""
+import click
+from flask.cli import AppGroup
+
+matching_cli = AppGroup('matching', help='Job/candidate matching and people search indexes.')
+
+
+@matching_cli.command('rebuild')
+@click.option('--batch-size', default=1000, show_default=True)
+def rebuild_command(batch_size):
+    """Recompute all vectors and search entries, e.g. after a bulk import or seed."""
+    from matching import rebuild_vectors
+    from people_index import rebuild_people_entries
+    rebuild_vectors(batch_size=batch_size, echo=click.echo)
+    rebuild_people_entries(batch_size=batch_size, echo=click.echo)
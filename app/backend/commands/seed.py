@@ -0,0 +1,280 @@
+"""Synthetic data generator: `flask seed`.
+
+Generates users, profiles (skills, experience, education), posts, jobs and
+messages at production scale. Everything is driven by one seed: each table
+draws from its own Random(f'{seed}-<table>') stream, so changing --posts
+never changes the users that get generated. Rows are streamed in chunks
+through executemany INSERTs and committed per chunk, so memory stays flat
+even for millions of rows. All users share one precomputed password hash.
+The match vectors and people search entries are rebuilt at the end, so
+search and job matching work on a fresh seed.
+"""
+import itertools
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import insert, func, select
+from werkzeug.security import generate_password_hash
+
+from models import db, Post
+from models.user import User
+from models.profile import Profile, Skill, Experience, Education
+from models.job import Job
+from models.message import Message, reconcile_unread_counters
+from models.trending import initial_hot_score
+from matching import rebuild_vectors
+from people_index import rebuild_people_entries
+
+SEED_PASSWORD = 'SeedPass123!'
+DEFAULT_BATCH_SIZE = 10000
+# Timestamps are laid out backwards from a fixed point, not from now()
+SEED_EPOCH = datetime(2025, 1, 1)
+
+CATEGORIES = ['engineering', 'design', 'product', 'marketing', 'careers', 'general']
+VISIBILITIES = ['public'] * 8 + ['connections', 'private']
+BASE_TAGS = ['python', 'flask', 'react', 'sql', 'career', 'hiring', 'remote', 'ai', 'design',
+             'startup', 'devops', 'testing', 'mobile', 'cloud', 'security', 'data', 'ux',
+             'leadership', 'opensource', 'typescript']
+SKILLS = ['Python', 'Flask', 'React', 'SQL', 'Docker', 'Kubernetes', 'TypeScript', 'Go',
+          'AWS', 'Figma', 'Product Management', 'Machine Learning', 'Testing', 'Linux',
+          'Java', 'Rust', 'GraphQL', 'Data Analysis', 'Leadership', 'Communication']
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor '
+         'incididunt ut labore et dolore magna aliqua python react hiring remote team '
+         'launch product customer growth platform backend frontend design review').split()
+TITLES = ['Software Engineer', 'Senior Engineer', 'Product Manager', 'Designer',
+          'Data Scientist', 'Engineering Manager', 'DevOps Engineer', 'QA Engineer']
+COMPANIES = ['Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark Industries',
+             'Wayne Enterprises', 'Soylent', 'Vandelay', 'Pied Piper']
+SCHOOLS = ['State University', 'Tech Institute', 'City College', 'Open University']
+DEGREES = ['BSc', 'BA', 'MSc', 'MBA', 'PhD']
+LOCATIONS = ['New York', 'San Francisco', 'London', 'Berlin', 'Bangalore', 'Toronto',
+             'Singapore', 'Remote']
+
+
+def _rng(seed, table):
+    return random.Random(f'{seed}-{table}')
+
+
+def zipf_cum_weights(size, exponent=1.1):
+    """Cumulative weights for rank-frequency Zipf sampling with rng.choices."""
+    return list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, size + 1)))
+
+
+def tag_vocabulary(size):
+    return BASE_TAGS[:size] + [f'topic{i}' for i in range(len(BASE_TAGS), size)]
+
+
+def _sentence(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+def _next_id(connection, model):
+    return (connection.scalar(select(func.max(model.id))) or 0) + 1
+
+
+@contextmanager
+def _bulk_connection():
+    """A connection of its own for the seed; on SQLite, with fsync off while it lasts.
+
+    PRAGMA synchronous is per connection, so it is set and restored on this
+    one only and never leaks into the pool.
+    """
+    with db.engine.connect() as connection:
+        raw = connection.connection.driver_connection if connection.dialect.name == 'sqlite' else None
+        if raw is not None:
+            # Outside any transaction, where SQLite allows changing it
+            previous = raw.execute('PRAGMA synchronous').fetchone()[0]
+            raw.execute('PRAGMA synchronous = OFF')
+        try:
+            yield connection
+        finally:
+            connection.rollback()
+            if raw is not None:
+                raw.execute(f'PRAGMA synchronous = {int(previous)}')
+
+
+def _insert_stream(connection, model, rows, batch_size, label, echo):
+    """Insert an iterator of row dicts in committed chunks; returns the row count."""
+    total = 0
+    started = time.perf_counter()
+    while True:
+        chunk = list(itertools.islice(rows, batch_size))
+        if not chunk:
+            break
+        connection.execute(insert(model), chunk)
+        connection.commit()
+        total += len(chunk)
+    if echo and total:
+        echo(f'{label:<12}{total:>12} rows in {time.perf_counter() - started:.1f}s')
+    return total
+
+
+def _users(first_id, count, password_hash):
+    for user_id in range(first_id, first_id + count):
+        yield {'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com',
+               'password_hash': password_hash}
+
+
+def _profiles(rng, first_user_id, count):
+    for offset in range(count):
+        user_id = first_user_id + offset
+        yield {'id': user_id, 'user_id': user_id, 'bio': _sentence(rng, 8, 40),
+               'location': rng.choice(LOCATIONS)}
+
+
+def _skills(rng, first_profile_id, count):
+    for profile_id in range(first_profile_id, first_profile_id + count):
+        for name in rng.sample(SKILLS, rng.randint(2, 8)):
+            yield {'profile_id': profile_id, 'name': name}
+
+
+def _experiences(rng, first_profile_id, count):
+    for profile_id in range(first_profile_id, first_profile_id + count):
+        year = rng.randint(2000, 2018)
+        for _ in range(rng.randint(0, 4)):
+            length = rng.randint(1, 4)
+            yield {'profile_id': profile_id, 'title': rng.choice(TITLES),
+                   'company': rng.choice(COMPANIES), 'start_date': date(year, 1, 1),
+                   'end_date': date(year + length, 1, 1), 'description': _sentence(rng, 6, 20)}
+            year += length
+
+
+def _educations(rng, first_profile_id, count):
+    for profile_id in range(first_profile_id, first_profile_id + count):
+        for _ in range(rng.randint(0, 2)):
+            start = rng.randint(1995, 2018)
+            yield {'profile_id': profile_id, 'school': rng.choice(SCHOOLS),
+                   'degree': rng.choice(DEGREES), 'field_of_study': 'Computer Science',
+                   'start_year': start, 'end_year': start + rng.randint(1, 5)}
+
+
+def _skewed_user(rng, first_user_id, user_count):
+    # A few users write most of the content
+    return first_user_id + int(user_count * rng.random() ** 3)
+
+
+def _posts(rng, first_id, count, first_user_id, user_count, tag_vocab, days, half_life_hours):
+    tag_weights = zipf_cum_weights(len(tag_vocab))
+    step = timedelta(days=days) / max(count, 1)
+    for offset in range(count):
+        tags = set(rng.choices(tag_vocab, cum_weights=tag_weights, k=rng.randint(1, 4)))
+        created_at = SEED_EPOCH - timedelta(days=days) + step * offset
+        likes = int(rng.paretovariate(1.3)) - 1
+        views = int(rng.paretovariate(1.1) * 10)
+        yield {'id': first_id + offset,
+               'user_id': _skewed_user(rng, first_user_id, user_count),
+               'content': _sentence(rng, 10, 80),
+               'media_url': f'/posts/media/seed_{first_id + offset}.png' if rng.random() < 0.15 else None,
+               'created_at': created_at,
+               'updated_at': created_at,
+               'category': rng.choice(CATEGORIES),
+               'tags': ','.join(sorted(tags)),
+               'visibility': rng.choice(VISIBILITIES),
+               'likes_count': likes,
+               'views_count': views,
+               'hot_score': initial_hot_score(likes, views, (SEED_EPOCH - created_at).total_seconds(),
+                                              half_life_hours)}
+
+
+def _jobs(rng, first_id, count):
+    for job_id in range(first_id, first_id + count):
+        yield {'id': job_id, 'title': rng.choice(TITLES), 'company': rng.choice(COMPANIES),
+               'location': rng.choice(LOCATIONS),
+               'description': _sentence(rng, 30, 120) + ' Skills: ' +
+               ', '.join(rng.sample(SKILLS, rng.randint(2, 6)))}
+
+
+def _messages(rng, first_id, count, first_user_id, user_count, days):
+    step = timedelta(days=days) / max(count, 1)
+    for offset in range(count):
+        sender = _skewed_user(rng, first_user_id, user_count)
+        recipient = first_user_id + rng.randrange(user_count)
+        if recipient == sender:
+            recipient = first_user_id + (recipient - first_user_id + 1) % user_count
+        yield {'id': first_id + offset, 'sender_id': sender, 'recipient_id': recipient,
+               'content': _sentence(rng, 3, 30),
+               'created_at': SEED_EPOCH - timedelta(days=days) + step * offset}
+
+
+def seed_database(users=1000, posts=10000, jobs=100, messages=1000, seed=42, days=365,
+                  tags=500, batch_size=DEFAULT_BATCH_SIZE, reset=False, echo=None):
+    """Generate a synthetic dataset; must run inside an app context.
+
+    With reset=True every table is dropped and recreated first. Otherwise
+    rows are appended after the current max ids. Returns row counts per table.
+    """
+    if reset:
+        db.drop_all()
+        db.create_all()
+    password_hash = generate_password_hash(SEED_PASSWORD)
+    tag_vocab = tag_vocabulary(tags)
+    counts = {}
+    # Durability of a half-written seed does not matter
+    with _bulk_connection() as connection:
+        first_user = _next_id(connection, User)
+        first_profile = _next_id(connection, Profile)
+        if first_profile != first_user and users:
+            raise click.ClickException('Profile ids are out of step with user ids; use --reset.')
+        counts['users'] = _insert_stream(connection, User, _users(first_user, users, password_hash),
+                                         batch_size, 'users', echo)
+        counts['profiles'] = _insert_stream(
+            connection, Profile, _profiles(_rng(seed, 'profiles'), first_user, users),
+            batch_size, 'profiles', echo)
+        counts['skills'] = _insert_stream(
+            connection, Skill, _skills(_rng(seed, 'skills'), first_user, users),
+            batch_size, 'skills', echo)
+        counts['experiences'] = _insert_stream(
+            connection, Experience, _experiences(_rng(seed, 'experiences'), first_user, users),
+            batch_size, 'experiences', echo)
+        counts['educations'] = _insert_stream(
+            connection, Education, _educations(_rng(seed, 'educations'), first_user, users),
+            batch_size, 'educations', echo)
+
+        # Content can also be generated for users that already exist
+        user_base, user_total = 1, first_user + users - 1
+        if user_total:
+            counts['posts'] = _insert_stream(
+                connection, Post,
+                _posts(_rng(seed, 'posts'), _next_id(connection, Post), posts, user_base, user_total,
+                       tag_vocab, days, current_app.config['TRENDING_HALF_LIFE_HOURS']),
+                batch_size, 'posts', echo)
+            counts['messages'] = _insert_stream(
+                connection, Message,
+                _messages(_rng(seed, 'messages'), _next_id(connection, Message),
+                          messages if user_total > 1 else 0, user_base, user_total, days),
+                batch_size, 'messages', echo)
+        counts['jobs'] = _insert_stream(connection, Job,
+                                        _jobs(_rng(seed, 'jobs'), _next_id(connection, Job), jobs),
+                                        batch_size, 'jobs', echo)
+    if counts.get('messages'):
+        reconcile_unread_counters(batch_size=batch_size)
+    # Bulk inserts bypass the write paths that keep these up to date
+    rebuild_vectors(batch_size=batch_size, echo=echo)
+    rebuild_people_entries(batch_size=batch_size, echo=echo)
+    return counts
+
+
+@click.command('seed')
+@with_appcontext
+@click.option('--users', default=1000, show_default=True)
+@click.option('--posts', default=10000, show_default=True)
+@click.option('--jobs', default=100, show_default=True)
+@click.option('--messages', default=1000, show_default=True)
+@click.option('--seed', 'seed_value', default=42, show_default=True, help='Random seed.')
+@click.option('--days', default=365, show_default=True, help='Spread content over this many days.')
+@click.option('--tags', default=500, show_default=True, help='Tag vocabulary size (Zipf distributed).')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True)
+@click.option('--reset', is_flag=True, help='Drop and recreate all tables first.')
+@click.option('--yes', is_flag=True, help='Do not ask for confirmation.')
+def seed_command(users, posts, jobs, messages, seed_value, days, tags, batch_size, reset, yes):
+    """Generate a deterministic synthetic dataset."""
+    if reset and not yes:
+        click.confirm('Drop ALL tables and reseed?', abort=True)
+    seed_database(users=users, posts=posts, jobs=jobs, messages=messages, seed=seed_value,
+                  days=days, tags=tags, batch_size=batch_size, reset=reset, echo=click.echo)
+    click.echo(f'Done. Every seeded user logs in with password {SEED_PASSWORD!r}')
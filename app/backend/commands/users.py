@@ -0,0 +1,249 @@
+"""Set-based user administration: `flask users delete|purge`.
+
+Users are removed in batches of ids. Each batch deletes its dependent rows
+with DELETE ... WHERE <fk> IN (...) statements, each capped at batch_size
+rows per transaction. The user rows are deleted last, so an interrupted run
+can simply be started again. Profile match vectors are emptied rather
+than deleted, so that match indexes already loaded by running servers drop
+the profiles on their next sync (see matching.py); people search entries
+become tombstones the same way. Media files are unlinked on a background thread
+pool after the rows that reference them are committed.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select, func, or_, and_
+
+from models import db, Post
+from models.user import User
+from models.profile import Profile, Skill, Experience, Education
+from models.message import Message, UnreadCounter
+from models.notification import Notification, NotificationCounter
+from models.comment import Comment, delete_threads
+from models.engagement import PostLike, unlike_all
+from models.archive import ArchivedPost
+from models.generation import bump
+from models.match_vector import save_vectors
+from people_index import refresh_people_entries
+
+users_cli = AppGroup('users', help='Bulk user administration.')
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def _profile_children():
+    return (Skill, Experience, Education)
+
+
+def _dependent_tables(user_ids):
+    """(model, where clause) pairs for rows owned by user_ids, children first."""
+    profile_ids = select(Profile.id).where(Profile.user_id.in_(user_ids))
+    tables = [(model, model.profile_id.in_(profile_ids)) for model in _profile_children()]
+    tables += [
+        (Profile, Profile.user_id.in_(user_ids)),
+        # Whole threads on the users' posts. Their comments elsewhere are
+        # gone by now with the replies below them (_delete_comment_threads);
+        # the user_id term only counts them for --dry-run.
+        (Comment, or_(Comment.post_id.in_(select(Post.id).where(Post.user_id.in_(user_ids))),
+                      Comment.post_id.in_(select(ArchivedPost.id)
+                                          .where(ArchivedPost.user_id.in_(user_ids))),
+                      Comment.user_id.in_(user_ids))),
+        # Likes of the users' posts. Their likes elsewhere are gone by now
+        # (unlike_all); the user_id term only counts them for --dry-run.
+        (PostLike, or_(PostLike.post_id.in_(select(Post.id).where(Post.user_id.in_(user_ids))),
+                       PostLike.post_id.in_(select(ArchivedPost.id)
+                                            .where(ArchivedPost.user_id.in_(user_ids))),
+                       PostLike.user_id.in_(user_ids))),
+        (Post, Post.user_id.in_(user_ids)),
+        (ArchivedPost, ArchivedPost.user_id.in_(user_ids)),
+        (Message, or_(Message.sender_id.in_(user_ids), Message.recipient_id.in_(user_ids))),
+        (UnreadCounter, or_(UnreadCounter.user_id.in_(user_ids),
+                            UnreadCounter.peer_id.in_(user_ids))),
+        (Notification, Notification.user_id.in_(user_ids)),
+        (NotificationCounter, NotificationCounter.user_id.in_(user_ids)),
+    ]
+    return tables
+
+
+def _media_paths(user_ids):
+    """Files on disk referenced by the users' posts and profile images."""
+    from api.posts import UPLOAD_FOLDER as POSTS_FOLDER
+    from api.profile import UPLOAD_FOLDER as PROFILE_FOLDER
+    paths = []
+    for model in (Post, ArchivedPost):
+        for (media_url,) in db.session.execute(
+            select(model.media_url).where(model.user_id.in_(user_ids), model.media_url.isnot(None))
+        ):
+            paths.append(os.path.join(POSTS_FOLDER, os.path.basename(media_url)))
+    for image_url, thumbnail_url in db.session.execute(
+        select(Profile.image_url, Profile.thumbnail_url).where(Profile.user_id.in_(user_ids))
+    ):
+        for url in (image_url, thumbnail_url):
+            if url:
+                paths.append(os.path.join(PROFILE_FOLDER, os.path.basename(urlparse(url).path)))
+    return paths
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _tombstone_match_vectors(user_ids):
+    """Write empty-terms tombstones for the users' profile vectors and commit."""
+    profile_ids = list(db.session.scalars(select(Profile.id).where(Profile.user_id.in_(user_ids))))
+    save_vectors('profile', {profile_id: {} for profile_id in profile_ids})
+    db.session.commit()
+
+
+def _delete_comment_threads(user_ids, batch_size):
+    """Delete the users' comments on other people's posts, with the replies below them.
+
+    Replies would otherwise keep a parent_id and path into comments that
+    are gone; delete_threads also repairs the counters.
+    """
+    own_posts = or_(
+        Comment.post_id.in_(select(Post.id).where(Post.user_id.in_(user_ids))),
+        Comment.post_id.in_(select(ArchivedPost.id).where(ArchivedPost.user_id.in_(user_ids))))
+    deleted = 0
+    while True:
+        # In path order a comment's subtree directly follows it
+        comments = db.session.execute(
+            select(Comment.post_id, Comment.path, Comment.parent_id)
+            .where(Comment.user_id.in_(user_ids), ~own_posts)
+            .order_by(Comment.path).limit(batch_size)).all()
+        if not comments:
+            break
+        tops = []
+        for comment in comments:
+            if not (tops and comment.path.startswith(tops[-1].path + '/')):
+                tops.append(comment)
+        deleted += delete_threads(tops)
+        db.session.commit()
+    return deleted
+
+
+def _delete_bounded(model, condition, batch_size):
+    """Delete matching rows in primary-key chunks, one short transaction each."""
+    pk = model.__mapper__.primary_key
+    table = model.__table__
+    deleted = 0
+    while True:
+        chunk = db.session.execute(select(*pk).where(condition).limit(batch_size)).all()
+        if not chunk:
+            break
+        if len(pk) == 1:
+            where = pk[0].in_([row[0] for row in chunk])
+        else:
+            where = or_(*[and_(*[column == value for column, value in zip(pk, row)])
+                          for row in chunk])
+        deleted += db.session.execute(table.delete().where(where)).rowcount
+        db.session.commit()
+        if len(chunk) < batch_size:
+            break
+    return deleted
+
+
+def count_user_data(user_query):
+    """Row counts a purge of user_query (a select of user ids) would remove."""
+    counts = {'users': db.session.scalar(select(func.count()).select_from(
+        user_query.subquery()))}
+    for model, condition in _dependent_tables(user_query):
+        counts[model.__tablename__] = db.session.scalar(
+            select(func.count()).select_from(model).where(condition))
+    counts['media_files'] = len(_media_paths(user_query))
+    return counts
+
+
+def purge_users(user_query, batch_size=DEFAULT_BATCH_SIZE, echo=None):
+    """Delete every user selected by user_query and everything they own.
+
+    user_query is a SELECT of user ids. It is re-run for each batch, so it
+    must not match users that are already gone. Returns the totals deleted
+    per table.
+    """
+    totals = {}
+    pending = []
+    with ThreadPoolExecutor(max_workers=4, thread_name_prefix='media-cleanup') as media_pool:
+        while True:
+            batch = list(db.session.scalars(
+                user_query.order_by(User.id).limit(batch_size)))
+            if not batch:
+                break
+            paths = _media_paths(batch)
+            _tombstone_match_vectors(batch)
+            totals['post_comments'] = totals.get('post_comments', 0) + \
+                _delete_comment_threads(batch, batch_size)
+            # Takes the likes off the posts' likes_count before they go
+            totals['post_likes'] = totals.get('post_likes', 0) + unlike_all(batch)
+            db.session.commit()
+            for model, condition in _dependent_tables(batch):
+                deleted = _delete_bounded(model, condition, batch_size)
+                totals[model.__tablename__] = totals.get(model.__tablename__, 0) + deleted
+            deleted = _delete_bounded(User, User.id.in_(batch), batch_size)
+            totals['users'] = totals.get('users', 0) + deleted
+            refresh_people_entries(batch)
+            bump('posts')
+            db.session.commit()
+            # Rows are committed; the files can go without holding any lock
+            pending.extend(media_pool.submit(_remove_file, path) for path in paths)
+            totals['media_files'] = totals.get('media_files', 0) + len(paths)
+            if echo:
+                echo(f"Deleted {totals['users']} users so far")
+        for future in pending:
+            future.result()
+    return totals
+
+
+def _select_users(identifiers):
+    """Resolve ids, usernames or emails into a SELECT of user ids."""
+    ids = [int(i) for i in identifiers if i.isdigit()]
+    names = [i for i in identifiers if not i.isdigit()]
+    return select(User.id).where(or_(
+        User.id.in_(ids), User.username.in_(names), User.email.in_([n.lower() for n in names])
+    ))
+
+
+def _report(counts, prefix):
+    for table, count in counts.items():
+        click.echo(f'{prefix} {count:>10} {table}')
+
+
+@users_cli.command('delete')
+@click.argument('identifiers', nargs=-1, required=True)
+@click.option('--dry-run', is_flag=True, help='Only count what would be deleted.')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True)
+def delete_command(identifiers, dry_run, batch_size):
+    """Delete users by id, username or email, with all their data."""
+    query = _select_users(identifiers)
+    if dry_run:
+        _report(count_user_data(query), 'would delete')
+        return
+    _report(purge_users(query, batch_size=batch_size), 'deleted')
+
+
+@users_cli.command('purge')
+@click.option('--all', 'purge_all', is_flag=True, help='Delete every user.')
+@click.option('--email-domain', help='Delete users whose email is at this domain.')
+@click.option('--dry-run', is_flag=True, help='Only count what would be deleted.')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True)
+@click.option('--yes', is_flag=True, help='Do not ask for confirmation.')
+def purge_command(purge_all, email_domain, dry_run, batch_size, yes):
+    """Delete a whole set of users (everyone, or one email domain)."""
+    if purge_all == bool(email_domain):
+        raise click.UsageError('Pass exactly one of --all or --email-domain.')
+    query = select(User.id)
+    if email_domain:
+        query = query.where(User.email.like(f'%@{email_domain.lower()}'))
+    counts = count_user_data(query)
+    if dry_run:
+        _report(counts, 'would delete')
+        return
+    if not yes:
+        click.confirm(f"Delete {counts['users']} users and all their data?", abort=True)
+    _report(purge_users(query, batch_size=batch_size, echo=click.echo), 'deleted')
@@ -0,0 +1,24 @@
+"""`flask worker`: run outbox jobs in the background (see tasks/)."""
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+@click.command('worker')
+@with_appcontext
+@click.option('--concurrency', type=int, help='Jobs run at once [WORKER_CONCURRENCY].')
+@click.option('--pool', type=click.Choice(['thread', 'process']),
+              help='Run jobs in threads or processes [WORKER_POOL].')
+@click.option('--poll-interval', type=float, help='Seconds between polls [WORKER_POLL_INTERVAL].')
+@click.option('--once', is_flag=True, help='Exit once no job is due.')
+def worker_command(concurrency, pool, poll_interval, once):
+    """Process queued and periodic background jobs."""
+    from tasks.runner import Worker
+    config = current_app.config
+    worker = Worker(current_app._get_current_object(),
+                    concurrency=concurrency or config['WORKER_CONCURRENCY'],
+                    pool=pool or config['WORKER_POOL'],
+                    poll_interval=poll_interval or config['WORKER_POLL_INTERVAL'],
+                    lease_seconds=config['WORKER_LEASE_SECONDS'],
+                    echo=click.echo)
+    worker.run(once=once)
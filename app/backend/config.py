@@ -8,6 +8,9 @@ class Config:
     # Database: Use absolute path for SQLite to avoid path resolution issues
     SQLALCHEMY_DATABASE_URI = 'sqlite:////home/nihitha/Nihi/app/backend/users.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Uploads
+    MAX_CONTENT_LENGTH = 5 * 1024 * 1024
     
     # JWT
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key')
@@ -16,6 +19,68 @@ class Config:
     # CORS
     CORS_HEADERS = 'Content-Type' 
 
+    # ASGI entry point (asgi.py)
+    ASGI_WSGI_WORKERS = int(os.environ.get('ASGI_WSGI_WORKERS', 16))
+    ASGI_IO_WORKERS = int(os.environ.get('ASGI_IO_WORKERS', 32))
+    ASGI_CPU_WORKERS = int(os.environ.get('ASGI_CPU_WORKERS', os.cpu_count() or 1))
+    MESSAGE_STREAM_POLL_INTERVAL = float(os.environ.get('MESSAGE_STREAM_POLL_INTERVAL', 1.0))
+
+    # Instrumentation (instrumentation.py), off by default
+    INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', '0') == '1'
+    QUERY_COUNT_WARNING = int(os.environ.get('QUERY_COUNT_WARNING', 0))  # 0 disables
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.0))
+    PROFILE_SLOW_REQUEST_MS = float(os.environ.get('PROFILE_SLOW_REQUEST_MS', 500))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+    PROFILER = os.environ.get('PROFILER', 'cprofile')  # or 'pyinstrument'
+
+    # Listing endpoints: largest page a client may ask for, and the page size
+    # from which list responses are streamed instead of built in one piece
+    POSTS_MAX_PER_PAGE = int(os.environ.get('POSTS_MAX_PER_PAGE', 100))
+    JSON_STREAM_MIN_ITEMS = int(os.environ.get('JSON_STREAM_MIN_ITEMS', 50))
+
+    # Response compression (http_cache.py); brotli needs the Brotli package
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', '1') == '1'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+
+    # Background jobs (`flask worker`, tasks/)
+    WORKER_CONCURRENCY = int(os.environ.get('WORKER_CONCURRENCY', 4))
+    WORKER_POOL = os.environ.get('WORKER_POOL', 'thread')  # or 'process'
+    WORKER_POLL_INTERVAL = float(os.environ.get('WORKER_POLL_INTERVAL', 1.0))
+    WORKER_LEASE_SECONDS = int(os.environ.get('WORKER_LEASE_SECONDS', 300))
+    OUTBOX_RETENTION_DAYS = int(os.environ.get('OUTBOX_RETENTION_DAYS', 7))
+
+    # Trending posts (models/trending.py): engagement loses half its weight per half-life
+    TRENDING_HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', 12))
+
+    # Idempotency-Key replays (idempotency.py)
+    IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 24 * 3600))
+    # An in_progress claim older than this is taken over by the next retry
+    IDEMPOTENCY_LEASE_SECONDS = int(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', 60))
+
+    # Online data migrations (backfills/): sleep between batches to leave room for live traffic
+    BACKFILL_PAUSE_SECONDS = float(os.environ.get('BACKFILL_PAUSE_SECONDS', 0.1))
+
+    # Hot/cold posts (models/archive.py): older posts move to posts_archive; 0 disables
+    POSTS_ARCHIVE_AFTER_DAYS = int(os.environ.get('POSTS_ARCHIVE_AFTER_DAYS', 365))
+
+    # Media previews (tasks/media.py)
+    FFMPEG_BINARY = os.environ.get('FFMPEG_BINARY', 'ffmpeg')
+    FFPROBE_BINARY = os.environ.get('FFPROBE_BINARY', 'ffprobe')
+    PDFTOPPM_BINARY = os.environ.get('PDFTOPPM_BINARY', 'pdftoppm')
+    MEDIA_PREVIEW_WIDTH = int(os.environ.get('MEDIA_PREVIEW_WIDTH', 640))
+    MEDIA_DERIVE_TIMEOUT = int(os.environ.get('MEDIA_DERIVE_TIMEOUT', 120))
+
+    # Job/candidate matching (matching.py): how stale a process's index may get
+    MATCH_SYNC_SECONDS = float(os.environ.get('MATCH_SYNC_SECONDS', 5))
+    # People autocomplete (people_index.py): how stale a process's index may get
+    PEOPLE_INDEX_SYNC_SECONDS = float(os.environ.get('PEOPLE_INDEX_SYNC_SECONDS', 2))
+
     # Documentation:
     # - To use MySQL, set the DATABASE_URL environment variable.
-    # - For local development, SQLite will be used if MySQL is not available. 
\ No newline at end of file
+    # - For local development, SQLite will be used if MySQL is not available.
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
@@ -1,8 +1,11 @@
 from models import db
 from models.user import User
-from main import app
+from main import create_app
 from werkzeug.security import generate_password_hash
 
+# Scripts only need the database, not the routes
+app = create_app(blueprints=())
+
 def create_test_user():
     with app.app_context():
         # Check if user already exists
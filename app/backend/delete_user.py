@@ -1,13 +1,16 @@
-from models import db
+from sqlalchemy import select
 from models.user import User
-from main import app
+from main import create_app
+from commands.users import purge_users
+
+# Scripts only need the database, not the routes
+app = create_app(blueprints=())
 
 def delete_user(username):
     with app.app_context():
-        user = User.query.filter_by(username=username).first()
-        if user:
-            db.session.delete(user)
-            db.session.commit()
+        # Same as `flask users delete <username>`
+        totals = purge_users(select(User.id).where(User.username == username))
+        if totals.get('users'):
             print(f'User "{username}" deleted successfully')
         else:
             print(f'User "{username}" not found')
@@ -38,7 +38,17 @@ def reset_database():
         from models.profile import Profile, Skill, Experience, Education
         from models import Post
         from models.job import Job
-        from models.message import Message
+        from models.message import Message, UnreadCounter
+        from models.outbox import OutboxJob
+        from models.notification import Notification, NotificationCounter
+        from models.comment import Comment
+        from models.engagement import PostLike
+        from models.match_vector import MatchVector
+        from models.people_search import PeopleSearchEntry
+        from models.idempotency import IdempotencyRecord
+        from models.backfill import BackfillCheckpoint
+        from models.archive import ArchivedPost
+        from models.generation import Generation
         
         print("📋 Dropping all existing tables...")
         
@@ -1,16 +1,18 @@
+from sqlalchemy import select
 from models import db
 from models.user import User
-from main import app
+from main import create_app
+from commands.users import purge_users
 from werkzeug.security import generate_password_hash
 
+# Scripts only need the database, not the routes
+app = create_app(blueprints=())
+
 def fix_login():
     with app.app_context():
         # Clear all existing users first
-        users = User.query.all()
-        for user in users:
-            db.session.delete(user)
-        db.session.commit()
-        print(f"Cleared {len(users)} existing users")
+        totals = purge_users(select(User.id))
+        print(f"Cleared {totals.get('users', 0)} existing users")
         
         # Create the user you want to test
         username = 'testuser'
@@ -0,0 +1,110 @@
+"""Response compression and conditional GET.
+
+init_compression(app) compresses JSON and text responses above
+COMPRESS_MIN_SIZE with brotli (if the Brotli package is installed) or gzip,
+whichever the client accepts. Streamed responses are compressed chunk by
+chunk.
+
+@conditional(version) gives a view a weak ETag built from a cheap version
+token (e.g. count and max(id) of the rows it lists) plus the request path
+and query string. If-None-Match is checked before the view runs, so a
+matching poll costs one aggregate query and never serializes anything.
+"""
+import gzip
+import hashlib
+import zlib
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/javascript', 'text/html',
+                          'text/plain', 'text/css', 'text/csv', 'application/x-ndjson'}
+
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted.quality('br') > 0:
+        return 'br'
+    if accepted.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def _compress_stream(chunks, encoding, level):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=current_app.config['COMPRESS_BROTLI_QUALITY'])
+        for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compress_response(response):
+    config = current_app.config
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'no-transform' in response.headers.get('Cache-Control', '')):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.iter_encoded(), encoding,
+                                             config['COMPRESS_LEVEL'])
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < config['COMPRESS_MIN_SIZE']:
+            return response
+        if encoding == 'br':
+            body = brotli.compress(body, quality=config['COMPRESS_BROTLI_QUALITY'])
+        else:
+            body = gzip.compress(body, compresslevel=config['COMPRESS_LEVEL'], mtime=0)
+        response.set_data(body)
+    # Weak ETags stay as they are: every encoding is semantically the same
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
+
+
+def conditional(version):
+    """Weak ETag + If-None-Match handling for a GET view.
+
+    version is called inside the request, before the view, and returns any
+    repr()-able token that changes whenever the response would.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            token = repr((request.full_path, version()))
+            etag = hashlib.blake2b(token.encode(), digest_size=12).hexdigest()
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag, weak=True)
+                response.vary.add('Accept-Encoding')
+                return response
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag, weak=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,150 @@
+"""Idempotency-Key support for non-idempotent endpoints (e.g. create_post).
+
+A client that may retry (flaky mobile networks) sends a unique
+Idempotency-Key with each logical request. @idempotent claims the key in
+the view's own transaction, so it commits together with whatever the view
+writes, then records the response. A retry with the same key gets that
+response back (with Idempotent-Replayed: true) instead of running the view
+again; one arriving while the first is still running gets 409. Reusing a
+key for a different request is a 422. Keys expire after
+IDEMPOTENCY_TTL_SECONDS. Requests without the header are unaffected.
+
+Keys are scoped to the endpoint and, when the request carries a JWT, the
+user it authenticates, so two users who pick the same key never see each
+other's responses. Unauthenticated requests share the endpoint's scope;
+the fingerprint still turns a collision into a 422 rather than a replay.
+
+The response is recorded in a second transaction, after the view's. A
+process that dies in between leaves its claim in_progress. Claims older
+than IDEMPOTENCY_LEASE_SECONDS are therefore taken over by the next retry,
+which runs the view again, rather than answering 409 until the key expires.
+Running the view again may repeat its effects.
+"""
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+from models import db, insert_or_ignore
+from models.idempotency import IdempotencyRecord
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint():
+    """Hash of what the request asks for, stable across client retries.
+
+    Multipart bodies are hashed by their parsed fields and file contents,
+    since clients may pick a new boundary on each retry.
+    """
+    digest = hashlib.sha256(f'{request.method} {request.path}'.encode())
+    if request.form or request.files:
+        for name, value in sorted(request.form.items(multi=True)):
+            digest.update(f'\0{name}={value}'.encode())
+        for name, file in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+            digest.update(f'\0{name}:{file.filename}:'.encode())
+            for block in iter(lambda: file.stream.read(1024 * 1024), b''):
+                digest.update(block)
+            file.stream.seek(0)
+    else:
+        digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _scope():
+    """The endpoint, qualified by the authenticated user if there is one."""
+    verify_jwt_in_request(optional=True)
+    identity = get_jwt_identity()
+    return request.endpoint if identity is None else f'{request.endpoint}:{identity}'
+
+
+def _record(scope, key):
+    return IdempotencyRecord.query.filter_by(scope=scope, key=key).first()
+
+
+def _take_over(record, now):
+    """Claim a key whose in_progress claim outlived its lease; True if this request won it."""
+    lease = timedelta(seconds=current_app.config['IDEMPOTENCY_LEASE_SECONDS'])
+    if record.created_at > now - lease:
+        return False
+    # Conditional on the stale claim, so only one of several retries wins
+    return IdempotencyRecord.query.filter_by(
+        id=record.id, status='in_progress', created_at=record.created_at,
+    ).update({'created_at': now, 'expires_at': now + timedelta(
+        seconds=current_app.config['IDEMPOTENCY_TTL_SECONDS'])},
+        synchronize_session=False) == 1
+
+
+def _replay(record):
+    response = current_app.response_class(record.response_body, status=record.response_status,
+                                          mimetype=record.response_mimetype)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _store(scope, key, fingerprint, response, now):
+    values = {'status': 'done', 'response_status': response.status_code,
+              'response_mimetype': response.mimetype, 'response_body': response.get_data()}
+    # The view may have rolled back the claim along with its own work
+    updated = IdempotencyRecord.query.filter_by(scope=scope, key=key).update(
+        values, synchronize_session=False)
+    if not updated:
+        insert_or_ignore(IdempotencyRecord, dict(
+            values, scope=scope, key=key, fingerprint=fingerprint, created_at=now,
+            expires_at=now + timedelta(seconds=current_app.config['IDEMPOTENCY_TTL_SECONDS'])))
+    db.session.commit()
+
+
+def _release(scope, key):
+    """Free the key after a failure, so the client's retry runs the view again."""
+    db.session.rollback()
+    IdempotencyRecord.query.filter_by(scope=scope, key=key).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def idempotent(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters.'}), 400
+        scope = _scope()
+        fingerprint = _fingerprint()
+        now = datetime.utcnow()
+        IdempotencyRecord.query.filter(
+            IdempotencyRecord.scope == scope, IdempotencyRecord.key == key,
+            IdempotencyRecord.expires_at < now).delete(synchronize_session=False)
+        claimed = insert_or_ignore(IdempotencyRecord, {
+            'scope': scope, 'key': key, 'fingerprint': fingerprint, 'status': 'in_progress',
+            'created_at': now,
+            'expires_at': now + timedelta(seconds=current_app.config['IDEMPOTENCY_TTL_SECONDS'])})
+        if not claimed:
+            record = _record(scope, key)
+            if record.fingerprint != fingerprint:
+                db.session.rollback()
+                return jsonify({'error': f'{HEADER} was already used for a different request.'}), 422
+            if record.status == 'done':
+                response = _replay(record)
+                db.session.rollback()
+                return response
+            if not _take_over(record, now):
+                db.session.rollback()
+                response = jsonify({'error': 'A request with this key is still in progress.'})
+                response.headers['Retry-After'] = '1'
+                return response, 409
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            _release(scope, key)
+            raise
+        if response.status_code >= 500 or response.is_streamed:
+            _release(scope, key)
+            return response
+        _store(scope, key, fingerprint, response, now)
+        return response
+    return wrapper
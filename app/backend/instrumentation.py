@@ -0,0 +1,246 @@
+"""Opt-in request instrumentation.
+
+Enable with INSTRUMENTATION_ENABLED=1. For every request this records wall
+time, SQL statement count and time (via SQLAlchemy cursor events) and any
+blocks wrapped in timed() (PIL work, file I/O). Results are exposed as a
+Server-Timing header per response and as Prometheus text on /metrics.
+
+Slow requests can be profiled: with PROFILE_SAMPLE_RATE > 0 a fraction of
+requests run under cProfile (or pyinstrument, if PROFILER=pyinstrument and
+it is installed), and the profile is written to PROFILE_DIR when the request
+takes longer than PROFILE_SLOW_REQUEST_MS.
+
+Metrics are kept in-process; with several workers each one reports its own.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Blueprint, Response, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+metrics_bp = Blueprint('metrics', __name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MetricsRegistry:
+    """Minimal thread-safe counters and histograms in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def inc(self, name, labels, value=1.0):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            buckets, total, count = self._histograms.get(key, ([0] * len(DURATION_BUCKETS), 0.0, 0))
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    buckets[i] += 1
+            self._histograms[key] = (buckets, total + value, count + 1)
+
+    def render(self):
+        def fmt(labels):
+            if not labels:
+                return ''
+            return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: (list(b), t, c) for k, (b, t, c) in self._histograms.items()}
+        lines = []
+        for name, (kind, text) in sorted(self._help.items()):
+            lines.append(f'# HELP {name} {text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f'{name}{fmt(labels)} {value}')
+            else:
+                for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, bucket_count in zip(DURATION_BUCKETS, buckets):
+                        lines.append(f'{name}_bucket{fmt(labels + (("le", bound),))} {bucket_count}')
+                    lines.append(f'{name}_bucket{fmt(labels + (("le", "+Inf"),))} {count}')
+                    lines.append(f'{name}_sum{fmt(labels)} {total}')
+                    lines.append(f'{name}_count{fmt(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = MetricsRegistry()
+metrics.describe('http_requests_total', 'counter', 'HTTP requests handled.')
+metrics.describe('http_request_duration_seconds', 'histogram', 'Request wall time.')
+metrics.describe('db_queries_total', 'counter', 'SQL statements executed.')
+metrics.describe('db_query_duration_seconds_total', 'counter', 'Time spent executing SQL.')
+metrics.describe('io_duration_seconds_total', 'counter', 'Time spent in timed() blocks.')
+
+
+def _current():
+    """The per-request timing record, or None outside an instrumented request."""
+    if not has_app_context():
+        return None
+    return g.get('_instrumentation')
+
+
+@contextmanager
+def timed(kind):
+    """Attribute the wrapped block to `kind` (e.g. 'pil', 'io') for this request.
+
+    Safe to use unconditionally: it does nothing when instrumentation is off.
+    """
+    record = _current()
+    if record is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record['timings'][kind] = record['timings'].get(kind, 0.0) + time.perf_counter() - start
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_instrumentation_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('_instrumentation_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    record = _current()
+    if record is not None:
+        record['sql_count'] += 1
+        record['sql_time'] += elapsed
+
+
+_listeners_installed = False
+
+
+def _install_sql_listeners():
+    global _listeners_installed
+    if not _listeners_installed:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listeners_installed = True
+
+
+def _start_profiler(app):
+    if app.config['PROFILER'] == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning('pyinstrument is not installed; falling back to cProfile')
+        else:
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _dump_profile(app, profiler, elapsed):
+    endpoint = (request.endpoint or 'unknown').replace('.', '_')
+    stem = f"{int(time.time() * 1000)}_{endpoint}_{int(elapsed * 1000)}ms"
+    os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+    if hasattr(profiler, 'output_html'):
+        path = os.path.join(app.config['PROFILE_DIR'], stem + '.html')
+        with open(path, 'w') as handle:
+            handle.write(profiler.output_html())
+    else:
+        path = os.path.join(app.config['PROFILE_DIR'], stem + '.prof')
+        profiler.dump_stats(path)
+    logger.info('Slow request profile written to %s', path)
+
+
+def _stop_profiler(profiler):
+    if hasattr(profiler, 'stop'):
+        profiler.stop()
+    else:
+        profiler.disable()
+
+
+def _server_timing(record, elapsed):
+    parts = [f'app;dur={elapsed * 1000:.1f}',
+             f'db;dur={record["sql_time"] * 1000:.1f};desc="{record["sql_count"]} queries"']
+    for kind, seconds in sorted(record['timings'].items()):
+        parts.append(f'{kind};dur={seconds * 1000:.1f}')
+    return ', '.join(parts)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_instrumentation(app):
+    """Attach timing hooks, the SQL listeners and /metrics to the app."""
+    _install_sql_listeners()
+    app.register_blueprint(metrics_bp)
+
+    @app.before_request
+    def _start_request():
+        g._instrumentation = {'start': time.perf_counter(), 'sql_count': 0,
+                              'sql_time': 0.0, 'timings': {}, 'profiler': None}
+        if random.random() < app.config['PROFILE_SAMPLE_RATE']:
+            g._instrumentation['profiler'] = _start_profiler(app)
+
+    @app.after_request
+    def _finish_request(response):
+        record = g.pop('_instrumentation', None)
+        if record is None:
+            return response
+        elapsed = time.perf_counter() - record['start']
+        profiler = record['profiler']
+        if profiler is not None:
+            _stop_profiler(profiler)
+            if elapsed * 1000 >= app.config['PROFILE_SLOW_REQUEST_MS']:
+                _dump_profile(app, profiler, elapsed)
+
+        endpoint = request.endpoint or 'unmatched'
+        metrics.inc('http_requests_total', {'method': request.method, 'endpoint': endpoint,
+                                            'status': response.status_code})
+        metrics.observe('http_request_duration_seconds', {'endpoint': endpoint}, elapsed)
+        metrics.inc('db_queries_total', {'endpoint': endpoint}, record['sql_count'])
+        metrics.inc('db_query_duration_seconds_total', {'endpoint': endpoint}, record['sql_time'])
+        for kind, seconds in record['timings'].items():
+            metrics.inc('io_duration_seconds_total', {'endpoint': endpoint, 'kind': kind}, seconds)
+
+        threshold = app.config['QUERY_COUNT_WARNING']
+        if threshold and record['sql_count'] > threshold:
+            logger.warning('%s %s ran %d SQL queries (threshold %d)', request.method,
+                           request.path, record['sql_count'], threshold)
+
+        response.headers['Server-Timing'] = _server_timing(record, elapsed)
+        return response
+
+    @app.teardown_request
+    def _abort_request(exc):
+        # after_request is skipped on unhandled errors; never leave a profiler running
+        record = g.pop('_instrumentation', None)
+        if record is not None and record['profiler'] is not None:
+            _stop_profiler(record['profiler'])
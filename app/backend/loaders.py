@@ -0,0 +1,118 @@
+"""Request-scoped batching and caching of related-object lookups.
+
+Serializers call loader('user').load(user_id) instead of following a
+relationship per object. A loader collects keys, resolves them with one
+IN (...) query per batch, and caches the results for the rest of the
+request (or app context), so repeated lookups cost nothing:
+
+    users = loader('user')
+    users.prime(p.user_id for p in posts)   # nothing queried yet
+    users.load(posts[0].user_id)            # one query for every primed id
+    users.load(posts[1].user_id)            # cached
+
+Schema fields declared with Related (serializers.py) do the priming for a
+whole page automatically, so endpoints that serialize through a schema are
+protected from N+1 queries without extra code. New entity types are added
+with @batch_loader.
+
+Cached objects are not refreshed: a handler that changes related rows
+after loading them should serialize what it wrote, not reload it.
+"""
+from collections import defaultdict
+
+from flask import g
+
+LOADERS = {}
+
+
+def batch_loader(name, default=None):
+    """Register fetch(keys) -> {key: value} as the loader called name.
+
+    default() supplies the value for keys fetch did not return (None if
+    not given).
+    """
+    def register(fetch):
+        LOADERS[name] = (fetch, default)
+        return fetch
+    return register
+
+
+class Loader:
+    def __init__(self, fetch, default=None):
+        self.fetch = fetch
+        self.default = default
+        self.cache = {}
+        self.pending = set()
+
+    def prime(self, keys):
+        """Queue keys for the next batch without querying yet."""
+        self.pending.update(key for key in keys if key is not None and key not in self.cache)
+
+    def load(self, key):
+        if key is None:
+            return self.default() if self.default else None
+        if key not in self.cache:
+            self.pending.add(key)
+            self._dispatch()
+        return self.cache[key]
+
+    def load_many(self, keys):
+        keys = list(keys)
+        self.prime(keys)
+        return [self.load(key) for key in keys]
+
+    def _dispatch(self):
+        keys, self.pending = self.pending, set()
+        found = self.fetch(keys)
+        for key in keys:
+            self.cache[key] = found[key] if key in found else (self.default() if self.default else None)
+
+
+def loader(name):
+    """The current request's loader called name."""
+    loaders = g.setdefault('_loaders', {})
+    if name not in loaders:
+        fetch, default = LOADERS[name]
+        loaders[name] = Loader(fetch, default)
+    return loaders[name]
+
+
+def _grouped(model, key_column, keys, order_by=None):
+    query = model.query.filter(key_column.in_(keys))
+    if order_by is not None:
+        query = query.order_by(order_by)
+    groups = defaultdict(list)
+    for obj in query:
+        groups[getattr(obj, key_column.key)].append(obj)
+    return groups
+
+
+@batch_loader('user')
+def _users(ids):
+    from models.user import User
+    return {user.id: user for user in User.query.filter(User.id.in_(ids))}
+
+
+@batch_loader('profile_for_user')
+def _profiles_for_users(user_ids):
+    from models.profile import Profile
+    return {profile.user_id: profile
+            for profile in Profile.query.filter(Profile.user_id.in_(user_ids))}
+
+
+@batch_loader('skills_for_profile', default=list)
+def _skills(profile_ids):
+    from models.profile import Skill
+    return _grouped(Skill, Skill.profile_id, profile_ids, Skill.id)
+
+
+@batch_loader('experiences_for_profile', default=list)
+def _experiences(profile_ids):
+    from models.profile import Experience
+    return _grouped(Experience, Experience.profile_id, profile_ids, Experience.id)
+
+
+@batch_loader('educations_for_profile', default=list)
+def _educations(profile_ids):
+    from models.profile import Education
+    return _grouped(Education, Education.profile_id, profile_ids, Education.id)
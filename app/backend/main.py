@@ -1,3 +1,4 @@
+from importlib import import_module
 from flask import Flask
 from flask_migrate import Migrate
 from flask_cors import CORS
@@ -8,56 +9,105 @@ except ImportError:
 from dotenv import load_dotenv
 from models import db
 from flask_jwt_extended import JWTManager
+from serializers import OrjsonProvider
 
 # Load environment variables
 load_dotenv()
 
-# Create Flask app
-app = Flask(__name__)
-app.config.from_object(Config)
-app.config['MAX_CONTENT_LENGTH'] = 5 * 1024 * 1024
-
-# Initialize extensions
-CORS(app)
-db.init_app(app)
-migrate = Migrate(app, db)
-jwt = JWTManager(app)
-
-# Import models (after db is initialized)
-from models.user import User
-from models.profile import Profile, Skill, Experience, Education
-from models import Post
-
-# Register auth blueprint and limiter
-from api.auth import auth_bp, limiter
-app.register_blueprint(auth_bp)
-limiter.init_app(app)
-
-# Register all other blueprints
-from api.profile import profile_bp
-from api.posts import posts_bp
-from api.feed import feed_bp
-from api.jobs import jobs_bp
-from api.messaging import messaging_bp
-
-app.register_blueprint(profile_bp)
-app.register_blueprint(posts_bp, url_prefix='/posts')
-app.register_blueprint(feed_bp)
-app.register_blueprint(jobs_bp)
-app.register_blueprint(messaging_bp)
-
-def setup_database():
+migrate = Migrate()
+jwt = JWTManager()
+
+# name -> (module, blueprint attribute, url_prefix)
+# Modules are only imported when their blueprint is requested, so scripts
+# that just need the database never pay for PIL or the route modules.
+BLUEPRINTS = {
+    'auth': ('api.auth', 'auth_bp', None),
+    'profile': ('api.profile', 'profile_bp', None),
+    'posts': ('api.posts', 'posts_bp', '/posts'),
+    'comments': ('api.comments', 'comments_bp', '/posts'),
+    'feed': ('api.feed', 'feed_bp', None),
+    'jobs': ('api.jobs', 'jobs_bp', None),
+    'search': ('api.search', 'search_bp', None),
+    'messaging': ('api.messaging', 'messaging_bp', None),
+    'notifications': ('api.notifications', 'notifications_bp', None),
+}
+
+def create_app(config_object=Config, blueprints=None):
+    """Application factory.
+
+    config_object: class or object passed to app.config.from_object.
+    blueprints: iterable of names from BLUEPRINTS to register; None means all,
+    an empty tuple gives a bare app with only the database set up.
+
+    Nothing here touches the database or the filesystem beyond what the
+    selected blueprints need, so it is safe to call under gunicorn --preload
+    and let workers fork from the warmed-up master.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config_object)
+    app.json = OrjsonProvider(app)
+
+    # Initialize extensions
+    CORS(app)
+    db.init_app(app)
+    migrate.init_app(app, db)
+    jwt.init_app(app)
+
+    # Import models so they are registered on the metadata
+    import models.user  # noqa: F401
+    import models.profile  # noqa: F401
+    import models.job  # noqa: F401
+    import models.message  # noqa: F401
+    import models.outbox  # noqa: F401
+    import models.notification  # noqa: F401
+    import models.comment  # noqa: F401
+    import models.engagement  # noqa: F401
+    import models.match_vector  # noqa: F401
+    import models.people_search  # noqa: F401
+    import models.idempotency  # noqa: F401
+    import models.backfill  # noqa: F401
+    import models.archive  # noqa: F401
+    import models.generation  # noqa: F401
+
+    names = BLUEPRINTS if blueprints is None else blueprints
+    for name in names:
+        module_name, attr, url_prefix = BLUEPRINTS[name]
+        module = import_module(module_name)
+        app.register_blueprint(getattr(module, attr), url_prefix=url_prefix)
+        if name == 'auth':
+            module.limiter.init_app(app)
+
+    from commands import register_commands
+    register_commands(app)
+
+    if app.config.get('COMPRESS_ENABLED'):
+        from http_cache import init_compression
+        init_compression(app)
+
+    if app.config.get('INSTRUMENTATION_ENABLED'):
+        from instrumentation import init_instrumentation
+        init_instrumentation(app)
+
+    return app
+
+def setup_database(app):
     """Setup database tables"""
     with app.app_context():
         db.create_all()
         print("✅ Database tables created successfully!")
 
-def create_app():
-    """Application factory function"""
-    return app
+def __getattr__(name):
+    # Backwards compatibility for `from main import app`: the default app is
+    # only built the first time someone asks for it, not at import time.
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
+    app = create_app()
     # Setup database tables
-    setup_database()
+    setup_database(app)
     # Run the app
-    app.run(debug=True) 
\ No newline at end of file
+    app.run(debug=True)
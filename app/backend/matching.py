@@ -0,0 +1,360 @@
+"""Job <-> candidate matching over profile skills, experience and education.
+
+Profiles and jobs are turned into weighted terms (skills count most) and
+stored in match_vectors whenever they change. Each process keeps an
+in-memory index built from that table: per side (profiles, jobs) a sparse
+TF-IDF matrix with L2-normalised rows, held column-major so every column is
+the posting list of one term. Scoring a query only reads the postings of
+the query's own terms (usually a few dozen), which keeps top-K cosine
+matches over a million profiles in the tens of milliseconds.
+
+Changes reach the index incrementally: every MATCH_SYNC_SECONDS the index
+reads the match_vectors rows updated since its last sync and keeps them in
+a small delta, masking their old rows. Once the delta grows past
+COMPACT_THRESHOLD it is merged into the matrix on a background thread,
+from a snapshot, while requests keep using the old side; changes synced
+in the meantime are replayed onto the new side when it is swapped in. IDF
+weights are fixed when the index is loaded; terms first seen afterwards
+get the highest IDF.
+
+The index is loaded when the server starts (warm_index, called from the
+ASGI lifespan), so no request pays for it; a process without that hook
+loads it on first use.
+"""
+import re
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from flask import current_app
+from scipy import sparse
+
+from models import db
+from models.job import Job
+from models.match_vector import MatchVector, save_vectors
+from models.profile import Profile, Skill, Experience, Education
+
+TOKEN_RE = re.compile(r'[a-z0-9][a-z0-9+#]*')
+STOPWORDS = frozenset('an and are as at be by for from in is of on or the to we with you'.split())
+
+# Term weight per source field
+PROFILE_WEIGHTS = {'skill': 3.0, 'title': 1.5, 'field_of_study': 1.0, 'degree': 0.5,
+                   'experience': 0.5, 'bio': 0.5}
+JOB_WEIGHTS = {'title': 2.0, 'description': 1.0}
+
+# Delta entries scored one by one before they are merged into the matrix
+COMPACT_THRESHOLD = 2000
+# Re-read this much before the sync watermark, for transactions that
+# committed late with an earlier updated_at; re-applying a row is harmless
+SYNC_OVERLAP = timedelta(seconds=30)
+REBUILD_BATCH_SIZE = 1000
+
+
+def tokens(text):
+    if not text:
+        return []
+    return [t for t in TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def _add(terms, text, weight):
+    for token in tokens(text):
+        terms[token] = terms.get(token, 0.0) + weight
+
+
+def profile_terms(profile_ids):
+    """{profile_id: {term: weight}} for existing profiles, in four queries."""
+    terms = {}
+    for profile_id, bio in db.session.query(Profile.id, Profile.bio).filter(
+            Profile.id.in_(profile_ids)):
+        terms[profile_id] = {}
+        _add(terms[profile_id], bio, PROFILE_WEIGHTS['bio'])
+    for profile_id, name in db.session.query(Skill.profile_id, Skill.name).filter(
+            Skill.profile_id.in_(profile_ids)):
+        _add(terms[profile_id], name, PROFILE_WEIGHTS['skill'])
+    for profile_id, title, description in db.session.query(
+            Experience.profile_id, Experience.title, Experience.description).filter(
+            Experience.profile_id.in_(profile_ids)):
+        _add(terms[profile_id], title, PROFILE_WEIGHTS['title'])
+        _add(terms[profile_id], description, PROFILE_WEIGHTS['experience'])
+    for profile_id, degree, field in db.session.query(
+            Education.profile_id, Education.degree, Education.field_of_study).filter(
+            Education.profile_id.in_(profile_ids)):
+        _add(terms[profile_id], degree, PROFILE_WEIGHTS['degree'])
+        _add(terms[profile_id], field, PROFILE_WEIGHTS['field_of_study'])
+    return terms
+
+
+def job_terms(job_ids):
+    """{job_id: {term: weight}} for existing jobs."""
+    terms = {}
+    for job_id, title, description in db.session.query(
+            Job.id, Job.title, Job.description).filter(Job.id.in_(job_ids)):
+        terms[job_id] = {}
+        _add(terms[job_id], title, JOB_WEIGHTS['title'])
+        _add(terms[job_id], description, JOB_WEIGHTS['description'])
+    return terms
+
+
+def refresh_profile_vectors(profile_ids):
+    """Recompute profile vectors, in the caller's transaction; missing profiles get tombstones."""
+    terms = profile_terms(profile_ids)
+    save_vectors('profile', {pid: terms.get(pid, {}) for pid in profile_ids})
+
+
+def refresh_job_vectors(job_ids):
+    """Recompute job vectors, in the caller's transaction; missing jobs get tombstones."""
+    terms = job_terms(job_ids)
+    save_vectors('job', {job_id: terms.get(job_id, {}) for job_id in job_ids})
+
+
+def rebuild_vectors(batch_size=REBUILD_BATCH_SIZE, echo=None):
+    """Recompute every profile and job vector, committing per batch."""
+    counts = {}
+    for kind, model, refresh in (('profile', Profile, refresh_profile_vectors),
+                                 ('job', Job, refresh_job_vectors)):
+        counts[kind] = 0
+        last_id = 0
+        while True:
+            ids = [row[0] for row in db.session.query(model.id).filter(
+                model.id > last_id).order_by(model.id).limit(batch_size)]
+            if not ids:
+                break
+            refresh(ids)
+            db.session.commit()
+            counts[kind] += len(ids)
+            last_id = ids[-1]
+        if echo:
+            echo(f'{kind}: {counts[kind]} vectors')
+    return counts
+
+
+class _Side:
+    """All vectors of one kind: a CSC matrix plus a delta of recent changes."""
+
+    def __init__(self, ids, matrix):
+        self.ids = ids  # entity id of each row, ascending
+        self.matrix = matrix
+        self.dead = set()  # rows superseded by the delta
+        self.delta = {}  # entity_id -> (cols, vals)
+
+    def _row(self, entity_id):
+        row = int(np.searchsorted(self.ids, entity_id))
+        if row < len(self.ids) and self.ids[row] == entity_id:
+            return row
+        return None
+
+    def _dead_rows(self):
+        return np.fromiter(self.dead, dtype=np.int64, count=len(self.dead))
+
+    def replace(self, entity_id, cols, vals):
+        row = self._row(entity_id)
+        if row is not None:
+            self.dead.add(row)
+        if len(cols):
+            self.delta[entity_id] = (cols, vals)
+        else:
+            self.delta.pop(entity_id, None)
+
+    def top_k(self, cols, vals, k):
+        """[(entity_id, cosine)] of the k best matches, best first."""
+        known = cols < self.matrix.shape[1]
+        results = []
+        if known.any() and len(self.ids):
+            scores = self.matrix[:, cols[known]] @ vals[known]
+            scores[self._dead_rows()] = 0.0
+            hits = np.flatnonzero(scores > 0)
+            if len(hits) > k:
+                hits = hits[np.argpartition(scores[hits], -k)[-k:]]
+            results = list(zip(self.ids[hits].tolist(), scores[hits].tolist()))
+        if self.delta:
+            query = dict(zip(cols.tolist(), vals.tolist()))
+            for entity_id, (dcols, dvals) in self.delta.items():
+                score = sum(query.get(c, 0.0) * v for c, v in zip(dcols.tolist(), dvals.tolist()))
+                if score > 0:
+                    results.append((entity_id, score))
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:k]
+
+    def compacted(self, n_terms):
+        """A new side with the delta merged into the matrix."""
+        alive = np.ones(len(self.ids), dtype=bool)
+        alive[self._dead_rows()] = False
+        base = self.matrix.tocsr()[alive]
+        base.resize((base.shape[0], n_terms))
+        ids = [self.ids[alive]]
+        rows = [base]
+        if self.delta:
+            delta_ids = np.fromiter(self.delta, dtype=np.int64, count=len(self.delta))
+            rows.append(_csr([self.delta[e] for e in delta_ids.tolist()], n_terms))
+            ids.append(delta_ids)
+        ids = np.concatenate(ids)
+        order = np.argsort(ids, kind='stable')
+        return _Side(ids[order], sparse.vstack(rows, format='csr')[order].tocsc())
+
+
+def _csr(vectors, n_terms):
+    lengths = [len(cols) for cols, _ in vectors]
+    indptr = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+    indices = np.concatenate([cols for cols, _ in vectors]) if vectors else np.zeros(0, np.int64)
+    data = np.concatenate([vals for _, vals in vectors]) if vectors else np.zeros(0)
+    return sparse.csr_matrix((data, indices, indptr), shape=(len(vectors), n_terms))
+
+
+class MatchIndex:
+    """In-memory TF-IDF index over match_vectors for one app (database)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.vocab = {}
+        self.idf = np.zeros(0)
+        self.sides = {}
+        self.watermark = None
+        self.synced_at = 0.0
+        # kind -> changes synced while that side is being compacted
+        self.replays = {}
+        self.compactor = None
+
+    def load(self):
+        """Build both sides from the whole match_vectors table."""
+        vocab = {}
+        df = []
+        rows = {'profile': ([], [], []), 'job': ([], [], [])}  # ids, cols, weights
+        watermark = None
+        query = db.session.query(MatchVector.kind, MatchVector.entity_id, MatchVector.terms,
+                                 MatchVector.updated_at).order_by(MatchVector.entity_id)
+        for kind, entity_id, terms, updated_at in query.yield_per(10000):
+            watermark = updated_at if watermark is None else max(watermark, updated_at)
+            if not terms:
+                continue
+            cols = []
+            for term in terms:
+                col = vocab.setdefault(term, len(vocab))
+                if col == len(df):
+                    df.append(0)
+                df[col] += 1
+                cols.append(col)
+            ids, all_cols, weights = rows[kind]
+            ids.append(entity_id)
+            all_cols.append(np.array(cols, dtype=np.int64))
+            weights.append(np.fromiter(terms.values(), dtype=np.float64, count=len(terms)))
+        n_docs = sum(len(ids) for ids, _, _ in rows.values())
+        self.vocab = vocab
+        self.idf = np.log((n_docs + 1) / (np.array(df, dtype=np.float64) + 1)) + 1
+        self.sides = {kind: _Side(np.array(ids, dtype=np.int64),
+                                  self._matrix(all_cols, weights).tocsc())
+                      for kind, (ids, all_cols, weights) in rows.items()}
+        self.watermark = watermark
+        self.synced_at = time.monotonic()
+
+    def _matrix(self, all_cols, weights):
+        if not all_cols:
+            return sparse.csr_matrix((0, len(self.vocab)))
+        lengths = np.fromiter((len(c) for c in all_cols), dtype=np.int64, count=len(all_cols))
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        indices = np.concatenate(all_cols)
+        data = np.log1p(np.concatenate(weights)) * self.idf[indices]
+        norms = np.sqrt(np.add.reduceat(data * data, indptr[:-1]))
+        data /= np.repeat(norms, lengths)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(all_cols), len(self.vocab)))
+
+    def vectorize(self, terms):
+        """Sorted column ids and normalised TF-IDF weights for a terms dict."""
+        if not terms:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        new_idf = float(self.idf.max()) if len(self.idf) else 1.0
+        cols = []
+        for term in terms:
+            col = self.vocab.get(term)
+            if col is None:
+                col = self.vocab[term] = len(self.vocab)
+                self.idf = np.append(self.idf, new_idf)
+            cols.append(col)
+        cols = np.array(cols, dtype=np.int64)
+        vals = np.log1p(np.fromiter(terms.values(), dtype=np.float64, count=len(terms))) * self.idf[cols]
+        vals /= np.linalg.norm(vals)
+        order = np.argsort(cols)
+        return cols[order], vals[order]
+
+    def sync(self):
+        """Apply match_vectors rows changed since the last sync."""
+        query = MatchVector.query.order_by(MatchVector.updated_at, MatchVector.id)
+        if self.watermark is not None:
+            query = query.filter(MatchVector.updated_at >= self.watermark - SYNC_OVERLAP)
+        for row in query:
+            change = (row.entity_id, *self.vectorize(row.terms))
+            self.sides[row.kind].replace(*change)
+            if row.kind in self.replays:
+                self.replays[row.kind].append(change)
+            self.watermark = row.updated_at if self.watermark is None else max(self.watermark, row.updated_at)
+        if self.compactor is None:
+            kinds = [kind for kind, side in self.sides.items() if len(side.delta) > COMPACT_THRESHOLD]
+            if kinds:
+                self._start_compaction(kinds)
+        self.synced_at = time.monotonic()
+
+    def _start_compaction(self, kinds):
+        """Merge the deltas of kinds on a background thread; call with self.lock held."""
+        snapshots = {}
+        for kind in kinds:
+            side = self.sides[kind]
+            snapshot = _Side(side.ids, side.matrix)
+            snapshot.dead, snapshot.delta = set(side.dead), dict(side.delta)
+            snapshots[kind] = snapshot
+            self.replays[kind] = []
+        self.compactor = threading.Thread(target=self._compact, args=(snapshots, len(self.vocab)),
+                                          name='match-index-compact', daemon=True)
+        self.compactor.start()
+
+    def _compact(self, snapshots, n_terms):
+        # Seconds of CPU for a large side: done without the lock, which only
+        # guards the swap
+        built = {}
+        try:
+            built = {kind: side.compacted(n_terms) for kind, side in snapshots.items()}
+        finally:
+            with self.lock:
+                for kind, side in built.items():
+                    for change in self.replays[kind]:
+                        side.replace(*change)
+                    self.sides[kind] = side
+                self.replays = {}
+                self.compactor = None
+
+    def match(self, kind, entity_id, target, k):
+        row = MatchVector.query.filter_by(kind=kind, entity_id=entity_id).first()
+        if row is None or not row.terms:
+            return []
+        with self.lock:
+            if time.monotonic() - self.synced_at > current_app.config['MATCH_SYNC_SECONDS']:
+                self.sync()
+            cols, vals = self.vectorize(row.terms)
+            return self.sides[target].top_k(cols, vals, k)
+
+
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """The current app's index, loaded on first use."""
+    with _index_lock:
+        index = current_app.extensions.get('match_index')
+        if index is None:
+            index = MatchIndex()
+            index.load()
+            current_app.extensions['match_index'] = index
+        return index
+
+
+def warm_index(app):
+    """Load app's index before it serves requests."""
+    with app.app_context():
+        get_index()
+
+
+def jobs_for_profile(profile_id, k=20):
+    return get_index().match('profile', profile_id, 'job', k)
+
+
+def candidates_for_job(job_id, k=20):
+    return get_index().match('job', job_id, 'profile', k)
@@ -0,0 +1,56 @@
+"""Compressed cold storage for old posts (posts_archive)
+
+The table used to come only from create_all (main.setup_database), so a
+database upgraded with `flask db upgrade` lacked it. Databases that
+already have it are left alone.
+
+Revision ID: 11782d02a016
+Revises: 3880b68a578b
+Create Date: 2026-10-20 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '11782d02a016'
+down_revision = '3880b68a578b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('posts_archive'):
+        return
+    op.create_table('posts_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('content_codec', sa.String(length=8), nullable=False),
+    sa.Column('content_data', sa.LargeBinary(), nullable=False),
+    sa.Column('media_url', sa.String(length=256), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('category', sa.String(length=64), nullable=True),
+    sa.Column('tags', sa.String(length=256), nullable=True),
+    sa.Column('visibility', sa.String(length=32), nullable=True),
+    sa.Column('likes_count', sa.Integer(), nullable=True),
+    sa.Column('views_count', sa.Integer(), nullable=True),
+    sa.Column('comments_count', sa.Integer(), nullable=False),
+    sa.Column('media_status', sa.String(length=16), nullable=True),
+    sa.Column('preview_url', sa.String(length=256), nullable=True),
+    sa.Column('media_duration', sa.Float(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('posts_archive', schema=None) as batch_op:
+        batch_op.create_index('idx_posts_archive_created_at', ['created_at'], unique=False)
+        batch_op.create_index('idx_posts_archive_user_id', ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('posts_archive', schema=None) as batch_op:
+        batch_op.drop_index('idx_posts_archive_user_id')
+        batch_op.drop_index('idx_posts_archive_created_at')
+    op.drop_table('posts_archive')
@@ -0,0 +1,34 @@
+"""Named change counters for version tokens (generations)
+
+The table used to come only from create_all (main.setup_database), so a
+database upgraded with `flask db upgrade` lacked it. Databases that
+already have it are left alone.
+
+Revision ID: 1524c1c14b71
+Revises: 7f441d7d8895
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1524c1c14b71'
+down_revision = '7f441d7d8895'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('generations'):
+        return
+    op.create_table('generations',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('generations')
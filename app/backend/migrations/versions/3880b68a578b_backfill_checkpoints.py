@@ -0,0 +1,41 @@
+"""Progress of online backfills (backfill_checkpoints)
+
+The table used to come only from create_all (main.setup_database), so a
+database upgraded with `flask db upgrade` lacked it. Databases that
+already have it are left alone.
+
+Revision ID: 3880b68a578b
+Revises: c00222855507
+Create Date: 2026-10-20 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3880b68a578b'
+down_revision = 'c00222855507'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('backfill_checkpoints'):
+        return
+    op.create_table('backfill_checkpoints',
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('end_id', sa.Integer(), nullable=False),
+    sa.Column('rows_done', sa.Integer(), nullable=False),
+    sa.Column('batches_done', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('backfill_checkpoints')
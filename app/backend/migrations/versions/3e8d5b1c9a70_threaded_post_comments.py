@@ -0,0 +1,55 @@
+"""Threaded post comments and posts.comments_count
+
+Revision ID: 3e8d5b1c9a70
+Revises: 7c1f3a9e2b4d
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e8d5b1c9a70'
+down_revision = '7c1f3a9e2b4d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('comments_count', sa.Integer(), nullable=False,
+                                      server_default='0'))
+
+    op.create_table('post_comments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('parent_id', sa.Integer(), nullable=True),
+    sa.Column('path', sa.String(length=255), nullable=False),
+    sa.Column('depth', sa.Integer(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('reply_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['parent_id'], ['post_comments.id'], ),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('post_comments', schema=None) as batch_op:
+        batch_op.create_index('idx_post_comments_post_depth_id', ['post_id', 'depth', 'id'], unique=False)
+        batch_op.create_index('idx_post_comments_post_path', ['post_id', 'path'], unique=False)
+        batch_op.create_index('idx_post_comments_user_id', ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('post_comments', schema=None) as batch_op:
+        batch_op.drop_index('idx_post_comments_user_id')
+        batch_op.drop_index('idx_post_comments_post_path')
+        batch_op.drop_index('idx_post_comments_post_depth_id')
+    op.drop_table('post_comments')
+
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_column('comments_count')
@@ -0,0 +1,68 @@
+"""Composite and partial indexes for posts listing, drop duplicates
+
+Revision ID: 495364d80dac
+Revises: b748766ecdcd
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '495364d80dac'
+down_revision = 'b748766ecdcd'
+branch_labels = None
+depends_on = None
+
+PUBLIC = sa.text("visibility = 'public'")
+
+# Single-column indexes made redundant by the composites below, plus the
+# ix_posts_* copies that index=True created next to the explicit idx_* ones.
+REDUNDANT_INDEXES = {
+    'ix_posts_category': ['category'],
+    'ix_posts_tags': ['tags'],
+    'ix_posts_visibility': ['visibility'],
+    'ix_posts_likes_count': ['likes_count'],
+    'ix_posts_views_count': ['views_count'],
+    'idx_category': ['category'],
+    'idx_tags': ['tags'],
+    'idx_visibility': ['visibility'],
+}
+
+NEW_INDEXES = [
+    ('idx_posts_visibility_created_at', ['visibility', 'created_at'], None),
+    ('idx_posts_category_created_at', ['category', 'created_at'], None),
+    ('idx_posts_visibility_category_created_at', ['visibility', 'category', 'created_at'], None),
+    ('idx_posts_public_likes_count', ['likes_count'], PUBLIC),
+    ('idx_posts_public_views_count', ['views_count'], PUBLIC),
+    ('idx_posts_user_id_created_at', ['user_id', 'created_at'], None),
+]
+
+
+def _existing_indexes():
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('posts')}
+
+
+def upgrade():
+    existing = _existing_indexes()
+    for name, columns, where in NEW_INDEXES:
+        if name not in existing:
+            op.create_index(name, 'posts', columns, unique=False,
+                            sqlite_where=where, postgresql_where=where)
+    for name in REDUNDANT_INDEXES:
+        if name in existing:
+            op.drop_index(name, table_name='posts')
+    if op.get_bind().dialect.name == 'sqlite':
+        # The planner needs statistics to prefer the partial indexes
+        op.execute('ANALYZE posts')
+
+
+def downgrade():
+    existing = _existing_indexes()
+    for name, columns in REDUNDANT_INDEXES.items():
+        if name not in existing:
+            op.create_index(name, 'posts', columns, unique=False)
+    for name, columns, where in NEW_INDEXES:
+        if name in existing:
+            op.drop_index(name, table_name='posts')
@@ -0,0 +1,26 @@
+"""Add profiles.version for If-Match on profile writes
+
+Revision ID: 5d0c7e2a8f41
+Revises: 9b2e4f6a1d38
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d0c7e2a8f41'
+down_revision = '9b2e4f6a1d38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('profiles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('profiles', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,29 @@
+"""Add posts.updated_at for listing ETags
+
+Revision ID: 7c1f3a9e2b4d
+Revises: 495364d80dac
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1f3a9e2b4d'
+down_revision = '495364d80dac'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE posts SET updated_at = created_at WHERE updated_at IS NULL')
+    op.create_index('idx_posts_updated_at', 'posts', ['updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_posts_updated_at', table_name='posts')
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,36 @@
+"""Per-conversation unread counters (message_unread_counters)
+
+The table used to come only from create_all (main.setup_database), so a
+database upgraded with `flask db upgrade` lacked it. Databases that
+already have it are left alone.
+
+Revision ID: 7f441d7d8895
+Revises: e6a2c9d4b817
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7f441d7d8895'
+down_revision = 'e6a2c9d4b817'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('message_unread_counters'):
+        return
+    op.create_table('message_unread_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('peer_id', sa.Integer(), nullable=False),
+    sa.Column('unread_count', sa.Integer(), nullable=False),
+    sa.Column('last_read_message_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'peer_id')
+    )
+
+
+def downgrade():
+    op.drop_table('message_unread_counters')
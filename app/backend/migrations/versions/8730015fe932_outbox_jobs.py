@@ -0,0 +1,50 @@
+"""Transactional outbox for the job runner (outbox_jobs)
+
+The table used to come only from create_all (main.setup_database), so a
+database upgraded with `flask db upgrade` lacked it. Databases that
+already have it are left alone.
+
+Revision ID: 8730015fe932
+Revises: 1524c1c14b71
+Create Date: 2026-10-20 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8730015fe932'
+down_revision = '1524c1c14b71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('outbox_jobs'):
+        return
+    op.create_table('outbox_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('idempotency_key', sa.String(length=200), nullable=True),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_by', sa.String(length=64), nullable=True),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('idempotency_key')
+    )
+    with op.batch_alter_table('outbox_jobs', schema=None) as batch_op:
+        batch_op.create_index('idx_outbox_jobs_status_run_at', ['status', 'run_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('outbox_jobs', schema=None) as batch_op:
+        batch_op.drop_index('idx_outbox_jobs_status_run_at')
+    op.drop_table('outbox_jobs')
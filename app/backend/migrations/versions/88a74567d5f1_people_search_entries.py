@@ -0,0 +1,41 @@
+"""Snapshots for the people prefix index (people_search_entries)
+
+The table used to come only from create_all (main.setup_database), so a
+database upgraded with `flask db upgrade` lacked it. Databases that
+already have it are left alone.
+
+Revision ID: 88a74567d5f1
+Revises: c1b070790932
+Create Date: 2026-10-20 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '88a74567d5f1'
+down_revision = 'c1b070790932'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('people_search_entries'):
+        return
+    op.create_table('people_search_entries',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=80), nullable=False),
+    sa.Column('location', sa.String(length=120), nullable=True),
+    sa.Column('skills', sa.JSON(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    with op.batch_alter_table('people_search_entries', schema=None) as batch_op:
+        batch_op.create_index('ix_people_search_entries_updated_at', ['updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('people_search_entries', schema=None) as batch_op:
+        batch_op.drop_index('ix_people_search_entries_updated_at')
+    op.drop_table('people_search_entries')
@@ -0,0 +1,30 @@
+"""Add post media preview columns
+
+Revision ID: 8a3f6c2d4e19
+Revises: 5d0c7e2a8f41
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a3f6c2d4e19'
+down_revision = '5d0c7e2a8f41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('media_status', sa.String(length=16), nullable=True))
+        batch_op.add_column(sa.Column('preview_url', sa.String(length=256), nullable=True))
+        batch_op.add_column(sa.Column('media_duration', sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_column('media_duration')
+        batch_op.drop_column('preview_url')
+        batch_op.drop_column('media_status')
@@ -0,0 +1,33 @@
+"""Add posts.hot_score for trending ranking
+
+Revision ID: 9b2e4f6a1d38
+Revises: 3e8d5b1c9a70
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b2e4f6a1d38'
+down_revision = '3e8d5b1c9a70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing posts start at 0 and warm up with new engagement
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('hot_score', sa.Float(), nullable=False, server_default='0'))
+    op.create_index('idx_posts_hot_score', 'posts', ['hot_score'], unique=False)
+    op.create_index('idx_posts_public_hot_score', 'posts', ['hot_score'], unique=False,
+                    sqlite_where=sa.text("visibility = 'public'"),
+                    postgresql_where=sa.text("visibility = 'public'"))
+
+
+def downgrade():
+    op.drop_index('idx_posts_public_hot_score', table_name='posts')
+    op.drop_index('idx_posts_hot_score', table_name='posts')
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_column('hot_score')
@@ -0,0 +1,55 @@
+"""Grouped notifications and their unread counters
+
+The tables used to come only from create_all (main.setup_database), so a
+database upgraded with `flask db upgrade` lacked them. Databases that
+already have them keep them.
+
+Revision ID: a3ffab934dc5
+Revises: 8730015fe932
+Create Date: 2026-10-20 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3ffab934dc5'
+down_revision = '8730015fe932'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('notifications'):
+        op.create_table('notifications',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=32), nullable=False),
+        sa.Column('target_type', sa.String(length=32), nullable=False),
+        sa.Column('target_id', sa.Integer(), nullable=False),
+        sa.Column('open_group_key', sa.String(length=100), nullable=True),
+        sa.Column('actor_count', sa.Integer(), nullable=False),
+        sa.Column('last_actor_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('read_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'open_group_key', name='uq_notifications_open_group')
+        )
+        with op.batch_alter_table('notifications', schema=None) as batch_op:
+            batch_op.create_index('idx_notifications_user_updated_id', ['user_id', 'updated_at', 'id'], unique=False)
+    if not inspector.has_table('notification_counters'):
+        op.create_table('notification_counters',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('unread_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id')
+        )
+
+
+def downgrade():
+    op.drop_table('notification_counters')
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('idx_notifications_user_updated_id')
+    op.drop_table('notifications')
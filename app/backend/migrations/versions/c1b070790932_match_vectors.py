@@ -0,0 +1,42 @@
+"""TF-IDF vectors for job matching (match_vectors)
+
+The table used to come only from create_all (main.setup_database), so a
+database upgraded with `flask db upgrade` lacked it. Databases that
+already have it are left alone.
+
+Revision ID: c1b070790932
+Revises: a3ffab934dc5
+Create Date: 2026-10-20 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c1b070790932'
+down_revision = 'a3ffab934dc5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('match_vectors'):
+        return
+    op.create_table('match_vectors',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('terms', sa.JSON(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('kind', 'entity_id', name='uq_match_vectors_kind_entity')
+    )
+    with op.batch_alter_table('match_vectors', schema=None) as batch_op:
+        batch_op.create_index('idx_match_vectors_updated_id', ['updated_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('match_vectors', schema=None) as batch_op:
+        batch_op.drop_index('idx_match_vectors_updated_id')
+    op.drop_table('match_vectors')
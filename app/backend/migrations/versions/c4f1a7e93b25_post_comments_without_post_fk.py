@@ -0,0 +1,44 @@
+"""Drop the post_comments.post_id foreign key
+
+Comments stay attached to posts moved to posts_archive, so post_id may
+name a row in either table.
+
+Revision ID: c4f1a7e93b25
+Revises: 8a3f6c2d4e19
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f1a7e93b25'
+down_revision = '8a3f6c2d4e19'
+branch_labels = None
+depends_on = None
+
+# SQLite foreign keys have no name; batch mode names them with this
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def _post_fk_name():
+    for fk in sa.inspect(op.get_bind()).get_foreign_keys('post_comments'):
+        if fk['referred_table'] == 'posts' and fk['constrained_columns'] == ['post_id']:
+            return fk['name'] or 'fk_post_comments_post_id_posts'
+    return None
+
+
+def upgrade():
+    name = _post_fk_name()
+    if name is None:
+        return
+    with op.batch_alter_table('post_comments', schema=None,
+                              naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint(name, type_='foreignkey')
+
+
+def downgrade():
+    with op.batch_alter_table('post_comments', schema=None,
+                              naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.create_foreign_key('fk_post_comments_post_id_posts', 'posts', ['post_id'], ['id'])
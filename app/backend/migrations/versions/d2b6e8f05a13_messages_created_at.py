@@ -0,0 +1,50 @@
+"""Add messages.created_at and the conversation indexes
+
+messages predates the migrations (the initial revision drops it and
+create_all makes it again), so databases may have it in its first shape,
+without created_at and indexes, or not at all. Only what is missing is
+added.
+
+Revision ID: d2b6e8f05a13
+Revises: c4f1a7e93b25
+Create Date: 2026-10-19 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2b6e8f05a13'
+down_revision = 'c4f1a7e93b25'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'idx_messages_recipient_id': ['recipient_id', 'id'],
+    'idx_messages_recipient_sender_id': ['recipient_id', 'sender_id', 'id'],
+    'idx_messages_sender_recipient_id': ['sender_id', 'recipient_id', 'id'],
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('messages'):
+        return
+    columns = {column['name'] for column in inspector.get_columns('messages')}
+    indexes = {index['name'] for index in inspector.get_indexes('messages')}
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        if 'created_at' not in columns:
+            batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+        for name, indexed in INDEXES.items():
+            if name not in indexes:
+                batch_op.create_index(name, indexed, unique=False)
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('messages'):
+        return
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        for name in reversed(list(INDEXES)):
+            batch_op.drop_index(name)
+        batch_op.drop_column('created_at')
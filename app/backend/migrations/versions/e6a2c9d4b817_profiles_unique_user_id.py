@@ -0,0 +1,49 @@
+"""One profile per user: unique profiles.user_id
+
+User.profile is a one-to-one relationship, but two concurrent first saves
+could each insert a profile. Duplicates are removed first, keeping each
+user's oldest profile (the one User.profile loads), together with their
+skills, experiences and educations; their match vectors become
+tombstones.
+
+Revision ID: e6a2c9d4b817
+Revises: d2b6e8f05a13
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6a2c9d4b817'
+down_revision = 'd2b6e8f05a13'
+branch_labels = None
+depends_on = None
+
+CHILD_TABLES = ('skills', 'experiences', 'educations')
+
+
+def upgrade():
+    bind = op.get_bind()
+    duplicates = [row[0] for row in bind.execute(sa.text(
+        'SELECT id FROM profiles WHERE id NOT IN '
+        '(SELECT MIN(id) FROM profiles GROUP BY user_id)'))]
+    if duplicates:
+        ids = sa.bindparam('ids', duplicates, expanding=True)
+        for table in CHILD_TABLES:
+            bind.execute(sa.text(f'DELETE FROM {table} WHERE profile_id IN :ids').bindparams(ids))
+        if sa.inspect(bind).has_table('match_vectors'):
+            bind.execute(sa.text(
+                "UPDATE match_vectors SET terms = '{}', updated_at = :now "
+                "WHERE kind = 'profile' AND entity_id IN :ids").bindparams(ids, now=datetime.utcnow()))
+        bind.execute(sa.text('DELETE FROM profiles WHERE id IN :ids').bindparams(ids))
+    with op.batch_alter_table('profiles', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_profiles_user_id', ['user_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('profiles', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_profiles_user_id', type_='unique')
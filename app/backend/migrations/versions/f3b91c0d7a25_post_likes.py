@@ -0,0 +1,42 @@
+"""Per-user post likes (post_likes)
+
+Backs POST/DELETE /posts/<id>/like. post_id has no foreign key so likes
+follow posts into posts_archive. Databases that already have the table
+are left alone.
+
+Revision ID: f3b91c0d7a25
+Revises: 11782d02a016
+Create Date: 2026-10-21 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b91c0d7a25'
+down_revision = '11782d02a016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('post_likes'):
+        return
+    op.create_table('post_likes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('post_id', 'user_id', name='uq_post_likes_post_user')
+    )
+    with op.batch_alter_table('post_likes', schema=None) as batch_op:
+        batch_op.create_index('idx_post_likes_user_id', ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('post_likes', schema=None) as batch_op:
+        batch_op.drop_index('idx_post_likes_user_id')
+    op.drop_table('post_likes')
@@ -15,17 +15,61 @@ class Post(db.Model):
     content = db.Column(db.Text, nullable=False)
     media_url = db.Column(db.String(256), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    category = db.Column(db.String(64), index=True)
-    tags = db.Column(db.String(256), index=True)  # Comma-separated tags
-    visibility = db.Column(db.String(32), index=True, default='public')
-    likes_count = db.Column(db.Integer, default=0, index=True)
-    views_count = db.Column(db.Integer, default=0, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    category = db.Column(db.String(64))
+    tags = db.Column(db.String(256))  # Comma-separated tags
+    visibility = db.Column(db.String(32), default='public')
+    likes_count = db.Column(db.Integer, default=0)
+    views_count = db.Column(db.Integer, default=0)
+    # Visible comments; maintained by models.comment, never counted on read
+    comments_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Time-decayed engagement; see models.trending
+    hot_score = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    # Derived preview of video/PDF media (tasks/media.py): pending, ready,
+    # failed or unavailable; NULL for posts without such media
+    media_status = db.Column(db.String(16))
+    preview_url = db.Column(db.String(256))
+    media_duration = db.Column(db.Float)
 
+    # One index per supported filter/sort shape of list_posts, so each shape
+    # is an index range walk in sort order with no temp B-tree sort.
+    # tags is only ever matched with LIKE '%tag%', which no index can serve.
+    # See test_query_plans.py.
     __table_args__ = (
-        db.Index('idx_category', 'category'),
-        db.Index('idx_tags', 'tags'),
-        db.Index('idx_visibility', 'visibility'),
         db.Index('idx_created_at', 'created_at'),
+        db.Index('idx_posts_visibility_created_at', 'visibility', 'created_at'),
+        db.Index('idx_posts_category_created_at', 'category', 'created_at'),
+        db.Index('idx_posts_visibility_category_created_at', 'visibility', 'category', 'created_at'),
         db.Index('idx_likes_count', 'likes_count'),
         db.Index('idx_views_count', 'views_count'),
-    ) 
\ No newline at end of file
+        # Partial indexes for the public feed sorted by popularity
+        db.Index('idx_posts_public_likes_count', 'likes_count',
+                 sqlite_where=db.text("visibility = 'public'"),
+                 postgresql_where=db.text("visibility = 'public'")),
+        db.Index('idx_posts_public_views_count', 'views_count',
+                 sqlite_where=db.text("visibility = 'public'"),
+                 postgresql_where=db.text("visibility = 'public'")),
+        db.Index('idx_posts_hot_score', 'hot_score'),
+        db.Index('idx_posts_public_hot_score', 'hot_score',
+                 sqlite_where=db.text("visibility = 'public'"),
+                 postgresql_where=db.text("visibility = 'public'")),
+        db.Index('idx_posts_user_id_created_at', 'user_id', 'created_at'),
+        # max(updated_at) for the listing ETags (http_cache.conditional)
+        db.Index('idx_posts_updated_at', 'updated_at'),
+    ) 
+def insert_or_ignore(model, values):
+    """INSERT one row unless it hits a unique constraint; returns rows inserted (0 or 1).
+
+    One statement (ON CONFLICT DO NOTHING / INSERT IGNORE), so concurrent
+    callers never see an IntegrityError and never abort the transaction.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(model).values(**values).on_conflict_do_nothing()
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(model).values(**values).on_conflict_do_nothing()
+    else:
+        stmt = db.insert(model).values(**values).prefix_with('IGNORE')
+    return db.session.execute(stmt).rowcount
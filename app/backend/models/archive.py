@@ -0,0 +1,141 @@
+"""Cold storage for old posts.
+
+Posts older than POSTS_ARCHIVE_AFTER_DAYS move from `posts` to
+`posts_archive` (archive_posts, run hourly by the worker). Old rows then
+stop paying for posts' many indexes, and its hot pages fit in the page
+cache. The archive keeps the same ids and columns, has only the indexes
+that listings and user deletion need, and stores content compressed (zstd
+if the zstandard package is installed, zlib otherwise). ArchivedPost.content
+decompresses on access, so serializers treat both kinds of row alike.
+
+Readers fall through with find_post() and, for time-ordered listings,
+api.posts.build_archive_query(). An archived post stays archived: comments
+update its comments_count where it is, like they do for hot posts.
+Comments keep their post_id without a foreign key, so either table can
+hold the post.
+"""
+import zlib
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from . import db, Post
+from .generation import bump, generation
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional, zlib is the fallback
+    zstandard = None
+
+ARCHIVE_BATCH_SIZE = 500
+
+# Columns copied as they are; content is compressed and hot_score dropped
+# (it has long decayed to zero by the time a post is archived)
+COPIED_COLUMNS = ('id', 'user_id', 'media_url', 'created_at', 'updated_at', 'category', 'tags',
+                  'visibility', 'likes_count', 'views_count', 'comments_count', 'media_status',
+                  'preview_url', 'media_duration')
+
+
+def compress(text):
+    """(codec, bytes) for text; tiny texts that do not shrink are kept raw."""
+    data = text.encode('utf-8')
+    if zstandard is not None:
+        codec, packed = 'zstd', zstandard.ZstdCompressor(level=9).compress(data)
+    else:
+        codec, packed = 'zlib', zlib.compress(data, 9)
+    return (codec, packed) if len(packed) < len(data) else ('raw', data)
+
+
+def decompress(codec, data):
+    if codec == 'zstd':
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == 'zlib':
+        data = zlib.decompress(data)
+    return data.decode('utf-8')
+
+
+class ArchivedPost(db.Model):
+    __tablename__ = 'posts_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    content_codec = db.Column(db.String(8), nullable=False)
+    content_data = db.Column(db.LargeBinary, nullable=False)
+    media_url = db.Column(db.String(256))
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    category = db.Column(db.String(64))
+    tags = db.Column(db.String(256))
+    visibility = db.Column(db.String(32))
+    likes_count = db.Column(db.Integer, default=0)
+    views_count = db.Column(db.Integer, default=0)
+    comments_count = db.Column(db.Integer, nullable=False, default=0)
+    media_status = db.Column(db.String(16))
+    preview_url = db.Column(db.String(256))
+    media_duration = db.Column(db.Float)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Deliberately few: listings past the hot posts and user deletion
+    __table_args__ = (
+        db.Index('idx_posts_archive_created_at', 'created_at'),
+        db.Index('idx_posts_archive_user_id', 'user_id'),
+    )
+
+    @property
+    def content(self):
+        return decompress(self.content_codec, self.content_data)
+
+
+def find_post(post_id):
+    """The post with this id, hot or archived; None if there is none."""
+    return db.session.get(Post, post_id) or db.session.get(ArchivedPost, post_id)
+
+
+def archive_posts(before=None, batch_size=ARCHIVE_BATCH_SIZE, max_batches=None):
+    """Move posts created before `before` to the archive, oldest first.
+
+    Each batch is copied and deleted in one transaction. Returns the number
+    of posts moved. `before` defaults to POSTS_ARCHIVE_AFTER_DAYS ago.
+    """
+    if before is None:
+        before = datetime.utcnow() - timedelta(days=current_app.config['POSTS_ARCHIVE_AFTER_DAYS'])
+    columns = [getattr(Post, name) for name in COPIED_COLUMNS]
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        # Locked on databases that support it, so no concurrent counter
+        # update is lost between the copy and the delete
+        rows = db.session.query(*columns, Post.content).filter(Post.created_at < before) \
+            .order_by(Post.created_at).limit(batch_size).with_for_update().all()
+        if not rows:
+            break
+        now = datetime.utcnow()
+        archived = []
+        for row in rows:
+            values = dict(zip(COPIED_COLUMNS, row))
+            values['content_codec'], values['content_data'] = compress(row.content)
+            values['archived_at'] = now
+            archived.append(values)
+        db.session.execute(db.insert(ArchivedPost), archived)
+        Post.query.filter(Post.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+        bump('posts')
+        db.session.commit()
+        moved += len(rows)
+        batches += 1
+    return moved
+
+
+def archived_count(query, key):
+    """query.count() for an archive query, cached per process until the archive changes.
+
+    key identifies the query's filters. Rows only enter the archive when
+    the archive job runs and leave it when users are purged, and both bump
+    the 'posts' generation, so counting it again on every listing would
+    only pull cold pages into the cache.
+    """
+    current = db.session.query(generation('posts')).scalar()
+    counts = current_app.extensions.setdefault('posts_archive_counts', {})
+    if counts.get('generation') != current:
+        counts.clear()
+        counts['generation'] = current
+    if key not in counts:
+        counts[key] = query.order_by(None).count()
+    return counts[key]
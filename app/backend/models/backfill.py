@@ -0,0 +1,34 @@
+from datetime import datetime
+from . import db
+
+class BackfillCheckpoint(db.Model):
+    """Progress of one online data migration (see backfills/).
+
+    last_id is the highest primary key already processed; end_id is the
+    highest one that existed when the backfill started. Both move forward
+    in the same transaction as each batch's writes, so a stopped run
+    resumes exactly where it left off.
+    """
+    __tablename__ = 'backfill_checkpoints'
+    name = db.Column(db.String(120), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    end_id = db.Column(db.Integer, nullable=False, default=0)
+    rows_done = db.Column(db.Integer, nullable=False, default=0)
+    batches_done = db.Column(db.Integer, nullable=False, default=0)
+    status = db.Column(db.String(16), nullable=False, default='running')
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'status': self.status,
+            'last_id': self.last_id,
+            'end_id': self.end_id,
+            'rows_done': self.rows_done,
+            'batches_done': self.batches_done,
+            'started_at': self.started_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
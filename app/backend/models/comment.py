@@ -0,0 +1,123 @@
+from datetime import datetime
+from sqlalchemy import and_, func, or_
+from . import db, Post
+from .archive import ArchivedPost
+from .generation import bump
+from .trending import record_engagement
+
+# Path segments are zero-padded ids, so sorting by path is a depth-first walk
+# of the thread with siblings in posting order
+PATH_SEGMENT_WIDTH = 10
+MAX_DEPTH = 10
+
+class Comment(db.Model):
+    """A comment on a post; replies form a tree via a materialized path.
+
+    path is the chain of ids from the top-level comment down to this one,
+    e.g. '0000000012/0000000034'. A comment's whole subtree is the
+    contiguous range path > '<its path>/' and path < '<its path>0' ('0'
+    sorts right after '/'), so loading a thread is one index range scan on
+    (post_id, path).
+
+    post_id has no foreign key: the post lives in `posts` or, once archived,
+    in `posts_archive` (see models/archive.py).
+    """
+    __tablename__ = 'post_comments'
+    id = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    parent_id = db.Column(db.Integer, db.ForeignKey('post_comments.id'))
+    path = db.Column(db.String(255), nullable=False, default='')
+    depth = db.Column(db.Integer, nullable=False, default=0)
+    content = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='visible')
+    # Direct replies, so clients know whether to offer "load replies"
+    reply_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Top-level comments of a post, newest first by id
+        db.Index('idx_post_comments_post_depth_id', 'post_id', 'depth', 'id'),
+        # Thread (subtree) loads
+        db.Index('idx_post_comments_post_path', 'post_id', 'path'),
+        db.Index('idx_post_comments_user_id', 'user_id'),
+    )
+
+    def subtree_bounds(self):
+        return self.path + '/', self.path + '0'
+
+    def to_dict(self):
+        deleted = self.status == 'deleted'
+        return {
+            'id': self.id,
+            'post_id': self.post_id,
+            'user_id': None if deleted else self.user_id,
+            'parent_id': self.parent_id,
+            'depth': self.depth,
+            'content': None if deleted else self.content,
+            'status': self.status,
+            'reply_count': self.reply_count,
+            'created_at': self.created_at.isoformat()
+        }
+
+def add_comment(post, user_id, content, parent=None):
+    """Insert a comment and update the denormalized counts, in the caller's transaction."""
+    comment = Comment(post_id=post.id, user_id=user_id, content=content,
+                      parent_id=parent.id if parent else None,
+                      depth=parent.depth + 1 if parent else 0)
+    db.session.add(comment)
+    db.session.flush()  # the path needs the new id
+    segment = str(comment.id).zfill(PATH_SEGMENT_WIDTH)
+    comment.path = f'{parent.path}/{segment}' if parent else segment
+    # Single-statement increments, so concurrent commenters never lose updates
+    _count_comments(post.id, 1)
+    if parent:
+        Comment.query.filter_by(id=parent.id).update(
+            {Comment.reply_count: Comment.reply_count + 1}, synchronize_session=False)
+    record_engagement(post.id, 'comment')
+    return comment
+
+def delete_comment(comment):
+    """Soft delete: the thread below stays reachable through the path."""
+    if comment.status == 'deleted':
+        return
+    comment.status = 'deleted'
+    comment.content = ''
+    _count_comments(comment.post_id, -1)
+
+def delete_threads(tops):
+    """Hard delete comments and every reply below them, in the caller's transaction.
+
+    tops are rows with post_id, path and parent_id, none of them inside
+    another's subtree. Each post's comments_count loses the visible
+    comments removed and each remaining parent loses a reply.
+    """
+    if not tops:
+        return 0
+    # A subtree is the top's own path plus the range below it
+    subtrees = or_(*[and_(Comment.post_id == top.post_id, Comment.path >= top.path,
+                          Comment.path < top.path + '0') for top in tops])
+    for post_id, visible in db.session.query(Comment.post_id, func.count()).filter(
+            subtrees, Comment.status != 'deleted').group_by(Comment.post_id):
+        _count_comments(post_id, -visible)
+    parents = {}
+    for top in tops:
+        if top.parent_id is not None:
+            parents[top.parent_id] = parents.get(top.parent_id, 0) + 1
+    for parent_id, replies in parents.items():
+        Comment.query.filter_by(id=parent_id).update(
+            {Comment.reply_count: Comment.reply_count - replies}, synchronize_session=False)
+    return Comment.query.filter(subtrees).delete(synchronize_session=False)
+
+def _count_comments(post_id, delta):
+    """Add delta to comments_count of the post, hot or archived."""
+    if Post.query.filter_by(id=post_id).update(
+            {Post.comments_count: Post.comments_count + delta}, synchronize_session=False):
+        return
+    if ArchivedPost.query.filter_by(id=post_id).update(
+            {ArchivedPost.comments_count: ArchivedPost.comments_count + delta},
+            synchronize_session=False):
+        # Archived posts have no updated_at to move; listing ETags need this
+        bump('posts')
@@ -0,0 +1,71 @@
+"""Likes and views: the post counters and hot_score inputs besides comments."""
+from datetime import datetime
+from sqlalchemy import func
+from . import db, Post, insert_or_ignore
+from .archive import ArchivedPost
+from .generation import bump
+from .trending import record_engagement
+
+class PostLike(db.Model):
+    """One user's like of a post; at most one per (post, user).
+
+    post_id has no foreign key, like post_comments.post_id: the post lives
+    in `posts` or, once archived, in `posts_archive`.
+    """
+    __tablename__ = 'post_likes'
+    id = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('post_id', 'user_id', name='uq_post_likes_post_user'),
+        db.Index('idx_post_likes_user_id', 'user_id'),
+    )
+
+def like_post(post, user_id):
+    """Like a post, in the caller's transaction; returns False if already liked."""
+    if not insert_or_ignore(PostLike, {'post_id': post.id, 'user_id': user_id,
+                                       'created_at': datetime.utcnow()}):
+        return False
+    _count(post.id, 'likes_count', 1)
+    record_engagement(post.id, 'like')
+    return True
+
+def unlike_post(post, user_id):
+    """Withdraw a like; returns False if there was none.
+
+    The like's share of hot_score is left to decay like any other
+    engagement.
+    """
+    if not PostLike.query.filter_by(post_id=post.id, user_id=user_id).delete(
+            synchronize_session=False):
+        return False
+    _count(post.id, 'likes_count', -1)
+    return True
+
+def unlike_all(user_ids):
+    """Remove every like by user_ids and take them off the posts' likes_count."""
+    for post_id, likes in db.session.query(PostLike.post_id, func.count()).filter(
+            PostLike.user_id.in_(user_ids)).group_by(PostLike.post_id):
+        _count(post_id, 'likes_count', -likes)
+    return PostLike.query.filter(PostLike.user_id.in_(user_ids)).delete(
+        synchronize_session=False)
+
+def record_view(post):
+    """Count a view of a post, in the caller's transaction."""
+    _count(post.id, 'views_count', 1)
+    record_engagement(post.id, 'view')
+
+def _count(post_id, name, delta):
+    """Add delta to a counter column of the post, hot or archived."""
+    column = getattr(Post, name)
+    # Counters may be NULL on rows written before they had defaults
+    if Post.query.filter_by(id=post_id).update(
+            {column: func.coalesce(column, 0) + delta}, synchronize_session=False):
+        return
+    column = getattr(ArchivedPost, name)
+    if ArchivedPost.query.filter_by(id=post_id).update(
+            {column: func.coalesce(column, 0) + delta}, synchronize_session=False):
+        # Archived posts have no updated_at to move; listing ETags need this
+        bump('posts')
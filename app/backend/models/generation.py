@@ -0,0 +1,25 @@
+from sqlalchemy import func
+from . import db, insert_or_ignore
+
+class Generation(db.Model):
+    """Named change counters for changes that leave no other trace.
+
+    Version tokens such as api.posts.posts_version use max(id) and
+    max(updated_at), which catch inserts and edits through an index lookup
+    but miss rows that disappear. Code that deletes rows, or changes them
+    out of sight (e.g. in the archive), bumps a generation instead.
+    """
+    __tablename__ = 'generations'
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+def bump(name):
+    """Advance a generation, in the caller's transaction."""
+    if not Generation.query.filter_by(name=name).update(
+            {Generation.value: Generation.value + 1}, synchronize_session=False):
+        insert_or_ignore(Generation, {'name': name, 'value': 1})
+
+def generation(name):
+    """A scalar subquery for the current value of a generation (0 before the first bump)."""
+    return db.session.query(func.coalesce(func.max(Generation.value), 0)).filter(
+        Generation.name == name).scalar_subquery()
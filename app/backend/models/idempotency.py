@@ -0,0 +1,24 @@
+from datetime import datetime
+from . import db
+
+class IdempotencyRecord(db.Model):
+    """The outcome of a request sent with an Idempotency-Key header.
+
+    in_progress while the first request runs, then done with the response
+    to replay to retries until expires_at. See idempotency.py.
+    """
+    __tablename__ = 'idempotency_keys'
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(100), nullable=False)  # endpoint[:user id]
+    key = db.Column(db.String(255), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='in_progress')
+    response_status = db.Column(db.Integer)
+    response_mimetype = db.Column(db.String(100))
+    response_body = db.Column(db.LargeBinary)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'key', name='uq_idempotency_keys_scope_key'),
+    )
@@ -0,0 +1,37 @@
+from datetime import datetime
+from . import db
+
+class MatchVector(db.Model):
+    """Weighted terms of a profile or job, the input of the matching index.
+
+    Rows are upserted whenever the source changes; each process's in-memory
+    index (matching.py) picks up rows by (updated_at, id) since its last
+    sync. An empty terms dict is a tombstone.
+    """
+    __tablename__ = 'match_vectors'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(16), nullable=False)  # 'profile' or 'job'
+    entity_id = db.Column(db.Integer, nullable=False)
+    terms = db.Column(db.JSON, nullable=False, default=dict)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'entity_id', name='uq_match_vectors_kind_entity'),
+        db.Index('idx_match_vectors_updated_id', 'updated_at', 'id'),
+    )
+
+def save_vectors(kind, terms_by_id, now=None):
+    """Upsert vectors for many entities, in the caller's transaction."""
+    if not terms_by_id:
+        return
+    now = now or datetime.utcnow()
+    existing = dict(db.session.query(MatchVector.entity_id, MatchVector.id).filter(
+        MatchVector.kind == kind, MatchVector.entity_id.in_(list(terms_by_id))))
+    updates = [{'id': existing[entity_id], 'terms': terms, 'updated_at': now}
+               for entity_id, terms in terms_by_id.items() if entity_id in existing]
+    inserts = [{'kind': kind, 'entity_id': entity_id, 'terms': terms, 'updated_at': now}
+               for entity_id, terms in terms_by_id.items() if entity_id not in existing]
+    if updates:
+        db.session.execute(db.update(MatchVector), updates)
+    if inserts:
+        db.session.execute(db.insert(MatchVector), inserts)
@@ -1,4 +1,6 @@
-from . import db
+from datetime import datetime
+from sqlalchemy import func, literal
+from . import db, insert_or_ignore
 
 class Message(db.Model):
     __tablename__ = 'messages'
@@ -6,3 +8,146 @@ class Message(db.Model):
     sender_id = db.Column(db.Integer, nullable=False)
     recipient_id = db.Column(db.Integer, nullable=False)
     content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # A conversation is read newest-first by id, and the unread count of a
+    # conversation is "messages from peer to me with id > watermark", so both
+    # directions are covered by (recipient_id, sender_id, id). The realtime
+    # stream tails (recipient_id, id) across all senders.
+    __table_args__ = (
+        db.Index('idx_messages_recipient_id', 'recipient_id', 'id'),
+        db.Index('idx_messages_recipient_sender_id', 'recipient_id', 'sender_id', 'id'),
+        db.Index('idx_messages_sender_recipient_id', 'sender_id', 'recipient_id', 'id'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'sender_id': self.sender_id,
+            'recipient_id': self.recipient_id,
+            'content': self.content,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class UnreadCounter(db.Model):
+    """Per-(user, conversation) unread counter and last-read watermark.
+
+    The conversation is identified by the other participant (peer_id).
+    unread_count is maintained incrementally when messages are sent or read,
+    so badges never have to COUNT over the messages table.
+    """
+    __tablename__ = 'message_unread_counters'
+    user_id = db.Column(db.Integer, primary_key=True)
+    peer_id = db.Column(db.Integer, primary_key=True)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+    last_read_message_id = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'peer_id': self.peer_id,
+            'unread_count': self.unread_count,
+            'last_read_message_id': self.last_read_message_id
+        }
+
+def _ensure_counter(user_id, peer_id):
+    """Make sure the counter row exists, tolerating a concurrent insert."""
+    if db.session.get(UnreadCounter, (user_id, peer_id)) is not None:
+        return
+    # Not a savepoint: after only reads, pysqlite's SAVEPOINT would commit on release
+    insert_or_ignore(UnreadCounter, {'user_id': user_id, 'peer_id': peer_id,
+                                     'unread_count': 0, 'last_read_message_id': 0})
+
+def record_sent_message(message):
+    """Bump counters for a freshly flushed message.
+
+    Must run in the same transaction as the message insert. The increment is
+    a single UPDATE ... SET unread_count = unread_count + 1 so concurrent
+    senders never lose updates.
+    """
+    _ensure_counter(message.recipient_id, message.sender_id)
+    _ensure_counter(message.sender_id, message.recipient_id)
+    UnreadCounter.query.filter_by(
+        user_id=message.recipient_id, peer_id=message.sender_id
+    ).update({UnreadCounter.unread_count: UnreadCounter.unread_count + 1},
+             synchronize_session=False)
+    # The sender has obviously read their own message
+    UnreadCounter.query.filter(
+        UnreadCounter.user_id == message.sender_id,
+        UnreadCounter.peer_id == message.recipient_id,
+        UnreadCounter.last_read_message_id < message.id
+    ).update({UnreadCounter.last_read_message_id: message.id},
+             synchronize_session=False)
+
+def _unread_after(user_id, peer_id, watermark):
+    return db.session.query(func.count(Message.id)).filter(
+        Message.recipient_id == user_id,
+        Message.sender_id == peer_id,
+        Message.id > watermark
+    ).scalar_subquery()
+
+def mark_read(user_id, peer_id, up_to_id):
+    """Advance the watermark for one conversation up to (and including) up_to_id.
+
+    up_to_id is clamped to the newest message from the peer, so a client
+    cannot mark messages read before they exist. The watermark never moves
+    backwards. The remaining unread count is recomputed in the same UPDATE
+    from the index range above the new watermark, which is empty in the
+    common "read everything" case. Returns the updated counter.
+    """
+    _ensure_counter(user_id, peer_id)
+    counter = db.session.get(UnreadCounter, (user_id, peer_id))
+    newest = db.session.query(func.max(Message.id)).filter(
+        Message.recipient_id == user_id, Message.sender_id == peer_id).scalar() or 0
+    watermark = max(counter.last_read_message_id or 0, min(up_to_id, newest))
+    UnreadCounter.query.filter_by(user_id=user_id, peer_id=peer_id).update({
+        UnreadCounter.last_read_message_id: watermark,
+        UnreadCounter.unread_count: _unread_after(user_id, peer_id, watermark)
+    }, synchronize_session=False)
+    db.session.refresh(counter)
+    return counter
+
+def reconcile_unread_counters(batch_size=1000):
+    """Repair counter drift against the messages table.
+
+    Walks users in batches, one transaction each: a correlated UPDATE
+    recomputes every counter of the batch from its watermark in the
+    database and writes only the rows that disagree, then counters missing
+    for conversations the batch has received messages in are inserted.
+    Nothing is held in memory, and a message sent concurrently is counted
+    by the statement that sees it. Returns the number of counters that
+    were repaired or created.
+    """
+    repaired = 0
+    expected = _unread_after(UnreadCounter.user_id, UnreadCounter.peer_id,
+                             UnreadCounter.last_read_message_id)
+    for user_ids in _user_batches(UnreadCounter.user_id, batch_size):
+        repaired += UnreadCounter.query.filter(
+            UnreadCounter.user_id.in_(user_ids), UnreadCounter.unread_count != expected
+        ).update({UnreadCounter.unread_count: expected}, synchronize_session=False)
+        db.session.commit()
+
+    has_counter = db.session.query(UnreadCounter.user_id).filter(
+        UnreadCounter.user_id == Message.recipient_id,
+        UnreadCounter.peer_id == Message.sender_id).exists()
+    for user_ids in _user_batches(Message.recipient_id, batch_size):
+        missing = db.session.query(
+            Message.recipient_id, Message.sender_id, func.count(Message.id), literal(0)
+        ).filter(Message.recipient_id.in_(user_ids), ~has_counter).group_by(
+            Message.recipient_id, Message.sender_id)
+        repaired += db.session.execute(db.insert(UnreadCounter).from_select(
+            ['user_id', 'peer_id', 'unread_count', 'last_read_message_id'], missing)).rowcount
+        db.session.commit()
+    return repaired
+
+def _user_batches(column, batch_size):
+    """Successive lists of up to batch_size distinct values of column, ascending."""
+    last_id = None
+    while True:
+        query = db.session.query(column).distinct()
+        if last_id is not None:
+            query = query.filter(column > last_id)
+        user_ids = [row[0] for row in query.order_by(column).limit(batch_size)]
+        if not user_ids:
+            return
+        yield user_ids
+        last_id = user_ids[-1]
@@ -0,0 +1,132 @@
+from datetime import datetime
+from sqlalchemy import case
+from . import db
+from .outbox import enqueue
+
+# Recipients per fan-out job; each batch commits on its own
+FANOUT_BATCH_SIZE = 500
+
+class Notification(db.Model):
+    """One grouped notification: every unread event with the same group key.
+
+    "Alice and 41 others liked your post" is a single row with
+    actor_count=42 and last_actor_id=Alice. While a group is unread,
+    open_group_key holds its group key and new events update the row
+    instead of inserting. Reading a group clears open_group_key, so the
+    next event starts a new group. NULLs never collide in the unique
+    index, so any number of read groups can share a key.
+    """
+    __tablename__ = 'notifications'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(32), nullable=False)
+    target_type = db.Column(db.String(32), nullable=False)
+    target_id = db.Column(db.Integer, nullable=False)
+    open_group_key = db.Column(db.String(100))
+    actor_count = db.Column(db.Integer, nullable=False, default=1)
+    last_actor_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    read_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'open_group_key', name='uq_notifications_open_group'),
+        # The inbox is read newest activity first with a (updated_at, id) cursor
+        db.Index('idx_notifications_user_updated_id', 'user_id', 'updated_at', 'id'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'target_type': self.target_type,
+            'target_id': self.target_id,
+            'actor_count': self.actor_count,
+            'last_actor_id': self.last_actor_id,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'read': self.read_at is not None
+        }
+
+class NotificationCounter(db.Model):
+    """Unread notification groups per user, kept up to date incrementally."""
+    __tablename__ = 'notification_counters'
+    user_id = db.Column(db.Integer, primary_key=True)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+
+def group_key(kind, target_type, target_id):
+    return f'{kind}:{target_type}:{target_id}'
+
+def notify(kind, actor_id, recipient_ids, target_type, target_id):
+    """Record an event for recipients, in the caller's transaction.
+
+    Nothing is written per recipient here: the fan-out runs in the worker
+    as one outbox job per FANOUT_BATCH_SIZE recipients. The actor is never
+    notified of their own action.
+    """
+    recipients = sorted({r for r in recipient_ids if r != actor_id})
+    for start in range(0, len(recipients), FANOUT_BATCH_SIZE):
+        enqueue('notifications.fanout', {
+            'kind': kind, 'actor_id': actor_id,
+            'recipient_ids': recipients[start:start + FANOUT_BATCH_SIZE],
+            'target_type': target_type, 'target_id': target_id,
+        })
+
+def fan_out(kind, actor_id, recipient_ids, target_type, target_id, now=None):
+    """Coalesce one event into the recipients' notification groups.
+
+    Set-based: one UPDATE bumps every open group, one bulk INSERT creates
+    the missing ones, and only the new groups bump unread counters.
+    """
+    now = now or datetime.utcnow()
+    key = group_key(kind, target_type, target_id)
+    open_groups = Notification.query.filter(
+        Notification.user_id.in_(recipient_ids), Notification.open_group_key == key)
+    coalesced = {user_id for (user_id,) in open_groups.with_entities(Notification.user_id)}
+    if coalesced:
+        open_groups.update({
+            Notification.actor_count: Notification.actor_count + 1,
+            Notification.last_actor_id: actor_id,
+            Notification.updated_at: now,
+        }, synchronize_session=False)
+    new_recipients = [r for r in recipient_ids if r not in coalesced]
+    if not new_recipients:
+        return 0
+    db.session.execute(db.insert(Notification), [{
+        'user_id': user_id, 'kind': kind, 'target_type': target_type,
+        'target_id': target_id, 'open_group_key': key, 'actor_count': 1,
+        'last_actor_id': actor_id, 'created_at': now, 'updated_at': now,
+    } for user_id in new_recipients])
+    _bump_counters(new_recipients, 1)
+    return len(new_recipients)
+
+def _bump_counters(user_ids, delta):
+    existing = {user_id for (user_id,) in db.session.query(NotificationCounter.user_id)
+                .filter(NotificationCounter.user_id.in_(user_ids))}
+    missing = [u for u in user_ids if u not in existing]
+    if missing:
+        db.session.execute(db.insert(NotificationCounter),
+                           [{'user_id': u, 'unread_count': 0} for u in missing])
+    NotificationCounter.query.filter(NotificationCounter.user_id.in_(user_ids)).update(
+        {NotificationCounter.unread_count: NotificationCounter.unread_count + delta},
+        synchronize_session=False)
+
+def mark_notifications_read(user_id, ids=None):
+    """Mark some (or all) of a user's unread groups read; returns how many."""
+    query = Notification.query.filter(Notification.user_id == user_id,
+                                      Notification.read_at.is_(None))
+    if ids is not None:
+        query = query.filter(Notification.id.in_(ids))
+    marked = query.update({Notification.read_at: datetime.utcnow(),
+                           Notification.open_group_key: None}, synchronize_session=False)
+    if marked:
+        NotificationCounter.query.filter_by(user_id=user_id).update(
+            {NotificationCounter.unread_count: case(
+                (NotificationCounter.unread_count > marked, NotificationCounter.unread_count - marked),
+                else_=0)},
+            synchronize_session=False)
+    return marked
+
+def unread_notification_count(user_id):
+    counter = db.session.get(NotificationCounter, user_id)
+    return counter.unread_count if counter else 0
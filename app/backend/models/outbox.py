@@ -0,0 +1,65 @@
+import json
+from datetime import datetime
+from . import db, insert_or_ignore
+
+class OutboxJob(db.Model):
+    """A side effect to run after a business change commits.
+
+    Rows are written in the same transaction as the change that causes them
+    (see enqueue), so a job exists if and only if the change was committed.
+    `flask worker` picks them up; see tasks/runner.py.
+    """
+    __tablename__ = 'outbox_jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    # Enqueueing the same key twice is a no-op
+    idempotency_key = db.Column(db.String(200), unique=True)
+    status = db.Column(db.String(16), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(64))
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    # Workers poll "pending and due, oldest first"
+    __table_args__ = (
+        db.Index('idx_outbox_jobs_status_run_at', 'status', 'run_at'),
+    )
+
+    @property
+    def args(self):
+        return json.loads(self.payload)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'payload': self.args,
+            'status': self.status,
+            'attempts': self.attempts,
+            'run_at': self.run_at.isoformat(),
+            'last_error': self.last_error
+        }
+
+def enqueue(name, payload=None, key=None, run_at=None, max_attempts=5):
+    """Add a job to the current transaction; the caller commits.
+
+    With key set, a job that already exists under that key is returned
+    instead of adding a second one, even under concurrent enqueues. That
+    uses one INSERT ... ON CONFLICT DO NOTHING rather than a savepoint:
+    pysqlite does not BEGIN before a SAVEPOINT, so after nothing but reads
+    the savepoint's RELEASE would commit the job on its own.
+    """
+    values = {'name': name, 'payload': json.dumps(payload or {}), 'idempotency_key': key,
+              'run_at': run_at or datetime.utcnow(), 'max_attempts': max_attempts}
+    if key is None:
+        job = OutboxJob(**values)
+        db.session.add(job)
+        return job
+    insert_or_ignore(OutboxJob, dict(values, status='pending', attempts=0,
+                                     created_at=datetime.utcnow()))
+    return OutboxJob.query.filter_by(idempotency_key=key).one()
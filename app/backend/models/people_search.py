@@ -0,0 +1,26 @@
+from datetime import datetime
+from . import db
+
+class PeopleSearchEntry(db.Model):
+    """Compact snapshot of a user's searchable fields for the people index.
+
+    One row per user, so a process loads its whole prefix index
+    (people_index.py) with a single table scan instead of joining users,
+    profiles and skills. Rows are rewritten on signup and profile writes;
+    indexes pick them up by updated_at. A deleted user's row stays behind
+    as a tombstone with an empty username.
+    """
+    __tablename__ = 'people_search_entries'
+    user_id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), nullable=False)
+    location = db.Column(db.String(120))
+    skills = db.Column(db.JSON, nullable=False, default=list)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'username': self.username,
+            'location': self.location,
+            'skills': self.skills
+        }
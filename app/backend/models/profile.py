@@ -11,11 +11,18 @@ class Profile(db.Model):
     location = db.Column(db.String(120))
     image_url = db.Column(db.String(256))
     thumbnail_url = db.Column(db.String(256))
+    # Bumped on every write; the profile's ETag for If-Match
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     # Relationships
     skills = db.relationship('Skill', backref='profile', lazy=True)
     experiences = db.relationship('Experience', backref='profile', lazy=True)
     educations = db.relationship('Education', backref='profile', lazy=True)
 
+    # One per user: concurrent first saves cannot both create one
+    __table_args__ = (
+        db.UniqueConstraint('user_id', name='uq_profiles_user_id'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -70,3 +77,41 @@ class Education(db.Model):
     field_of_study = db.Column(db.String(120))
     start_year = db.Column(db.Integer)
     end_year = db.Column(db.Integer)
+
+def bump_version(profile_id, expected=None):
+    """Increment a profile's version; with expected, only if it is still that.
+
+    Returns False when another write got there first. The check and the
+    increment are one UPDATE, so two concurrent saves cannot both pass.
+    """
+    query = Profile.query.filter(Profile.id == profile_id)
+    if expected is not None:
+        query = query.filter(Profile.version == expected)
+    return query.update({Profile.version: Profile.version + 1}, synchronize_session=False) == 1
+
+def diff_children(model, profile_id, items, fields):
+    """Make a profile's child rows match items, touching only what changed.
+
+    items are dicts of fields; those with an 'id' update that row, those
+    without are inserted, and rows missing from items are deleted. Each
+    kind of change is one bulk statement. Raises ValueError for ids that
+    are not this profile's rows. Returns (inserted, updated, deleted).
+    """
+    current = {row.id: row for row in model.query.filter(model.profile_id == profile_id)}
+    keep = {item['id'] for item in items if item.get('id') is not None}
+    unknown = keep - current.keys()
+    if unknown:
+        raise ValueError(f'Unknown {model.__tablename__} ids: {sorted(unknown)}')
+    inserts = [dict({f: item.get(f) for f in fields}, profile_id=profile_id)
+               for item in items if item.get('id') is None]
+    updates = [dict({f: item.get(f) for f in fields}, id=item['id'])
+               for item in items if item.get('id') is not None
+               and any(getattr(current[item['id']], f) != item.get(f) for f in fields)]
+    deletes = [row_id for row_id in current if row_id not in keep]
+    if deletes:
+        model.query.filter(model.id.in_(deletes)).delete(synchronize_session=False)
+    if updates:
+        db.session.execute(db.update(model), updates)
+    if inserts:
+        db.session.execute(db.insert(model), inserts)
+    return len(inserts), len(updates), len(deletes)
@@ -0,0 +1,64 @@
+"""Time-decayed trending score for posts (Post.hot_score).
+
+Engagement adds a fixed weight to the post's score with one UPDATE, and
+the periodic 'trending.decay' task multiplies every live score by the same
+factor, so a point of engagement loses half its weight every
+TRENDING_HALF_LIFE_HOURS. A uniform decay never reorders posts, which is
+why sort_by=trending can walk an index on hot_score instead of evaluating
+a decay formula per row at query time.
+"""
+from flask import current_app
+from sqlalchemy import case
+from . import db, Post
+
+ENGAGEMENT_WEIGHTS = {
+    'view': 0.1,
+    'like': 1.0,
+    'comment': 2.0,
+}
+
+# How often the worker decays scores
+DECAY_INTERVAL_SECONDS = 600
+# Scores that decay below this drop to 0 and leave the decay batches
+SCORE_FLOOR = 0.01
+DECAY_BATCH_SIZE = 1000
+
+def decay_factor(seconds, half_life_hours):
+    return 0.5 ** (seconds / (half_life_hours * 3600))
+
+def record_engagement(post_id, kind, count=1):
+    """Add engagement to a post's hot_score, in the caller's transaction."""
+    Post.query.filter_by(id=post_id).update(
+        {Post.hot_score: Post.hot_score + ENGAGEMENT_WEIGHTS[kind] * count,
+         # Ranking input, not an edit: keep listing ETags and updated_at stable
+         Post.updated_at: Post.updated_at},
+        synchronize_session=False)
+
+def decay_hot_scores(seconds=DECAY_INTERVAL_SECONDS, batch_size=DECAY_BATCH_SIZE):
+    """Decay every non-zero score by `seconds` worth of half-life.
+
+    Walks the posts with a score in id batches, one set-based UPDATE and
+    commit per batch. Returns the number of posts decayed.
+    """
+    factor = decay_factor(seconds, current_app.config['TRENDING_HALF_LIFE_HOURS'])
+    decayed = 0
+    last_id = 0
+    while True:
+        ids = [row[0] for row in db.session.query(Post.id).filter(
+            Post.id > last_id, Post.hot_score > 0).order_by(Post.id).limit(batch_size)]
+        if not ids:
+            return decayed
+        Post.query.filter(Post.id.in_(ids)).update({
+            Post.hot_score: case((Post.hot_score * factor < SCORE_FLOOR, 0.0),
+                                 else_=Post.hot_score * factor),
+            Post.updated_at: Post.updated_at,
+        }, synchronize_session=False)
+        db.session.commit()
+        decayed += len(ids)
+        last_id = ids[-1]
+
+def initial_hot_score(likes, views, age_seconds, half_life_hours):
+    """Score of a post with existing counts, as if engagement happened at creation."""
+    score = (likes * ENGAGEMENT_WEIGHTS['like'] + views * ENGAGEMENT_WEIGHTS['view']) \
+        * decay_factor(max(age_seconds, 0), half_life_hours)
+    return score if score >= SCORE_FLOOR else 0.0
@@ -0,0 +1,233 @@
+"""Prefix autocomplete over usernames, skills and locations.
+
+Each process keeps one sorted array of lowercase keys per field, with a
+parallel array of user ids. A prefix query is a bisect to the first key
+at or after the prefix followed by a walk while keys still match, so its
+cost depends on the number of results asked for, not on the number of
+users. Fields are consulted in ranking order: username matches first,
+then skills, then locations; within a field, results come in key order.
+
+The arrays are loaded when the server starts (warm_index, called from the
+ASGI lifespan), or on first use without it. Later writes arrive like in
+matching.py: rows updated since the last sync go into a small delta and
+mask the user's old keys until the delta is merged into new arrays on a
+background thread. Deleted users keep a tombstone entry with no keys, so
+running indexes drop them on their next sync. Typo-tolerant ranking is not
+implemented yet.
+"""
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from models import db
+from models.people_search import PeopleSearchEntry
+from models.profile import Profile, Skill
+from models.user import User
+
+FIELDS = ('username', 'skill', 'location')
+COMPACT_THRESHOLD = 2000
+SYNC_OVERLAP = timedelta(seconds=30)
+REBUILD_BATCH_SIZE = 1000
+
+
+def entry_keys(username, location, skills):
+    """{field: set of keys}: whole values plus each later word, so 'new york' matches 'york'."""
+    def words(value):
+        value = (value or '').strip().lower()
+        if not value:
+            return set()
+        parts = value.split()
+        return {value} | {' '.join(parts[i:]) for i in range(1, len(parts))}
+    keys = {'username': words(username), 'skill': set(), 'location': words(location)}
+    for skill in skills:
+        keys['skill'] |= words(skill)
+    return keys
+
+
+def refresh_people_entries(user_ids, now=None):
+    """Rewrite the search entries of users, in the caller's transaction.
+
+    Users that no longer exist get a tombstone: an entry with an empty
+    username and no keys.
+    """
+    now = now or datetime.utcnow()
+    rows = {user_id: {'user_id': user_id, 'username': '', 'location': None,
+                      'skills': [], 'updated_at': now}
+            for user_id in user_ids}
+    for user_id, username, location in db.session.query(
+            User.id, User.username, Profile.location).outerjoin(
+            Profile, Profile.user_id == User.id).filter(User.id.in_(user_ids)):
+        rows[user_id].update(username=username, location=location)
+    for user_id, name in db.session.query(Profile.user_id, Skill.name).join(
+            Skill, Skill.profile_id == Profile.id).filter(Profile.user_id.in_(user_ids)):
+        rows[user_id]['skills'].append(name)
+    PeopleSearchEntry.query.filter(PeopleSearchEntry.user_id.in_(user_ids)).delete(
+        synchronize_session=False)
+    if rows:
+        db.session.execute(db.insert(PeopleSearchEntry), list(rows.values()))
+
+
+def rebuild_people_entries(batch_size=REBUILD_BATCH_SIZE, echo=None):
+    """Rewrite every entry, committing per batch of users."""
+    count = 0
+    last_id = 0
+    while True:
+        ids = [row[0] for row in db.session.query(User.id).filter(
+            User.id > last_id).order_by(User.id).limit(batch_size)]
+        if not ids:
+            break
+        refresh_people_entries(ids)
+        db.session.commit()
+        count += len(ids)
+        last_id = ids[-1]
+    if echo:
+        echo(f'people: {count} entries')
+    return count
+
+
+class _PrefixArray:
+    """Sorted (key, user_id) pairs of one field."""
+
+    def __init__(self, pairs):
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.user_ids = [user_id for _, user_id in pairs]
+
+    def scan(self, prefix, skip, limit, found):
+        """Add up to limit new user ids with a key starting with prefix to found."""
+        i = bisect_left(self.keys, prefix)
+        keys, user_ids = self.keys, self.user_ids
+        while i < len(keys) and len(found) < limit and keys[i].startswith(prefix):
+            user_id = user_ids[i]
+            if user_id not in skip and user_id not in found:
+                found[user_id] = keys[i]
+            i += 1
+
+
+class PeopleIndex:
+    """In-memory prefix index over people_search_entries for one app (database)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.arrays = {}
+        self.replaced = set()  # users whose array keys are stale
+        self.delta = {}  # user_id -> {field: keys}
+        self.watermark = None
+        self.synced_at = 0.0
+        # (user_id, keys) synced while a compaction runs; None otherwise
+        self.replays = None
+        self.compactor = None
+
+    def load(self):
+        pairs = {field: [] for field in FIELDS}
+        watermark = None
+        query = db.session.query(PeopleSearchEntry.user_id, PeopleSearchEntry.username,
+                                 PeopleSearchEntry.location, PeopleSearchEntry.skills,
+                                 PeopleSearchEntry.updated_at)
+        for user_id, username, location, skills, updated_at in query.yield_per(10000):
+            watermark = updated_at if watermark is None else max(watermark, updated_at)
+            for field, keys in entry_keys(username, location, skills).items():
+                pairs[field].extend((key, user_id) for key in keys)
+        self._set_arrays(pairs)
+        self.watermark = watermark
+        self.synced_at = time.monotonic()
+
+    def _set_arrays(self, pairs):
+        self.arrays = {field: _PrefixArray(pairs[field]) for field in FIELDS}
+        self.replaced = set()
+        self.delta = {}
+
+    def sync(self):
+        query = PeopleSearchEntry.query.order_by(PeopleSearchEntry.updated_at)
+        if self.watermark is not None:
+            query = query.filter(PeopleSearchEntry.updated_at >= self.watermark - SYNC_OVERLAP)
+        for entry in query:
+            keys = entry_keys(entry.username, entry.location, entry.skills)
+            self.replaced.add(entry.user_id)
+            self.delta[entry.user_id] = keys
+            if self.replays is not None:
+                self.replays.append((entry.user_id, keys))
+            self.watermark = entry.updated_at if self.watermark is None else max(self.watermark, entry.updated_at)
+        if self.compactor is None and len(self.delta) > COMPACT_THRESHOLD:
+            self._start_compaction()
+        self.synced_at = time.monotonic()
+
+    def _start_compaction(self):
+        """Merge the delta on a background thread; call with self.lock held."""
+        self.replays = []
+        self.compactor = threading.Thread(
+            target=self._compact, args=(self.arrays, set(self.replaced), dict(self.delta)),
+            name='people-index-compact', daemon=True)
+        self.compactor.start()
+
+    def _compact(self, arrays, replaced, delta):
+        # Sorting every key takes seconds for many users: done without the
+        # lock, which only guards the swap
+        built = None
+        try:
+            pairs = {field: [(key, user_id) for key, user_id in zip(array.keys, array.user_ids)
+                             if user_id not in replaced]
+                     for field, array in arrays.items()}
+            for user_id, keys in delta.items():
+                for field in FIELDS:
+                    pairs[field].extend((key, user_id) for key in keys[field])
+            built = {field: _PrefixArray(pairs[field]) for field in FIELDS}
+        finally:
+            with self.lock:
+                if built is not None:
+                    # Entries synced during the build stay in the delta
+                    self.arrays = built
+                    self.delta = dict(self.replays)
+                    self.replaced = set(self.delta)
+                self.replays = None
+                self.compactor = None
+
+    def search(self, prefix, limit):
+        """[(user_id, field, key)] for up to limit users, best first."""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        with self.lock:
+            if time.monotonic() - self.synced_at > current_app.config['PEOPLE_INDEX_SYNC_SECONDS']:
+                self.sync()
+            results = []
+            seen = set()
+            for field in FIELDS:
+                found = {}
+                self.arrays[field].scan(prefix, self.replaced | seen, limit - len(results), found)
+                for user_id, keys in self.delta.items():
+                    if user_id in seen or user_id in found:
+                        continue
+                    matches = [key for key in keys[field] if key.startswith(prefix)]
+                    if matches:
+                        found[user_id] = min(matches)
+                # Array hits arrive in key order; merge delta hits into it
+                for user_id, key in sorted(found.items(), key=lambda item: item[1])[:limit - len(results)]:
+                    results.append((user_id, field, key))
+                    seen.add(user_id)
+                if len(results) >= limit:
+                    break
+            return results
+
+
+_index_lock = threading.Lock()
+
+
+def get_people_index():
+    """The current app's index, loaded on first use."""
+    with _index_lock:
+        index = current_app.extensions.get('people_index')
+        if index is None:
+            index = PeopleIndex()
+            index.load()
+            current_app.extensions['people_index'] = index
+        return index
+
+
+def warm_index(app):
+    """Load app's index ahead of the first search."""
+    with app.app_context():
+        get_people_index()
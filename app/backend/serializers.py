@@ -0,0 +1,246 @@
+"""Response serialization: model schemas, sparse fieldsets and fast JSON.
+
+OrjsonProvider replaces Flask's stdlib JSON provider when orjson is
+installed (it falls back to the stdlib encoder otherwise). orjson encodes
+datetimes natively, so schemas hand it raw column values instead of calling
+isoformat() per row.
+
+A Schema maps public field names to model attributes, callables or
+Related lookups. Handlers parse `?fields=id,content` with parse_fields()
+and build rows with schema.dumper(fields). list_response() returns the list
+in one piece, or streams it in chunks as rows are serialized once it is
+long enough.
+
+Related fields go through the request's batch loaders (loaders.py): a
+dumper primes every requested Related field for a whole batch of objects
+before dumping any of them, so a page costs one query per related type.
+"""
+from datetime import date
+from functools import lru_cache
+from operator import attrgetter
+
+from flask import current_app, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+from loaders import loader
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# Rows per chunk written by a streamed list response
+STREAM_CHUNK_ROWS = 100
+
+
+def _default(o):
+    # Same wire format for dates with or without orjson (Flask's default
+    # encoder would emit an HTTP date instead)
+    if isinstance(o, date):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Keys keep their insertion (schema) order instead of being sorted. Calls
+    with extra json.dumps keyword arguments use the stdlib encoder.
+    """
+
+    sort_keys = False
+    default = staticmethod(_default)
+
+    def _options(self):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj):
+        if orjson is None:
+            return self.dumps(obj).encode()
+        return orjson.dumps(obj, default=self.default, option=self._options())
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
+
+
+class Related:
+    """A field resolved through a batch loader.
+
+    key is the attribute holding the loader key (e.g. 'user_id'); then
+    turns the loaded value into the output.
+    """
+
+    def __init__(self, loader_name, key, then=None):
+        self.loader_name = loader_name
+        self.key = attrgetter(key)
+        self.then = then or (lambda value: value)
+
+    def prime(self, objs):
+        loader(self.loader_name).prime(self.key(obj) for obj in objs)
+
+    def __call__(self, obj):
+        return self.then(loader(self.loader_name).load(self.key(obj)))
+
+
+class Dumper:
+    """Turns objects into dicts of the selected fields."""
+
+    def __init__(self, getters):
+        self.getters = getters
+        self.related = [getter for _, getter in getters if isinstance(getter, Related)]
+
+    def __call__(self, obj):
+        return self.many([obj])[0]
+
+    def many(self, objs):
+        objs = list(objs)
+        for field in self.related:
+            field.prime(objs)
+        getters = self.getters
+        return [{name: getter(obj) for name, getter in getters} for obj in objs]
+
+
+class Schema:
+    """Ordered public fields of a model.
+
+    fields maps the output name to an attribute name, a callable that takes
+    the object, or a Related lookup. default lists the fields returned when
+    the client does not ask for specific ones (all fields if None).
+    """
+
+    def __init__(self, fields, default=None):
+        self.getters = {name: attrgetter(source) if isinstance(source, str) else source
+                        for name, source in fields.items()}
+        self.default = tuple(default or self.getters)
+
+    @lru_cache(maxsize=64)
+    def dumper(self, fields=None):
+        """Return a Dumper for the fields (the default fields if None)."""
+        return Dumper([(name, self.getters[name]) for name in (fields or self.default)])
+
+    def dump(self, obj, fields=None):
+        return self.dumper(fields)(obj)
+
+    def dump_many(self, objs, fields=None):
+        return self.dumper(fields).many(objs)
+
+
+def parse_fields(value, schema):
+    """Parse a `fields=a,b` query value into a tuple for Schema.dumper.
+
+    Returns None when no fieldset was requested. Raises ValueError naming
+    the unknown fields otherwise.
+    """
+    if not value:
+        return None
+    fields = tuple(dict.fromkeys(f.strip() for f in value.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in schema.getters]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields or None
+
+
+def list_response(key, rows, dump, meta, stream=False):
+    """JSON object {key: dump.many(rows), **meta} for a Dumper.
+
+    With stream=True the body is produced chunk by chunk while rows is
+    iterated (e.g. a query with yield_per), so the whole list never exists
+    as Python objects or as one big bytes string. Related fields are then
+    batched per chunk.
+    """
+    provider = current_app.json
+    if not stream:
+        return provider.response({key: dump.many(rows), **meta})
+
+    def encode(chunk):
+        return b','.join(provider.dumps_bytes(item) for item in dump.many(chunk))
+
+    def generate():
+        head = provider.dumps_bytes(meta)
+        yield head[:-1] + (b',' if meta else b'') + provider.dumps_bytes(key) + b':['
+        chunk = []
+        first = True
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == STREAM_CHUNK_ROWS:
+                yield (b'' if first else b',') + encode(chunk)
+                first = False
+                chunk = []
+        if chunk:
+            yield (b'' if first else b',') + encode(chunk)
+        yield b']}'
+
+    return current_app.response_class(stream_with_context(generate()),
+                                      mimetype=provider.mimetype)
+
+
+def _username(user):
+    return user.username if user else None
+
+
+POST_SCHEMA = Schema({
+    'id': 'id',
+    'user_id': 'user_id',
+    'username': Related('user', 'user_id', _username),
+    'content': 'content',
+    'media_url': 'media_url',
+    'preview_url': 'preview_url',
+    'media_duration': 'media_duration',
+    'created_at': 'created_at',
+    'category': 'category',
+    'tags': 'tags',
+    'visibility': 'visibility',
+    'likes_count': 'likes_count',
+    'views_count': 'views_count',
+    'comments_count': 'comments_count',
+})
+
+USER_SCHEMA = Schema({
+    'id': 'id',
+    'username': 'username',
+    'email': 'email',
+})
+
+EXPERIENCE_SCHEMA = Schema({
+    'id': 'id',
+    'title': 'title',
+    'company': 'company',
+    'start_date': 'start_date',
+    'end_date': 'end_date',
+    'description': 'description',
+})
+
+EDUCATION_SCHEMA = Schema({
+    'id': 'id',
+    'school': 'school',
+    'degree': 'degree',
+    'field_of_study': 'field_of_study',
+    'start_year': 'start_year',
+    'end_year': 'end_year',
+})
+
+PROFILE_SCHEMA = Schema({
+    'id': 'id',
+    'user_id': 'user_id',
+    'bio': 'bio',
+    'location': 'location',
+    'image_url': 'image_url',
+    'thumbnail_url': 'thumbnail_url',
+    'skills': Related('skills_for_profile', 'id', lambda skills: [s.name for s in skills]),
+    'experiences': Related('experiences_for_profile', 'id', EXPERIENCE_SCHEMA.dump_many),
+    'educations': Related('educations_for_profile', 'id', EDUCATION_SCHEMA.dump_many),
+})
@@ -0,0 +1,54 @@
+"""Background tasks run by `flask worker` from the outbox_jobs table.
+
+Register a handler with @task('name'); it is called with the job payload
+as keyword arguments, inside an app context. Its database changes are
+committed together with the job's completion, so a handler that only
+touches the database runs exactly once. Handlers with outside effects
+(files, e-mail) must tolerate being retried.
+
+@periodic('name', seconds=...) additionally makes the worker enqueue the
+task once per interval, across all workers.
+
+To schedule work from a request handler:
+
+    from models.outbox import enqueue
+    enqueue('profile.delete_images', {'paths': [...]})
+    db.session.commit()   # the job becomes visible with the change
+"""
+from importlib import import_module
+
+TASKS = {}
+PERIODIC = {}
+
+# Modules that register tasks; imported by the worker
+TASK_MODULES = ('tasks.builtin', 'tasks.notifications', 'tasks.media')
+
+
+class Task:
+    def __init__(self, name, func, max_attempts, backoff):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+        # Seconds before the first retry; doubles on each further attempt
+        self.backoff = backoff
+
+
+def task(name, max_attempts=5, backoff=30):
+    def decorator(func):
+        TASKS[name] = Task(name, func, max_attempts, backoff)
+        return func
+    return decorator
+
+
+def periodic(name, seconds):
+    """Run an already registered task every `seconds`."""
+    def decorator(func):
+        PERIODIC[name] = seconds
+        return func
+    return decorator
+
+
+def load_tasks():
+    for module in TASK_MODULES:
+        import_module(module)
+    return TASKS
@@ -0,0 +1,72 @@
+"""Tasks the backend itself schedules."""
+import os
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from models import db
+from models.outbox import OutboxJob
+from models.idempotency import IdempotencyRecord
+from models.archive import archive_posts
+from models.trending import DECAY_INTERVAL_SECONDS, decay_hot_scores
+from . import periodic, task
+
+
+@task('profile.delete_images')
+def delete_profile_images(paths):
+    """Remove replaced profile images; missing files are fine on retry."""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+@periodic('messaging.reconcile_unread', seconds=3600)
+@task('messaging.reconcile_unread', max_attempts=1)
+def reconcile_unread():
+    from models.message import reconcile_unread_counters
+    reconcile_unread_counters()
+
+
+@periodic('outbox.purge', seconds=3600)
+@task('outbox.purge', max_attempts=1)
+def purge_finished_jobs(batch_size=1000):
+    """Delete done and failed jobs finished over OUTBOX_RETENTION_DAYS ago, in batches."""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config['OUTBOX_RETENTION_DAYS'])
+    while True:
+        ids = [row[0] for row in db.session.query(OutboxJob.id).filter(
+            OutboxJob.status.in_(('done', 'failed')), OutboxJob.finished_at < cutoff
+        ).limit(batch_size)]
+        if not ids:
+            break
+        OutboxJob.query.filter(OutboxJob.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+
+
+@periodic('idempotency.purge', seconds=3600)
+@task('idempotency.purge', max_attempts=1)
+def purge_idempotency_keys(batch_size=1000):
+    """Delete expired Idempotency-Key records, in batches."""
+    now = datetime.utcnow()
+    while True:
+        ids = [row[0] for row in db.session.query(IdempotencyRecord.id).filter(
+            IdempotencyRecord.expires_at < now).limit(batch_size)]
+        if not ids:
+            break
+        IdempotencyRecord.query.filter(IdempotencyRecord.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+
+
+@periodic('posts.archive', seconds=3600)
+@task('posts.archive', max_attempts=1)
+def archive_old_posts(max_batches=200):
+    """Move posts past POSTS_ARCHIVE_AFTER_DAYS to the archive, a bounded amount per run."""
+    if current_app.config['POSTS_ARCHIVE_AFTER_DAYS'] > 0:
+        archive_posts(max_batches=max_batches)
+
+
+@periodic('trending.decay', seconds=DECAY_INTERVAL_SECONDS)
+@task('trending.decay', max_attempts=1)
+def decay_trending():
+    decay_hot_scores()
@@ -0,0 +1,158 @@
+"""Preview derivation for uploaded post media (videos and PDFs).
+
+create_post enqueues 'media.derive' for every video or PDF, and the worker
+makes a JPEG preview: a poster frame plus duration for videos (ffmpeg and
+ffprobe), the first page for PDFs (PyMuPDF if installed, else poppler's
+pdftoppm). Run the worker with `--pool process` to keep this CPU work out
+of the web processes' way.
+
+Variants are cached by the SHA-256 of the source file, so the same upload
+is only ever derived once. A missing tool leaves the post's media_status
+'unavailable' instead of retrying; a file the tool rejects is 'failed'.
+"""
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import uuid
+
+from flask import current_app
+
+from models import db, Post
+from . import task
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:  # pragma: no cover - optional, pdftoppm is the fallback
+    fitz = None
+
+VIDEO_EXTENSIONS = {'mp4', 'mov', 'avi'}
+PDF_EXTENSIONS = {'pdf'}
+DERIVED_EXTENSIONS = VIDEO_EXTENSIONS | PDF_EXTENSIONS
+
+
+class ToolUnavailable(Exception):
+    pass
+
+
+def needs_preview(filename):
+    return filename.rsplit('.', 1)[-1].lower() in DERIVED_EXTENSIONS
+
+
+def preview_folder():
+    from api.posts import UPLOAD_FOLDER
+    return os.path.join(UPLOAD_FOLDER, 'previews')
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _tool(config_key):
+    binary = shutil.which(current_app.config[config_key])
+    if binary is None:
+        raise ToolUnavailable(current_app.config[config_key])
+    return binary
+
+
+def _run(args):
+    return subprocess.run(args, check=True, capture_output=True, text=True,
+                          timeout=current_app.config['MEDIA_DERIVE_TIMEOUT'])
+
+
+def _save_jpeg(image, out_path):
+    width = current_app.config['MEDIA_PREVIEW_WIDTH']
+    image = image.convert('RGB')
+    image.thumbnail((width, width * 4))
+    image.save(out_path, format='JPEG', quality=80, optimize=True)
+
+
+def derive_video(source, out_path):
+    """Write a poster frame to out_path; returns the duration in seconds."""
+    from PIL import Image
+    probe = _run([_tool('FFPROBE_BINARY'), '-v', 'error', '-show_entries', 'format=duration',
+                  '-of', 'default=noprint_wrappers=1:nokey=1', source])
+    duration = float(probe.stdout.strip() or 0)
+    # A frame a little in, past black intro frames, but inside short clips
+    offset = min(1.0, duration / 2)
+    with tempfile.TemporaryDirectory() as tmp:
+        frame = os.path.join(tmp, 'frame.png')
+        _run([_tool('FFMPEG_BINARY'), '-v', 'error', '-y', '-ss', f'{offset:.3f}', '-i', source,
+              '-frames:v', '1', frame])
+        with Image.open(frame) as image:
+            _save_jpeg(image, out_path)
+    return duration
+
+
+def derive_pdf(source, out_path):
+    """Write the first page to out_path."""
+    from PIL import Image
+    width = current_app.config['MEDIA_PREVIEW_WIDTH']
+    if fitz is not None:
+        with fitz.open(source) as document:
+            page = document[0]
+            zoom = width / page.rect.width
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+            image = Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+        _save_jpeg(image, out_path)
+        return None
+    with tempfile.TemporaryDirectory() as tmp:
+        prefix = os.path.join(tmp, 'page')
+        _run([_tool('PDFTOPPM_BINARY'), '-f', '1', '-l', '1', '-singlefile', '-png',
+              '-scale-to', str(width), source, prefix])
+        with Image.open(prefix + '.png') as image:
+            _save_jpeg(image, out_path)
+    return None
+
+
+def derive_variant(source):
+    """(preview file name relative to the preview folder, duration), cached by content."""
+    digest = _sha256(source)
+    name = f'{digest[:2]}/{digest}.jpg'
+    out_path = os.path.join(preview_folder(), name)
+    meta_path = out_path[:-len('.jpg')] + '.json'
+    if os.path.exists(out_path) and os.path.exists(meta_path):
+        with open(meta_path) as handle:
+            return name, json.load(handle)['duration']
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    derive = derive_video if source.rsplit('.', 1)[-1].lower() in VIDEO_EXTENSIONS else derive_pdf
+    # Build under temporary names so a crash never leaves a half-written variant
+    suffix = f'.{uuid.uuid4().hex}.tmp'
+    tmp_path = out_path + suffix
+    try:
+        duration = derive(source, tmp_path)
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    with open(meta_path + suffix, 'w') as handle:
+        json.dump({'duration': duration}, handle)
+    os.replace(meta_path + suffix, meta_path)
+    return name, duration
+
+
+@task('media.derive', max_attempts=3, backoff=60)
+def derive_post_media(post_id, path):
+    post = db.session.get(Post, post_id)
+    if post is None:
+        return
+    try:
+        name, duration = derive_variant(path)
+    except ToolUnavailable as e:
+        current_app.logger.warning('No %s on PATH; post %s has no preview', e, post_id)
+        post.media_status = 'unavailable'
+        return
+    except (subprocess.CalledProcessError, OSError, ValueError, RuntimeError) as e:
+        # The tools rejected the file: retrying will not help
+        current_app.logger.warning('Preview of post %s failed: %s', post_id, e)
+        post.media_status = 'failed'
+        return
+    post.preview_url = f'/posts/previews/{name}'
+    post.media_duration = duration
+    post.media_status = 'ready'
@@ -0,0 +1,10 @@
+"""Notification fan-out (see models/notification.py)."""
+from models.notification import fan_out
+from . import task
+
+
+@task('notifications.fanout', backoff=5)
+def fanout(kind, actor_id, recipient_ids, target_type, target_id):
+    # A concurrent batch creating the same group trips the unique index; the
+    # whole batch rolls back and the retry coalesces into that group
+    fan_out(kind, actor_id, recipient_ids, target_type, target_id)
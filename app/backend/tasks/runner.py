@@ -0,0 +1,207 @@
+"""The `flask worker` loop: claim due outbox jobs and run them in a pool.
+
+Claiming is a conditional UPDATE (status pending -> running) per job, so
+any number of workers can share one database, SQLite included, without a
+broker or row locks. A worker renews the leases (WORKER_LEASE_SECONDS) of
+the jobs it is running, so long jobs keep them; a job whose worker died is
+handed out again once its lease expires, or marked failed if that was its
+last attempt. Only the lease holder can finish a job: a worker that lost
+its lease rolls its work back. Failures are retried with exponential
+backoff until max_attempts, then the job is marked failed.
+"""
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+
+from models import db
+from models.outbox import OutboxJob, enqueue
+from . import PERIODIC, TASKS, load_tasks
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 6 * 3600
+
+
+def retry_delay(task, attempts):
+    delay = min(task.backoff * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+    return delay * random.uniform(0.9, 1.1)
+
+
+def _finish(job_id, worker, values):
+    """Update a job this worker still holds; False if its lease went to another worker."""
+    return OutboxJob.query.filter(
+        OutboxJob.id == job_id, OutboxJob.status == 'running', OutboxJob.locked_by == worker
+    ).update(values, synchronize_session=False) == 1
+
+
+def execute_job(job_id, worker):
+    """Run one job claimed by worker; must be called inside an app context."""
+    job = db.session.get(OutboxJob, job_id)
+    name, attempts, max_attempts = job.name, job.attempts, job.max_attempts
+    task = TASKS.get(name)
+    try:
+        if task is None:
+            raise LookupError(f'No task registered as {name!r}')
+        task.func(**job.args)
+        if not _finish(job_id, worker, {OutboxJob.status: 'done', OutboxJob.last_error: None,
+                                        OutboxJob.finished_at: datetime.utcnow()}):
+            db.session.rollback()
+            logger.warning('Job %s (%s) lost its lease; its work was rolled back', job_id, name)
+            return False
+        db.session.commit()
+        return True
+    except Exception:
+        error = traceback.format_exc()
+        db.session.rollback()
+        values = {OutboxJob.last_error: error[-4000:], OutboxJob.locked_by: None}
+        if task is not None and attempts < max_attempts:
+            values[OutboxJob.status] = 'pending'
+            values[OutboxJob.run_at] = datetime.utcnow() + timedelta(
+                seconds=retry_delay(task, attempts))
+        else:
+            values[OutboxJob.status] = 'failed'
+            values[OutboxJob.finished_at] = datetime.utcnow()
+        if _finish(job_id, worker, values):
+            db.session.commit()
+        logger.warning('Job %s (%s) failed on attempt %s', job_id, name, attempts)
+        return False
+    finally:
+        db.session.remove()
+
+
+# Process pool: each child builds its own app and database engine
+_process_app = None
+
+
+def _init_process(settings):
+    global _process_app
+    from main import create_app
+    _process_app = create_app(type('WorkerConfig', (), settings), blueprints=())
+    load_tasks()
+
+
+def _execute_in_process(job_id, worker):
+    with _process_app.app_context():
+        return execute_job(job_id, worker)
+
+
+class Worker:
+    def __init__(self, app, concurrency=4, pool='thread', poll_interval=1.0,
+                 lease_seconds=300, echo=None):
+        self.app = app
+        self.concurrency = concurrency
+        self.pool = pool
+        self.poll_interval = poll_interval
+        self.lease = timedelta(seconds=lease_seconds)
+        self.echo = echo or (lambda message: None)
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self._periodic_slots = {}
+        self._running = {}  # future -> job id
+        self._renewed_at = None
+
+    def _run_in_thread(self, job_id, worker):
+        with self.app.app_context():
+            return execute_job(job_id, worker)
+
+    def _executor(self):
+        if self.pool == 'process':
+            return ProcessPoolExecutor(
+                max_workers=self.concurrency, initializer=_init_process,
+                initargs=({k: v for k, v in self.app.config.items() if k.isupper()},))
+        return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='worker')
+
+    def schedule_periodic(self, now):
+        """Enqueue periodic tasks whose interval started; once across workers."""
+        for name, seconds in PERIODIC.items():
+            slot = int(now.timestamp() // seconds)
+            if self._periodic_slots.get(name) == slot:
+                continue
+            enqueue(name, key=f'periodic:{name}:{slot}', run_at=now,
+                    max_attempts=TASKS[name].max_attempts)
+            self._periodic_slots[name] = slot
+        db.session.commit()
+
+    def renew_leases(self, now):
+        """Extend the leases of the jobs this worker runs, a few times per lease."""
+        if self._renewed_at is not None and now - self._renewed_at < self.lease / 3:
+            return
+        if self._running:
+            OutboxJob.query.filter(
+                OutboxJob.id.in_(list(self._running.values())),
+                OutboxJob.status == 'running', OutboxJob.locked_by == self.name
+            ).update({OutboxJob.locked_at: now}, synchronize_session=False)
+            db.session.commit()
+        self._renewed_at = now
+
+    def release_expired_leases(self, now):
+        """Hand out jobs whose worker died again, or fail them after their last attempt."""
+        expired = (OutboxJob.status == 'running', OutboxJob.locked_at < now - self.lease)
+        OutboxJob.query.filter(*expired, OutboxJob.attempts >= OutboxJob.max_attempts).update(
+            {OutboxJob.status: 'failed', OutboxJob.locked_by: None, OutboxJob.finished_at: now,
+             OutboxJob.last_error: 'Lease expired on the last attempt'},
+            synchronize_session=False)
+        OutboxJob.query.filter(*expired).update(
+            {OutboxJob.status: 'pending', OutboxJob.locked_by: None},
+            synchronize_session=False)
+        db.session.commit()
+
+    def claim(self, now, limit):
+        """Claim up to limit due jobs; returns their ids."""
+        candidates = [row[0] for row in db.session.query(OutboxJob.id).filter(
+            OutboxJob.status == 'pending', OutboxJob.run_at <= now
+        ).order_by(OutboxJob.run_at).limit(limit)]
+        claimed = []
+        for job_id in candidates:
+            # Another worker may have claimed it since the SELECT
+            updated = OutboxJob.query.filter(
+                OutboxJob.id == job_id, OutboxJob.status == 'pending'
+            ).update({OutboxJob.status: 'running', OutboxJob.locked_by: self.name,
+                      OutboxJob.locked_at: now, OutboxJob.attempts: OutboxJob.attempts + 1},
+                     synchronize_session=False)
+            if updated:
+                claimed.append(job_id)
+        db.session.commit()
+        return claimed
+
+    def tick(self):
+        with self.app.app_context():
+            now = datetime.utcnow()
+            self.schedule_periodic(now)
+            self.renew_leases(now)
+            self.release_expired_leases(now)
+            free = self.concurrency - len(self._running)
+            return self.claim(now, free) if free > 0 else []
+
+    def run(self, once=False):
+        """Process jobs until interrupted; with once=True, until none are due."""
+        load_tasks()
+        self._running = {}
+        self.echo(f'Worker {self.name}: {self.concurrency} {self.pool} slots, '
+                  f'{len(TASKS)} tasks, {len(PERIODIC)} periodic')
+        with self._executor() as executor:
+            run_job = _execute_in_process if self.pool == 'process' else self._run_in_thread
+            try:
+                while True:
+                    for job_id in self.tick():
+                        self._running[executor.submit(run_job, job_id, self.name)] = job_id
+                    if once and not self._running:
+                        return
+                    if self._running:
+                        done, _ = wait(self._running, timeout=self.poll_interval,
+                                       return_when=FIRST_COMPLETED)
+                        for future in done:
+                            if future.exception() is not None:
+                                # execute_job records task errors itself; this is
+                                # the database or the pool failing
+                                logger.error('Worker slot crashed', exc_info=future.exception())
+                        for future in done:
+                            del self._running[future]
+                    else:
+                        time.sleep(self.poll_interval)
+            except KeyboardInterrupt:
+                self.echo('Stopping; waiting for running jobs to finish')
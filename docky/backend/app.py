@@ -1,12 +1,17 @@
 import os
+import base64
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
+from sqlalchemy import tuple_
+from sqlalchemy.orm import joinedload
 from models import db, User, Post
 from werkzeug.utils import secure_filename
 from datetime import datetime
 
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'mp4', 'mov', 'avi', 'pdf'}
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
 
 app = Flask(__name__)
 CORS(app)
@@ -23,6 +28,9 @@ def allowed_file(filename):
 def create_tables():
     with app.app_context():
         db.create_all()
+        # create_all skips tables that already exist; add indexes added later
+        for index in Post.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
 
 @app.route('/api/posts', methods=['POST'])
 def create_post():
@@ -51,18 +59,68 @@ def create_post():
 def get_media(filename):
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
+def post_to_dict(p):
+    return {
+        'id': p.id,
+        'username': p.user.username,
+        'content': p.content,
+        'media_url': p.media_url,
+        'created_at': p.created_at.isoformat()
+    }
+
+def encode_cursor(post):
+    raw = f'{post.created_at.isoformat()}|{post.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    created_at, post_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(created_at), int(post_id)
+
 @app.route('/api/posts', methods=['GET'])
 def list_posts():
-    posts = Post.query.order_by(Post.created_at.desc()).all()
-    return jsonify([
-        {
-            'id': p.id,
-            'username': p.user.username,
-            'content': p.content,
-            'media_url': p.media_url,
-            'created_at': p.created_at.isoformat()
-        } for p in posts
-    ])
+    """Posts with their authors, one page at a time.
+
+    Default: newest first, limit per page (max 100), continue with
+    ?cursor=<next_cursor>. With ?since_id=N only posts newer than id N are
+    returned, oldest first, so a client can poll for what it has not seen.
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        since_id = request.args.get('since_id')
+        since_id = int(since_id) if since_id is not None else None
+    except ValueError:
+        return jsonify({'error': 'limit and since_id must be integers'}), 400
+    # Authors come in the same query instead of one lazy load per post
+    query = Post.query.options(joinedload(Post.user))
+
+    if since_id is not None:
+        posts = query.filter(Post.id > since_id).order_by(Post.id).limit(limit + 1).all()
+        has_more = len(posts) > limit
+        posts = posts[:limit]
+        return jsonify({
+            'posts': [post_to_dict(p) for p in posts],
+            'latest_id': posts[-1].id if posts else since_id,
+            'has_more': has_more
+        })
+
+    query = query.order_by(Post.created_at.desc(), Post.id.desc())
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            created_at, post_id = decode_cursor(cursor)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        # Row-value comparison so the (created_at, id) index seeks to the cursor
+        query = query.filter(tuple_(Post.created_at, Post.id) < (created_at, post_id))
+    # One extra row tells whether there is a next page
+    posts = query.limit(limit + 1).all()
+    has_more = len(posts) > limit
+    posts = posts[:limit]
+    return jsonify({
+        'posts': [post_to_dict(p) for p in posts],
+        'next_cursor': encode_cursor(posts[-1]) if has_more else None,
+        'latest_id': max((p.id for p in posts), default=None)
+    })
 
 if __name__ == '__main__':
     create_tables()
@@ -14,5 +14,10 @@ class Post(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     content = db.Column(db.Text, nullable=False)
     media_url = db.Column(db.String(256), nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    # Add more metadata fields as needed 
\ No newline at end of file
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Add more metadata fields as needed
+
+    __table_args__ = (
+        # Newest-first listing and keyset pagination on (created_at, id)
+        db.Index('idx_post_created_at_id', 'created_at', 'id'),
+    ) 
\ No newline at end of file
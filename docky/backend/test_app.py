@@ -0,0 +1,25 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import unittest
+from app import app
+
+
+class ListPostsArgsTestCase(unittest.TestCase):
+    """Malformed paging arguments are rejected before any query runs."""
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_non_integer_args(self):
+        for query in ('limit=ten', 'since_id=abc', 'since_id=', 'since_id=1.5'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/posts?{query}')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.get_json(),
+                                 {'error': 'limit and since_id must be integers'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,22 +4,26 @@ const AdminDashboard = () => {
   const [posts, setPosts] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+
+  const fetchPosts = async (cursor) => {
+    setLoading(true);
+    setError('');
+    try {
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const res = await fetch(`http://localhost:5000/api/posts${query}`);
+      if (!res.ok) throw new Error('Failed to fetch posts');
+      const data = await res.json();
+      setPosts(prev => cursor ? [...prev, ...data.posts] : data.posts);
+      setNextCursor(data.next_cursor);
+    } catch (err) {
+      setError('Failed to fetch posts.');
+    }
+    setLoading(false);
+  };
 
   useEffect(() => {
-    const fetchPosts = async () => {
-      setLoading(true);
-      setError('');
-      try {
-        const res = await fetch('http://localhost:5000/api/posts');
-        if (!res.ok) throw new Error('Failed to fetch posts');
-        const data = await res.json();
-        setPosts(data);
-      } catch (err) {
-        setError('Failed to fetch posts.');
-      }
-      setLoading(false);
-    };
-    fetchPosts();
+    fetchPosts(null);
   }, []);
 
   return (
@@ -51,6 +55,9 @@ const AdminDashboard = () => {
           ))}
         </tbody>
       </table>
+      {nextCursor && !loading && (
+        <button className="mt-4 px-4 py-2 border rounded" onClick={() => fetchPosts(nextCursor)}>Load more</button>
+      )}
     </div>
   );
 };
@@ -0,0 +1,125 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'app', 'backend')))
+
+import unittest
+from unittest import mock
+from sqlalchemy import select
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+try:
+    from main import create_app, db
+    from config import TestingConfig
+    from models import Post
+    from models.user import User
+    from models.archive import ArchivedPost, archive_posts
+    from models.comment import Comment
+    from commands.users import purge_users
+    import serializers
+except ImportError:
+    from app.backend.main import create_app, db
+    from app.backend.config import TestingConfig
+    from app.backend.models import Post
+    from app.backend.models.user import User
+    from app.backend.models.archive import ArchivedPost, archive_posts
+    from app.backend.models.comment import Comment
+    from app.backend.commands.users import purge_users
+    from app.backend import serializers
+
+app = create_app(TestingConfig, blueprints=('posts', 'comments'))
+
+
+class ArchiveTestCase(unittest.TestCase):
+    """Old posts move to posts_archive and stay readable and commentable."""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add(User(id=1, username='u', email='u@e.com', password_hash='!'))
+        old = datetime.utcnow() - timedelta(days=800)
+        # Posts 1-3 are old enough for the archive, 4-5 stay hot
+        for i in range(1, 6):
+            created_at = old + timedelta(days=i) if i <= 3 else datetime.utcnow() - timedelta(days=5 - i)
+            db.session.add(Post(id=i, user_id=1, content=f'post {i} ' * 20, created_at=created_at,
+                                category='old' if i <= 3 else 'new', tags='a,b' if i == 1 else 'a'))
+        db.session.commit()
+        self.client = app.test_client()
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity="1")}'}
+
+    def tearDown(self):
+        app.extensions.pop('posts_archive_counts', None)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_archive_moves_old_posts_with_comments(self):
+        db.session.add(Comment(post_id=1, user_id=1, path='0000000001', content='hi'))
+        db.session.commit()
+        self.assertEqual(archive_posts(batch_size=2), 3)
+        self.assertEqual(sorted(p.id for p in ArchivedPost.query), [1, 2, 3])
+        self.assertEqual(sorted(p.id for p in Post.query), [4, 5])
+        self.assertEqual(db.session.get(ArchivedPost, 1).content, 'post 1 ' * 20)
+        self.assertEqual(Comment.query.one().post_id, 1)
+
+    def test_listing_falls_through_to_archive(self):
+        archive_posts()
+        newest = self.client.get('/posts/?per_page=3').get_json()
+        self.assertEqual([p['id'] for p in newest['posts']], [5, 4, 3])
+        self.assertEqual(newest['total'], 5)
+        page = self.client.get('/posts/?per_page=3&page=2').get_json()
+        self.assertEqual([p['id'] for p in page['posts']], [2, 1])
+        oldest = self.client.get('/posts/?per_page=2&sort_order=asc').get_json()
+        self.assertEqual([p['id'] for p in oldest['posts']], [1, 2])
+        # Popularity sorts stop at hot posts
+        liked = self.client.get('/posts/?sort_by=likes_count').get_json()
+        self.assertEqual(liked['total'], 2)
+
+    def test_large_pages_stream_across_the_archive(self):
+        archive_posts()
+        per_page = app.config['JSON_STREAM_MIN_ITEMS']
+        self.assertLessEqual(per_page, app.config['POSTS_MAX_PER_PAGE'])
+        buffered = self.client.get('/posts/?per_page=10')
+        self.assertIn('Content-Length', buffered.headers)
+        with mock.patch.object(serializers, 'STREAM_CHUNK_ROWS', 2):
+            streamed = self.client.get(f'/posts/?per_page={per_page}')
+        # Written while serialized: no length known up front
+        self.assertNotIn('Content-Length', streamed.headers)
+        body = streamed.get_json()
+        self.assertEqual([p['id'] for p in body['posts']], [5, 4, 3, 2, 1])
+        self.assertEqual(body['posts'], buffered.get_json()['posts'])
+        self.assertEqual((body['total'], body['per_page']), (5, per_page))
+
+    def test_archive_totals_follow_purges(self):
+        db.session.add(User(id=2, username='gone', email='g@e.com', password_hash='!'))
+        db.session.add(Post(id=6, user_id=2, content='old',
+                            created_at=datetime.utcnow() - timedelta(days=900)))
+        db.session.commit()
+        archive_posts()
+        self.assertEqual(self.client.get('/posts/').get_json()['total'], 6)
+        # The newest archived post stays, so only the generation tells the cache
+        purge_users(select(User.id).where(User.id == 2))
+        self.assertEqual(self.client.get('/posts/').get_json()['total'], 5)
+
+    def test_comment_on_archived_post_keeps_it_archived(self):
+        archive_posts()
+        response = self.client.post('/posts/2/comments', json={'content': 'late'}, headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(db.session.get(Post, 2))
+        self.assertEqual(db.session.get(ArchivedPost, 2).comments_count, 1)
+        comments = self.client.get('/posts/2/comments').get_json()['comments']
+        self.assertEqual([c['content'] for c in comments], ['late'])
+        response = self.client.delete(f"/posts/comments/{comments[0]['id']}", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(ArchivedPost, 2).comments_count, 0)
+
+    def test_categories_and_tags_include_archive(self):
+        archive_posts()
+        self.assertEqual(self.client.get('/posts/categories').get_json(), ['new', 'old'])
+        tags = self.client.get('/posts/popular-tags').get_json()
+        self.assertEqual(tags, [{'tag': 'a', 'count': 5}, {'tag': 'b', 'count': 1}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'app', 'backend')))
+
+import asyncio
+import io
+import json
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from flask_jwt_extended import create_access_token
+from PIL import Image
+try:
+    from main import create_app, db
+    from config import TestingConfig
+    from models.user import User
+    import asgi
+    import api.profile as profile_api
+except ImportError:
+    from app.backend.main import create_app, db
+    from app.backend.config import TestingConfig
+    from app.backend.models.user import User
+    from app.backend import asgi
+    from app.backend.api import profile as profile_api
+
+app = create_app(TestingConfig, blueprints=())
+profile_app = create_app(TestingConfig, blueprints=('profile',))
+
+CONTENT = bytes(range(256)) * 1000
+
+
+class MediaTestCase(unittest.TestCase):
+    """Media served natively on the event loop: ranges, revalidation and CORS."""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.folder.name, 'clip.mp4'), 'wb') as f:
+            f.write(CONTENT)
+        patcher = mock.patch.object(asgi, 'POST_MEDIA_FOLDER', self.folder.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.folder.cleanup)
+        self.application = asgi.BackendASGI(app)
+
+    def get(self, path='/posts/media/clip.mp4', method='GET', **headers):
+        scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+                 'headers': [(name.replace('_', '-').lower().encode(), value.encode())
+                             for name, value in headers.items()]}
+        messages = []
+
+        async def receive():
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(self.application(scope, receive, send))
+        start = messages[0]
+        response_headers = {name.decode(): value.decode() for name, value in start['headers']}
+        body = b''.join(m.get('body', b'') for m in messages[1:])
+        return start['status'], response_headers, body
+
+    def test_whole_file(self):
+        status, headers, body = self.get()
+        self.assertEqual(status, 200)
+        self.assertEqual(body, CONTENT)
+        self.assertEqual(headers['content-type'], 'video/mp4')
+        self.assertEqual(headers['accept-ranges'], 'bytes')
+        self.assertEqual(headers['content-length'], str(len(CONTENT)))
+
+    def test_byte_ranges(self):
+        size = len(CONTENT)
+        status, headers, body = self.get(Range='bytes=100-70000')
+        self.assertEqual(status, 206)
+        self.assertEqual(body, CONTENT[100:70001])
+        self.assertEqual(headers['content-range'], f'bytes 100-70000/{size}')
+        self.assertEqual(self.get(Range='bytes=-10')[2], CONTENT[-10:])
+        self.assertEqual(self.get(Range=f'bytes={size - 5}-')[2], CONTENT[-5:])
+        status, headers, _ = self.get(Range=f'bytes={size}-')
+        self.assertEqual(status, 416)
+        self.assertEqual(headers['content-range'], f'bytes */{size}')
+        # Multiple ranges may be answered with the whole file
+        self.assertEqual(self.get(Range='bytes=0-1,5-6')[0], 200)
+
+    def test_conditional_requests(self):
+        _, headers, _ = self.get()
+        status, _, body = self.get(If_None_Match=headers['etag'])
+        self.assertEqual((status, body), (304, b''))
+        self.assertEqual(self.get(If_Modified_Since=headers['last-modified'])[0], 304)
+        self.assertEqual(self.get(If_None_Match='"other"')[0], 200)
+        # A stale If-Range gets the whole file instead of a range of it
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range='"other"')[0], 200)
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range=headers['etag'])[0], 206)
+
+    def test_cors_headers(self):
+        _, headers, _ = self.get(Origin='http://localhost:3000')
+        self.assertEqual(headers['access-control-allow-origin'], 'http://localhost:3000')
+        _, headers, _ = self.get('/posts/media/missing.mp4', Origin='http://localhost:3000')
+        self.assertEqual(headers['access-control-allow-origin'], 'http://localhost:3000')
+        _, headers, _ = self.get('/api/messages/stream', Origin='http://localhost:3000')
+        self.assertEqual(headers['access-control-allow-origin'], 'http://localhost:3000')
+
+
+class ProfileImageTestCase(unittest.TestCase):
+    """Profile images are resized on the CPU executor, not in the Flask view."""
+
+    def setUp(self):
+        self.ctx = profile_app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add(User(id=1, username='u', email='u@e.com', password_hash='!'))
+        db.session.commit()
+        self.token = create_access_token(identity='1')
+        self.folder = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(profile_api, 'UPLOAD_FOLDER', self.folder.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.folder.cleanup)
+        self.application = asgi.BackendASGI(profile_app)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def upload(self):
+        image = io.BytesIO()
+        Image.new('RGB', (800, 600)).save(image, format='PNG')
+        boundary = 'b0undary'
+        body = (f'--{boundary}\r\nContent-Disposition: form-data; name="image"; '
+                f'filename="me.png"\r\nContent-Type: image/png\r\n\r\n').encode() \
+            + image.getvalue() + f'\r\n--{boundary}--\r\n'.encode()
+        scope = {'type': 'http', 'method': 'POST', 'path': '/api/profile/image',
+                 'query_string': b'', 'http_version': '1.1', 'headers': [
+                     (b'content-type', f'multipart/form-data; boundary={boundary}'.encode()),
+                     (b'content-length', str(len(body)).encode()),
+                     (b'authorization', f'Bearer {self.token}'.encode())]}
+        chunks = [body[i:i + 4096] for i in range(0, len(body), 4096)]
+        messages = []
+
+        async def receive():
+            chunk = chunks.pop(0)
+            return {'type': 'http.request', 'body': chunk, 'more_body': bool(chunks)}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(self.application(scope, receive, send))
+        return messages[0]['status'], b''.join(m.get('body', b'') for m in messages[1:])
+
+    def test_resized_off_the_worker_thread(self):
+        threads = []
+        original = profile_api.make_profile_images
+
+        def make_profile_images(stream):
+            threads.append(threading.current_thread().name)
+            return original(stream)
+
+        with mock.patch.object(asgi, 'make_profile_images', make_profile_images), \
+                mock.patch.object(profile_api, 'make_profile_images', side_effect=AssertionError):
+            status, body = self.upload()
+        self.assertEqual(status, 200, body)
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('asgi-cpu'))
+        thumbnail = os.path.basename(json.loads(body)['thumbnail_url'])
+        with Image.open(os.path.join(self.folder.name, thumbnail)) as img:
+            self.assertEqual(img.size, (128, 96))
+
+
+if __name__ == '__main__':
+    unittest.main()
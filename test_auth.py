@@ -7,21 +7,22 @@ from flask_jwt_extended import decode_token
 import io
 from PIL import Image as PILImage
 try:
-    from main import app, db
+    from main import create_app, db
+    from config import TestingConfig
     from api.auth import limiter
     from models.user import User
 except ImportError:
-from app.backend.main import app, db
+    from app.backend.main import create_app, db
+    from app.backend.config import TestingConfig
     from app.backend.api.auth import limiter
-from app.backend.models.user import User
+    from app.backend.models.user import User
+
+app = create_app(TestingConfig)
 
 class AuthTestCase(unittest.TestCase):
     """Test authentication endpoints: signup, login, and profile."""
     def setUp(self):
         self.app = app.test_client()
-        app.config['TESTING'] = True
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-        app.config['RATELIMIT_ENABLED'] = False
         limiter.enabled = False
         with app.app_context():
             db.create_all()
@@ -69,7 +70,7 @@ class AuthTestCase(unittest.TestCase):
         self.assertIn('token', data)
         # Decode JWT inside app context
         with app.app_context():
-        decoded = decode_token(data['token'])
+            decoded = decode_token(data['token'])
             self.assertEqual(decoded['sub'], '1')
 
     def test_login_invalid(self):
@@ -0,0 +1,93 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'app', 'backend')))
+
+import unittest
+from unittest import mock
+try:
+    from main import create_app, db
+    from config import TestingConfig
+    from models import Post
+    from models.user import User
+    from models.backfill import BackfillCheckpoint
+    from backfills import BackfillConflict, load_backfills, reset_backfill, run_backfill
+    from backfills.posts import normalize_tags
+except ImportError:
+    from app.backend.main import create_app, db
+    from app.backend.config import TestingConfig
+    from app.backend.models import Post
+    from app.backend.models.user import User
+    from app.backend.models.backfill import BackfillCheckpoint
+    from app.backend.backfills import BackfillConflict, load_backfills, reset_backfill, run_backfill
+    from app.backend.backfills.posts import normalize_tags
+
+app = create_app(TestingConfig, blueprints=())
+
+
+class BackfillTestCase(unittest.TestCase):
+    """Keyset batches committed with their checkpoint; one run at a time."""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add(User(id=1, username='u', email='u@e.com', password_hash='!'))
+        db.session.add_all(Post(id=i, user_id=1, content=f'post {i}', tags='Python, flask,python ')
+                           for i in range(1, 6))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def tags(self):
+        db.session.expire_all()
+        return {post.id: post.tags for post in Post.query}
+
+    def test_normalize_tags(self):
+        self.assertEqual(normalize_tags('Python, flask,python '), 'flask,python')
+        self.assertIsNone(normalize_tags(' , '))
+        self.assertEqual(normalize_tags(''), '')
+
+    def test_resumes_from_checkpoint(self):
+        state = run_backfill('posts.normalize_tags', batch_size=2, pause=0, max_batches=1)
+        self.assertEqual((state.status, state.last_id, state.end_id, state.rows_done),
+                         ('running', 2, 5, 2))
+        self.assertEqual(self.tags()[2], 'flask,python')
+        self.assertEqual(self.tags()[3], 'Python, flask,python ')
+        # Rows created after the start are new code's to write
+        db.session.add(Post(id=6, user_id=1, content='new', tags='B,a'))
+        db.session.commit()
+        state = run_backfill('posts.normalize_tags', batch_size=2, pause=0)
+        self.assertEqual((state.status, state.rows_done, state.batches_done), ('done', 5, 3))
+        tags = self.tags()
+        self.assertEqual({tags[i] for i in range(1, 6)}, {'flask,python'})
+        self.assertEqual(tags[6], 'B,a')
+        # Done stays done until reset
+        self.assertEqual(run_backfill('posts.normalize_tags', pause=0).rows_done, 5)
+        self.assertTrue(reset_backfill('posts.normalize_tags'))
+        self.assertEqual(run_backfill('posts.normalize_tags', pause=0).rows_done, 6)
+        self.assertEqual(self.tags()[6], 'a,b')
+
+    def test_concurrent_run_conflicts(self):
+        spec = load_backfills()['posts.normalize_tags']
+        original = spec.func
+
+        def overtaken(ids):
+            original(ids)
+            # Another run's batch moves the checkpoint first (one shared
+            # in-memory connection here, so through the same session)
+            BackfillCheckpoint.query.update({BackfillCheckpoint.last_id: 4})
+
+        run_backfill('posts.normalize_tags', batch_size=2, pause=0, max_batches=1)
+        with mock.patch.object(spec, 'func', overtaken):
+            with self.assertRaises(BackfillConflict):
+                run_backfill('posts.normalize_tags', batch_size=2, pause=0)
+        # Nothing of the losing batch is committed
+        self.assertEqual(self.tags()[3], 'Python, flask,python ')
+        self.assertEqual(db.session.get(BackfillCheckpoint, 'posts.normalize_tags').last_id, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'app', 'backend')))
+
+import unittest
+from flask_jwt_extended import create_access_token
+try:
+    from main import create_app, db
+    from config import TestingConfig
+    from models import Post
+    from models.user import User
+    from models.outbox import OutboxJob
+    from models.comment import Comment, MAX_DEPTH, delete_threads
+except ImportError:
+    from app.backend.main import create_app, db
+    from app.backend.config import TestingConfig
+    from app.backend.models import Post
+    from app.backend.models.user import User
+    from app.backend.models.outbox import OutboxJob
+    from app.backend.models.comment import Comment, MAX_DEPTH, delete_threads
+
+app = create_app(TestingConfig, blueprints=('comments',))
+
+
+class CommentTestCase(unittest.TestCase):
+    """Threaded comments: materialized paths, paging and denormalized counts."""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add_all([User(id=1, username='author', email='a@e.com', password_hash='!'),
+                            User(id=2, username='reader', email='r@e.com', password_hash='!'),
+                            Post(id=1, user_id=1, content='post')])
+        db.session.commit()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def comment(self, content, parent_id=None, user_id=2):
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+        response = self.client.post('/posts/1/comments', headers=headers,
+                                    json={'content': content, 'parent_id': parent_id})
+        self.assertEqual(response.status_code, 201, response.get_json())
+        return response.get_json()['comment']['id']
+
+    def post(self):
+        db.session.expire_all()
+        return db.session.get(Post, 1)
+
+    def test_replies_come_depth_first_by_cursor(self):
+        top = self.comment('top')
+        a = self.comment('a', top)
+        a1 = self.comment('a1', a)
+        b = self.comment('b', top, user_id=1)
+        a2 = self.comment('a2', a)
+        other = self.comment('other top')
+        seen, url = [], f'/posts/comments/{top}/replies?limit=2'
+        while url:
+            body = self.client.get(url).get_json()
+            seen += [c['id'] for c in body['replies']]
+            url = body['next_cursor'] and \
+                f"/posts/comments/{top}/replies?limit=2&cursor={body['next_cursor']}"
+        self.assertEqual(seen, [a, a1, a2, b])
+        tops = self.client.get('/posts/1/comments?limit=1').get_json()
+        self.assertEqual([c['id'] for c in tops['comments']], [other])
+        tops = self.client.get(f"/posts/1/comments?before_id={tops['next_before_id']}").get_json()
+        self.assertEqual([c['id'] for c in tops['comments']], [top])
+        self.assertEqual(tops['comments'][0]['reply_count'], 2)
+        self.assertEqual(self.post().comments_count, 6)
+        # Nobody is notified of their own post or comment being answered
+        events = sorted((job.args['kind'], job.args['recipient_ids'])
+                        for job in OutboxJob.query.filter_by(name='notifications.fanout'))
+        self.assertEqual(events, [('comment_replied', [2])] + [('post_commented', [1])] * 5)
+
+    def test_depth_limit(self):
+        parent = None
+        for depth in range(MAX_DEPTH):
+            parent = self.comment(f'depth {depth}', parent)
+        headers = {'Authorization': f'Bearer {create_access_token(identity="2")}'}
+        response = self.client.post('/posts/1/comments', headers=headers,
+                                    json={'content': 'too deep', 'parent_id': parent})
+        self.assertEqual(response.status_code, 400)
+
+    def test_soft_delete_keeps_the_thread(self):
+        top = self.comment('top')
+        reply = self.comment('reply', top)
+        author = {'Authorization': f'Bearer {create_access_token(identity="1")}'}
+        self.assertEqual(self.client.delete(f'/posts/comments/{top}', headers=author).status_code, 403)
+        reader = {'Authorization': f'Bearer {create_access_token(identity="2")}'}
+        self.assertEqual(self.client.delete(f'/posts/comments/{top}', headers=reader).status_code, 200)
+        listed = self.client.get('/posts/1/comments').get_json()['comments'][0]
+        self.assertEqual((listed['status'], listed['content'], listed['user_id']), ('deleted', None, None))
+        replies = self.client.get(f'/posts/comments/{top}/replies').get_json()['replies']
+        self.assertEqual([c['id'] for c in replies], [reply])
+        self.assertEqual(self.post().comments_count, 1)
+
+    def test_delete_threads_removes_subtrees(self):
+        top = self.comment('top')
+        a = self.comment('a', top)
+        self.comment('a1', a)
+        b = self.comment('b', top)
+        other = self.comment('other')
+        self.client.delete(f'/posts/comments/{b}',
+                           headers={'Authorization': f'Bearer {create_access_token(identity="2")}'})
+        db.session.expire_all()
+        self.assertEqual(delete_threads([db.session.get(Comment, a), db.session.get(Comment, b)]), 3)
+        db.session.commit()
+        self.assertEqual(sorted(c.id for c in Comment.query), [top, other])
+        self.assertEqual(db.session.get(Comment, top).reply_count, 0)
+        # b was already deleted, so only a and a1 were still counted
+        self.assertEqual(self.post().comments_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
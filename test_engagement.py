@@ -0,0 +1,105 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'app', 'backend')))
+
+import unittest
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from sqlalchemy import select
+try:
+    from main import create_app, db
+    from config import TestingConfig
+    from models import Post
+    from models.user import User
+    from models.archive import ArchivedPost, archive_posts
+    from models.engagement import PostLike
+    from commands.users import purge_users
+except ImportError:
+    from app.backend.main import create_app, db
+    from app.backend.config import TestingConfig
+    from app.backend.models import Post
+    from app.backend.models.user import User
+    from app.backend.models.archive import ArchivedPost, archive_posts
+    from app.backend.models.engagement import PostLike
+    from app.backend.commands.users import purge_users
+
+app = create_app(TestingConfig, blueprints=('posts',))
+
+
+class EngagementTestCase(unittest.TestCase):
+    """Likes and views update the post counters and feed sort_by=trending."""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        for i in (1, 2, 3):
+            db.session.add(User(id=i, username=f'u{i}', email=f'u{i}@e.com', password_hash='!'))
+        db.session.add_all([Post(id=1, user_id=1, content='first'),
+                            Post(id=2, user_id=2, content='second')])
+        db.session.commit()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        app.extensions.pop('posts_archive_counts', None)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def auth(self, user_id):
+        return {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+
+    def post(self, post_id):
+        db.session.expire_all()
+        return db.session.get(Post, post_id)
+
+    def trending(self):
+        with app.app_context():
+            response = self.client.get('/posts/?sort_by=trending')
+        return [p['id'] for p in response.get_json()['posts']]
+
+    def test_like_and_unlike(self):
+        self.assertEqual(self.trending(), [2, 1])
+        for _ in range(2):
+            response = self.client.post('/posts/1/like', headers=self.auth(3))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json(), {'liked': True, 'likes_count': 1})
+        self.assertEqual(self.post(1).hot_score, 1.0)
+        self.assertEqual(self.trending(), [1, 2])
+        response = self.client.delete('/posts/1/like', headers=self.auth(3))
+        self.assertEqual(response.get_json(), {'liked': False, 'likes_count': 0})
+        self.assertEqual(PostLike.query.count(), 0)
+
+    def test_view(self):
+        self.assertEqual(self.client.post('/posts/1/view').status_code, 204)
+        post = self.post(1)
+        self.assertEqual(post.views_count, 1)
+        self.assertAlmostEqual(post.hot_score, 0.1)
+        self.assertEqual(self.trending(), [1, 2])
+
+    def test_missing_post(self):
+        self.assertEqual(self.client.post('/posts/9/like', headers=self.auth(3)).status_code, 404)
+        self.assertEqual(self.client.post('/posts/9/view').status_code, 404)
+
+    def test_archived_post(self):
+        db.session.get(Post, 1).created_at = datetime.utcnow() - timedelta(days=800)
+        db.session.commit()
+        archive_posts()
+        self.client.post('/posts/1/like', headers=self.auth(3))
+        self.client.post('/posts/1/view')
+        db.session.expire_all()
+        archived = db.session.get(ArchivedPost, 1)
+        self.assertEqual((archived.likes_count, archived.views_count), (1, 1))
+
+    def test_purge_takes_likes_off_counts(self):
+        for user_id in (2, 3):
+            self.client.post('/posts/1/like', headers=self.auth(user_id))
+        self.client.post('/posts/2/like', headers=self.auth(3))
+        totals = purge_users(select(User.id).where(User.id == 2))
+        self.assertEqual(totals['post_likes'], 2)
+        self.assertEqual(self.post(1).likes_count, 1)
+        self.assertEqual([(like.post_id, like.user_id) for like in PostLike.query], [(1, 3)])
+
+
+if __name__ == '__main__':
+    unittest.main()
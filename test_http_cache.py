@@ -0,0 +1,96 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'app', 'backend')))
+
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import select
+try:
+    from main import create_app, db
+    from config import TestingConfig
+    from models import Post
+    from models.user import User
+    from models.archive import archive_posts, find_post
+    from models.comment import Comment, add_comment
+    from models.trending import record_engagement, decay_hot_scores
+    from commands.users import purge_users
+    from backfills.posts import recount_post_comments
+except ImportError:
+    from app.backend.main import create_app, db
+    from app.backend.config import TestingConfig
+    from app.backend.models import Post
+    from app.backend.models.user import User
+    from app.backend.models.archive import archive_posts, find_post
+    from app.backend.models.comment import Comment, add_comment
+    from app.backend.models.trending import record_engagement, decay_hot_scores
+    from app.backend.commands.users import purge_users
+    from app.backend.backfills.posts import recount_post_comments
+
+app = create_app(TestingConfig, blueprints=('posts',))
+
+
+class PostsETagTestCase(unittest.TestCase):
+    """Listing ETags change whenever what the listing shows may have changed."""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        for i in (1, 2):
+            db.session.add(User(id=i, username=f'u{i}', email=f'u{i}@e.com', password_hash='!'))
+        old = datetime.utcnow() - timedelta(days=800)
+        db.session.add_all([Post(id=1, user_id=1, content='old', created_at=old),
+                            Post(id=2, user_id=2, content='new', category='news')])
+        db.session.commit()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        app.extensions.pop('posts_archive_counts', None)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def etag(self, url='/posts/'):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.headers['ETag']
+
+    def assertChanges(self, change, url='/posts/'):
+        before = self.etag(url)
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': before}).status_code, 304)
+        change()
+        db.session.commit()
+        self.assertNotEqual(self.etag(url), before)
+
+    def test_insert_and_edit(self):
+        self.assertChanges(lambda: db.session.add(Post(user_id=1, content='more')))
+        self.assertChanges(lambda: setattr(db.session.get(Post, 2), 'content', 'edited'),
+                           '/posts/?category=news')
+
+    def test_archive_and_archived_comments(self):
+        self.assertChanges(archive_posts)
+        self.assertChanges(lambda: add_comment(find_post(1), 2, 'late'))
+
+    def test_purge(self):
+        self.assertChanges(lambda: purge_users(select(User.id).where(User.id == 2)),
+                           '/posts/categories')
+
+    def test_trending_follows_hot_scores(self):
+        url = '/posts/?sort_by=trending'
+        self.assertChanges(lambda: record_engagement(1, 'like'), url)
+        self.assertChanges(decay_hot_scores, url)
+        # Other sorts keep their ETag: engagement is not an edit
+        before = self.etag()
+        record_engagement(2, 'like')
+        db.session.commit()
+        self.assertEqual(self.etag(), before)
+
+    def test_recounted_comments(self):
+        db.session.add(Comment(post_id=2, user_id=1, path='0000000001', content='hi'))
+        db.session.commit()
+        self.assertChanges(lambda: recount_post_comments([1, 2]))
+        self.assertEqual(db.session.get(Post, 2).comments_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'app', 'backend')))
+
+import unittest
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+try:
+    from main import create_app, db
+    from config import TestingConfig
+    from models import Post
+    from models.user import User
+    from models.idempotency import IdempotencyRecord
+except ImportError:
+    from app.backend.main import create_app, db
+    from app.backend.config import TestingConfig
+    from app.backend.models import Post
+    from app.backend.models.user import User
+    from app.backend.models.idempotency import IdempotencyRecord
+
+app = create_app(TestingConfig, blueprints=('posts',))
+
+
+class IdempotencyTestCase(unittest.TestCase):
+    """POST /posts/ with an Idempotency-Key runs at most once per key."""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add(User(id=1, username='u', email='u@e.com', password_hash='!'))
+        db.session.add(User(id=2, username='v', email='v@e.com', password_hash='!'))
+        db.session.commit()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def post(self, content='hello', key='k1'):
+        return self.client.post('/posts/', data={'user_id': '1', 'content': content},
+                                headers={'Idempotency-Key': key})
+
+    def claim(self, age):
+        now = datetime.utcnow()
+        db.session.add(IdempotencyRecord(
+            scope='posts.create_post', key='k1', fingerprint=self.fingerprint(),
+            status='in_progress', created_at=now - age, expires_at=now + timedelta(days=1)))
+        db.session.commit()
+
+    def fingerprint(self):
+        # The fingerprint of self.post(), taken from a real request
+        self.post(key='probe')
+        record = IdempotencyRecord.query.filter_by(key='probe').one()
+        Post.query.delete()
+        db.session.commit()
+        return record.fingerprint
+
+    def test_retry_replays_the_first_response(self):
+        first = self.post()
+        second = self.post()
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.get_data(), first.get_data())
+        self.assertEqual(second.headers['Idempotent-Replayed'], 'true')
+        self.assertNotIn('Idempotent-Replayed', first.headers)
+        self.assertEqual(Post.query.count(), 1)
+
+    def test_key_reused_for_another_request(self):
+        self.post()
+        response = self.post(content='something else')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Post.query.count(), 1)
+
+    def test_retry_while_in_progress(self):
+        self.claim(age=timedelta(seconds=1))
+        response = self.post()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.headers['Retry-After'], '1')
+        self.assertEqual(Post.query.count(), 0)
+
+    def test_stale_claim_is_taken_over(self):
+        self.claim(age=timedelta(seconds=app.config['IDEMPOTENCY_LEASE_SECONDS'] + 1))
+        response = self.post()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Post.query.count(), 1)
+        self.assertEqual(IdempotencyRecord.query.filter_by(key='k1').one().status, 'done')
+        self.assertEqual(self.post().headers['Idempotent-Replayed'], 'true')
+
+    def test_client_errors_are_replayed(self):
+        data = {'user_id': '1'}
+        first = self.client.post('/posts/', data=data, headers={'Idempotency-Key': 'k1'})
+        second = self.client.post('/posts/', data=data, headers={'Idempotency-Key': 'k1'})
+        self.assertEqual(first.status_code, 400)
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(second.headers['Idempotent-Replayed'], 'true')
+
+    def test_keys_are_scoped_per_user(self):
+        data = {'user_id': '1', 'content': 'hello'}
+        for user_id in (1, 2):
+            token = create_access_token(identity=str(user_id))
+            response = self.client.post('/posts/', data=data, headers={
+                'Idempotency-Key': 'k1', 'Authorization': f'Bearer {token}'})
+            self.assertEqual(response.status_code, 201)
+            self.assertNotIn('Idempotent-Replayed', response.headers)
+        self.assertEqual(Post.query.count(), 2)
+        self.assertEqual(sorted(r.scope for r in IdempotencyRecord.query),
+                         ['posts.create_post:1', 'posts.create_post:2'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'app', 'backend')))
+
+import re
+import shutil
+import tempfile
+import unittest
+try:
+    from main import create_app, db
+    from config import TestingConfig
+    from models.user import User
+    import instrumentation
+except ImportError:
+    from app.backend.main import create_app, db
+    from app.backend.config import TestingConfig
+    from app.backend.models.user import User
+    from app.backend import instrumentation
+
+
+class InstrumentedConfig(TestingConfig):
+    INSTRUMENTATION_ENABLED = True
+
+
+app = create_app(InstrumentedConfig, blueprints=('posts',))
+plain_app = create_app(TestingConfig, blueprints=('posts',))
+
+
+@app.route('/_timed')
+def timed_view():
+    with instrumentation.timed('pil'):
+        User.query.count()
+    return 'ok'
+
+
+class InstrumentationTestCase(unittest.TestCase):
+    """Server-Timing, /metrics, the query-count warning and slow-request profiles."""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        app.config.update(QUERY_COUNT_WARNING=0, PROFILE_SAMPLE_RATE=0.0)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def requests_total(self, endpoint):
+        text = self.client.get('/metrics').get_data(as_text=True)
+        match = re.search(r'^http_requests_total\{endpoint="%s",method="GET",status="200"\} (\S+)$'
+                          % re.escape(endpoint), text, re.M)
+        return float(match.group(1)) if match else 0.0
+
+    def test_server_timing(self):
+        response = self.client.get('/posts/')
+        self.assertEqual(response.status_code, 200)
+        timing = response.headers['Server-Timing']
+        self.assertRegex(timing, r'^app;dur=[\d.]+, ')
+        queries = re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', timing)
+        self.assertIsNotNone(queries, timing)
+        self.assertGreater(int(queries.group(1)), 0)
+        self.assertRegex(self.client.get('/_timed').headers['Server-Timing'],
+                         r'db;dur=[\d.]+;desc="1 queries", pil;dur=[\d.]+$')
+
+    def test_metrics_count_requests(self):
+        before = self.requests_total('posts.list_posts')
+        self.client.get('/posts/')
+        self.client.get('/posts/')
+        self.assertEqual(self.requests_total('posts.list_posts'), before + 2)
+        text = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertRegex(text, r'db_queries_total\{endpoint="posts.list_posts"\} [1-9]')
+
+    def test_query_count_warning(self):
+        app.config['QUERY_COUNT_WARNING'] = 1
+        with self.assertLogs(instrumentation.logger, 'WARNING') as logs:
+            self.client.get('/posts/')
+        self.assertIn('GET /posts/ ran', logs.output[0])
+
+    def test_slow_requests_are_profiled(self):
+        profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, profile_dir)
+        app.config.update(PROFILE_SAMPLE_RATE=1.0, PROFILE_SLOW_REQUEST_MS=0,
+                          PROFILE_DIR=profile_dir, PROFILER='cprofile')
+        self.client.get('/posts/')
+        [name] = os.listdir(profile_dir)
+        self.assertRegex(name, r'^\d+_posts_list_posts_\d+ms\.prof$')
+
+    def test_off_by_default(self):
+        with plain_app.app_context():
+            db.create_all()
+            response = plain_app.test_client().get('/posts/')
+            self.assertNotIn('Server-Timing', response.headers)
+            self.assertEqual(plain_app.test_client().get('/metrics').status_code, 404)
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'app', 'backend')))
+
+import threading
+import unittest
+from unittest import mock
+try:
+    from main import create_app, db
+    from config import TestingConfig
+    from models.user import User
+    from models.profile import Profile, Skill
+    from models.job import Job
+    import matching
+except ImportError:
+    from app.backend.main import create_app, db
+    from app.backend.config import TestingConfig
+    from app.backend.models.user import User
+    from app.backend.models.profile import Profile, Skill
+    from app.backend.models.job import Job
+    from app.backend import matching
+
+app = create_app(TestingConfig, blueprints=())
+
+
+class MatchingTestCase(unittest.TestCase):
+    """TF-IDF matching, incremental sync and background compaction."""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        app.config['MATCH_SYNC_SECONDS'] = 0
+        for i, skills in enumerate((['python', 'flask'], ['rust', 'tokio'], ['python', 'django'])):
+            db.session.add(User(id=i + 1, username=f'u{i}', email=f'u{i}@e.com', password_hash='!'))
+            db.session.add(Profile(id=i + 1, user_id=i + 1))
+            db.session.add_all(Skill(profile_id=i + 1, name=name) for name in skills)
+        db.session.add_all([
+            Job(id=1, title='Python developer', company='A', location='X', description='flask apis'),
+            Job(id=2, title='Rust engineer', company='B', location='Y', description='tokio services'),
+        ])
+        db.session.commit()
+        matching.rebuild_vectors()
+
+    def tearDown(self):
+        index = app.extensions.pop('match_index', None)
+        compactor = index and index.compactor
+        if compactor is not None:
+            compactor.join()
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_jobs_for_profile_ranks_by_skills(self):
+        self.assertEqual([job_id for job_id, _ in matching.jobs_for_profile(1)], [1])
+        self.assertEqual([job_id for job_id, _ in matching.jobs_for_profile(2)], [2])
+
+    def test_candidates_for_job(self):
+        ranked = [profile_id for profile_id, _ in matching.candidates_for_job(1)]
+        self.assertEqual(ranked[0], 1)
+        self.assertIn(3, ranked)
+        self.assertNotIn(2, ranked)
+
+    def test_profile_edit_reaches_index(self):
+        matching.get_index()
+        Skill.query.filter_by(profile_id=2).delete()
+        db.session.add(Skill(profile_id=2, name='python'))
+        matching.refresh_profile_vectors([2])
+        db.session.commit()
+        self.assertIn(2, [profile_id for profile_id, _ in matching.candidates_for_job(1)])
+
+    def test_compaction_runs_off_the_request_path(self):
+        index = matching.get_index()
+        before = index.sides['profile']
+        release = threading.Event()
+        original = matching._Side.compacted
+
+        def slow_compacted(side, n_terms):
+            release.wait(5)
+            return original(side, n_terms)
+
+        with mock.patch.object(matching, 'COMPACT_THRESHOLD', 0), \
+                mock.patch.object(matching._Side, 'compacted', slow_compacted):
+            db.session.add(Skill(profile_id=2, name='flask'))
+            matching.refresh_profile_vectors([2])
+            db.session.commit()
+            # Starts the compaction and returns without waiting for it
+            self.assertIn(2, [p for p, _ in matching.candidates_for_job(1)])
+            compactor = index.compactor
+            self.assertIsNotNone(compactor)
+            # A change synced meanwhile is replayed onto the new side
+            Skill.query.filter_by(profile_id=3).delete()
+            matching.refresh_profile_vectors([3])
+            db.session.commit()
+            self.assertNotIn(3, [p for p, _ in matching.candidates_for_job(1)])
+            release.set()
+            compactor.join()
+        self.assertIsNot(index.sides['profile'], before)
+        ranked = [p for p, _ in matching.candidates_for_job(1)]
+        self.assertIn(2, ranked)
+        self.assertNotIn(3, ranked)
+
+    def test_repeated_tombstones_keep_dead_rows_bounded(self):
+        side = matching.get_index().sides['profile']
+        cols, vals = side.matrix.getrow(0).indices, side.matrix.getrow(0).data
+        for _ in range(3):
+            side.replace(1, cols[:0], vals[:0])
+            side.replace(1, cols, vals)
+        side.replace(1, cols[:0], vals[:0])
+        self.assertEqual(side.dead, {0})
+        self.assertNotIn(1, [p for p, _ in side.top_k(cols, vals, 10)])
+        self.assertEqual(side.compacted(side.matrix.shape[1]).ids.tolist(), [2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
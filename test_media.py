@@ -0,0 +1,111 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'app', 'backend')))
+
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+from PIL import Image
+try:
+    from main import create_app, db
+    from config import TestingConfig
+    from models import Post
+    from models.user import User
+    from tasks import media
+except ImportError:
+    from app.backend.main import create_app, db
+    from app.backend.config import TestingConfig
+    from app.backend.models import Post
+    from app.backend.models.user import User
+    from app.backend.tasks import media
+
+app = create_app(TestingConfig, blueprints=())
+
+
+class MediaDerivationTestCase(unittest.TestCase):
+    """Worker-side previews: cached by content, failures recorded on the post."""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add(User(id=1, username='u', email='u@e.com', password_hash='!'))
+        db.session.add(Post(id=1, user_id=1, content='clip', media_status='pending'))
+        db.session.commit()
+        self.tmp = tempfile.mkdtemp()
+        patcher = mock.patch.object(media, 'preview_folder',
+                                    lambda: os.path.join(self.tmp, 'previews'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.derived = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def upload(self, name, data=b'media bytes'):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'wb') as handle:
+            handle.write(data)
+        return path
+
+    def fake_derive(self, source, out_path):
+        self.derived.append(source)
+        Image.new('RGB', (8, 8)).save(out_path, format='JPEG')
+        return 12.5
+
+    def post(self):
+        db.session.expire_all()
+        return db.session.get(Post, 1)
+
+    def test_variant_cached_by_content(self):
+        with mock.patch.object(media, 'derive_video', self.fake_derive):
+            first = media.derive_variant(self.upload('a.mp4'))
+            again = media.derive_variant(self.upload('b.mp4'))
+            other = media.derive_variant(self.upload('c.mp4', b'other bytes'))
+        self.assertEqual(first, again)
+        self.assertNotEqual(first[0], other[0])
+        self.assertEqual(first[1], 12.5)
+        self.assertEqual(len(self.derived), 2)
+        previews = os.path.join(self.tmp, 'previews')
+        files = [name for _, _, names in os.walk(previews) for name in names]
+        self.assertFalse([name for name in files if name.endswith('.tmp')])
+
+    def test_task_sets_preview(self):
+        with mock.patch.object(media, 'derive_pdf', self.fake_derive):
+            media.derive_post_media(1, self.upload('doc.PDF'))
+        db.session.commit()
+        post = self.post()
+        self.assertEqual(post.media_status, 'ready')
+        self.assertTrue(post.preview_url.startswith('/posts/previews/'))
+        self.assertEqual(post.media_duration, 12.5)
+
+    def test_missing_tool_and_rejected_file(self):
+        app.config['FFPROBE_BINARY'] = 'no-such-ffprobe'
+        try:
+            media.derive_post_media(1, self.upload('a.mov'))
+        finally:
+            app.config['FFPROBE_BINARY'] = TestingConfig.FFPROBE_BINARY
+        db.session.commit()
+        self.assertEqual(self.post().media_status, 'unavailable')
+
+        def rejected(source, out_path):
+            with open(out_path, 'wb') as handle:
+                handle.write(b'partial')
+            raise subprocess.CalledProcessError(1, 'ffprobe')
+
+        with mock.patch.object(media, 'derive_video', rejected):
+            media.derive_post_media(1, self.upload('b.mov', b'broken'))
+        db.session.commit()
+        self.assertEqual(self.post().media_status, 'failed')
+        # Nothing half-written is left to be served from the cache
+        self.assertEqual([name for _, _, names in os.walk(os.path.join(self.tmp, 'previews'))
+                          for name in names], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'app', 'backend')))
+
+import unittest
+from flask_jwt_extended import create_access_token
+try:
+    from main import create_app, db
+    from config import TestingConfig
+    from models.user import User
+    from models.message import Message, UnreadCounter, reconcile_unread_counters
+except ImportError:
+    from app.backend.main import create_app, db
+    from app.backend.config import TestingConfig
+    from app.backend.models.user import User
+    from app.backend.models.message import Message, UnreadCounter, reconcile_unread_counters
+
+app = create_app(TestingConfig, blueprints=('messaging',))
+
+
+class MessagingTestCase(unittest.TestCase):
+    """Unread counters and read watermarks stay in step with the messages."""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        for i in (1, 2, 3):
+            db.session.add(User(id=i, username=f'u{i}', email=f'u{i}@e.com', password_hash='!'))
+        db.session.commit()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def auth(self, user_id):
+        return {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+
+    def send(self, sender, recipient, content='hi'):
+        response = self.client.post('/api/messages', json={'recipient_id': recipient, 'content': content},
+                                    headers=self.auth(sender))
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()['message']['id']
+
+    def unread(self, user_id):
+        return self.client.get('/api/messages/unread', headers=self.auth(user_id)).get_json()['total']
+
+    def read(self, user_id, peer_id, up_to_id):
+        response = self.client.post('/api/messages/read', json={'peer_id': peer_id, 'up_to_id': up_to_id},
+                                    headers=self.auth(user_id))
+        return response.get_json()['conversations'][0]
+
+    def test_send_and_read(self):
+        first = self.send(1, 2)
+        self.send(1, 2)
+        self.send(3, 2)
+        self.assertEqual(self.unread(2), 3)
+        self.assertEqual(self.unread(1), 0)
+        self.assertEqual(self.read(2, 1, first), {'peer_id': 1, 'unread_count': 1,
+                                                   'last_read_message_id': first})
+        self.assertEqual(self.unread(2), 2)
+        # The watermark never moves backwards
+        self.assertEqual(self.read(2, 1, 0)['last_read_message_id'], first)
+
+    def test_read_is_clamped_to_the_newest_message(self):
+        newest = self.send(1, 2)
+        counter = self.read(2, 1, 10 ** 9)
+        self.assertEqual(counter['last_read_message_id'], newest)
+        later = self.send(1, 2)
+        self.assertEqual(self.unread(2), 1)
+        self.assertEqual(self.read(2, 1, later)['unread_count'], 0)
+
+    def test_reconcile_repairs_drift_and_missing_counters(self):
+        self.send(1, 2)
+        self.send(1, 2)
+        UnreadCounter.query.filter_by(user_id=2, peer_id=1).update({'unread_count': 7})
+        # A message written around the counters, e.g. by a bulk import
+        db.session.add(Message(sender_id=3, recipient_id=1, content='imported'))
+        db.session.commit()
+        self.assertEqual(reconcile_unread_counters(batch_size=1), 2)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(UnreadCounter, (2, 1)).unread_count, 2)
+        self.assertEqual(db.session.get(UnreadCounter, (1, 3)).unread_count, 1)
+        self.assertEqual(db.session.get(UnreadCounter, (1, 2)).unread_count, 0)
+        self.assertEqual(reconcile_unread_counters(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
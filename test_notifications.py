@@ -0,0 +1,93 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'app', 'backend')))
+
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+from flask_jwt_extended import create_access_token
+try:
+    from main import create_app, db
+    from config import TestingConfig
+    from models.user import User
+    from models.outbox import OutboxJob
+    from models import notification
+    from models.notification import Notification, fan_out, notify, unread_notification_count
+except ImportError:
+    from app.backend.main import create_app, db
+    from app.backend.config import TestingConfig
+    from app.backend.models.user import User
+    from app.backend.models.outbox import OutboxJob
+    from app.backend.models import notification
+    from app.backend.models.notification import Notification, fan_out, notify, unread_notification_count
+
+app = create_app(TestingConfig, blueprints=('notifications',))
+
+
+class NotificationTestCase(unittest.TestCase):
+    """Fan-out through the outbox, grouping, counters and the inbox API."""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add_all(User(id=i, username=f'u{i}', email=f'u{i}@e.com', password_hash='!')
+                           for i in range(1, 5))
+        db.session.commit()
+        self.client = app.test_client()
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity="1")}'}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_notify_enqueues_batches_without_the_actor(self):
+        with mock.patch.object(notification, 'FANOUT_BATCH_SIZE', 2):
+            notify('post_commented', 2, [1, 2, 3, 4, 3], 'post', 7)
+        db.session.commit()
+        batches = [job.args['recipient_ids'] for job in OutboxJob.query.order_by(OutboxJob.id)]
+        self.assertEqual(batches, [[1, 3], [4]])
+        self.assertEqual(Notification.query.count(), 0)
+
+    def test_events_coalesce_until_read(self):
+        now = datetime.utcnow()
+        self.assertEqual(fan_out('post_liked', 2, [1, 3], 'post', 7, now), 2)
+        self.assertEqual(fan_out('post_liked', 4, [1], 'post', 7, now + timedelta(seconds=1)), 0)
+        db.session.commit()
+        group = Notification.query.filter_by(user_id=1).one()
+        self.assertEqual((group.actor_count, group.last_actor_id), (2, 4))
+        self.assertEqual(unread_notification_count(1), 1)
+
+        response = self.client.post('/api/notifications/read', json={'ids': [group.id]},
+                                    headers=self.headers)
+        self.assertEqual(response.get_json(), {'marked': 1, 'unread_count': 0})
+        # A read group is closed: the next event opens a new one
+        fan_out('post_liked', 3, [1], 'post', 7)
+        db.session.commit()
+        self.assertEqual(Notification.query.filter_by(user_id=1).count(), 2)
+        self.assertEqual(unread_notification_count(1), 1)
+
+    def test_inbox_pages_by_cursor(self):
+        start = datetime.utcnow()
+        for target_id in range(5):
+            fan_out('post_liked', 2, [1], 'post', target_id, start + timedelta(seconds=target_id))
+        db.session.commit()
+        seen = []
+        url = '/api/notifications?limit=2'
+        while url:
+            body = self.client.get(url, headers=self.headers).get_json()
+            seen += [(n['target_id'], n['last_actor_username']) for n in body['notifications']]
+            url = body['next_cursor'] and f"/api/notifications?limit=2&cursor={body['next_cursor']}"
+        self.assertEqual(seen, [(target_id, 'u2') for target_id in (4, 3, 2, 1, 0)])
+        self.assertEqual(body['unread_count'], 5)
+        response = self.client.get('/api/notifications?cursor=bad', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/notifications/read', json={'all': True}, headers=self.headers)
+        self.assertEqual(response.get_json()['marked'], 5)
+        unread = self.client.get('/api/notifications/unread', headers=self.headers).get_json()
+        self.assertEqual(unread, {'unread_count': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'app', 'backend')))
+
+import unittest
+from datetime import datetime, timedelta
+try:
+    from main import create_app, db
+    from config import TestingConfig
+    from models.outbox import OutboxJob, enqueue
+    from tasks import TASKS, task
+    from tasks.builtin import purge_finished_jobs
+    from tasks.runner import Worker, execute_job
+except ImportError:
+    from app.backend.main import create_app, db
+    from app.backend.config import TestingConfig
+    from app.backend.models.outbox import OutboxJob, enqueue
+    from app.backend.tasks import TASKS, task
+    from app.backend.tasks.builtin import purge_finished_jobs
+    from app.backend.tasks.runner import Worker, execute_job
+
+app = create_app(TestingConfig, blueprints=())
+
+
+class OutboxTestCase(unittest.TestCase):
+    """Jobs exist if and only if the transaction that enqueued them commits."""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_enqueue_commits_with_caller(self):
+        enqueue('profile.delete_images', {'paths': []})
+        db.session.commit()
+        self.assertEqual(OutboxJob.query.count(), 1)
+
+    def test_enqueue_after_read_rolls_back(self):
+        # Only a SELECT before the savepoint: the job must not commit on its own
+        OutboxJob.query.count()
+        enqueue('profile.delete_images', {'paths': []}, key='k')
+        db.session.rollback()
+        self.assertEqual(OutboxJob.query.count(), 0)
+
+    def test_enqueue_same_key_once(self):
+        first = enqueue('profile.delete_images', key='k')
+        db.session.commit()
+        second = enqueue('profile.delete_images', key='k')
+        db.session.commit()
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(OutboxJob.query.count(), 1)
+
+
+class WorkerTestCase(unittest.TestCase):
+    """Leases: renewed while a job runs, only their holder finishes the job."""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.calls = []
+        task('test.record', max_attempts=2)(lambda **args: self.calls.append(args))
+        self.worker = Worker(app, concurrency=2, lease_seconds=60)
+
+    def tearDown(self):
+        TASKS.pop('test.record', None)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def claim(self, worker, now):
+        ids = worker.claim(now, 10)
+        worker._running.update((object(), job_id) for job_id in ids)
+        return ids
+
+    def job(self, job_id):
+        db.session.expire_all()
+        return db.session.get(OutboxJob, job_id)
+
+    def test_running_job_keeps_its_lease(self):
+        job = enqueue('test.record', {'n': 1})
+        db.session.commit()
+        job_id = job.id
+        now = datetime.utcnow()
+        self.assertEqual(self.claim(self.worker, now), [job_id])
+        later = now + timedelta(seconds=50)
+        self.worker.renew_leases(later)
+        self.worker.release_expired_leases(later + timedelta(seconds=30))
+        self.assertEqual(self.job(job_id).status, 'running')
+        self.assertTrue(execute_job(job_id, self.worker.name))
+        self.assertEqual(self.job(job_id).status, 'done')
+        self.assertEqual(self.calls, [{'n': 1}])
+
+    def test_only_the_lease_holder_finishes(self):
+        job = enqueue('test.record', {'n': 1})
+        db.session.commit()
+        job_id = job.id
+        now = datetime.utcnow()
+        self.claim(self.worker, now)
+        # The worker stalls, its lease expires and another worker takes the job
+        self.worker.release_expired_leases(now + timedelta(seconds=61))
+        other = Worker(app, lease_seconds=60)
+        other.name = 'other'
+        self.assertEqual(self.claim(other, now + timedelta(seconds=61)), [job_id])
+        self.assertFalse(execute_job(job_id, self.worker.name))
+        self.assertEqual(self.job(job_id).locked_by, 'other')
+        self.assertEqual(self.job(job_id).status, 'running')
+        self.assertTrue(execute_job(job_id, 'other'))
+        self.assertEqual(self.job(job_id).status, 'done')
+
+    def test_expired_last_attempt_fails(self):
+        job = enqueue('test.record', max_attempts=1)
+        db.session.commit()
+        job_id = job.id
+        now = datetime.utcnow()
+        self.claim(self.worker, now)
+        self.worker.release_expired_leases(now + timedelta(seconds=61))
+        self.assertEqual(self.job(job_id).status, 'failed')
+        self.assertEqual(self.worker.claim(now + timedelta(seconds=61), 10), [])
+
+    def test_purge_removes_done_and_failed_jobs(self):
+        old = datetime.utcnow() - timedelta(days=app.config['OUTBOX_RETENTION_DAYS'] + 1)
+        for status in ('done', 'failed', 'pending'):
+            db.session.add(OutboxJob(name='test.record', status=status,
+                                     finished_at=None if status == 'pending' else old))
+        db.session.commit()
+        purge_finished_jobs()
+        self.assertEqual([job.status for job in OutboxJob.query], ['pending'])
+
+
+if __name__ == '__main__':
+    unittest.main()
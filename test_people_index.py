@@ -0,0 +1,107 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'app', 'backend')))
+
+import threading
+import unittest
+from unittest import mock
+try:
+    from main import create_app, db
+    from config import TestingConfig
+    from models.user import User
+    from models.profile import Profile, Skill
+    import people_index
+except ImportError:
+    from app.backend.main import create_app, db
+    from app.backend.config import TestingConfig
+    from app.backend.models.user import User
+    from app.backend.models.profile import Profile, Skill
+    from app.backend import people_index
+
+app = create_app(TestingConfig, blueprints=('posts',))
+
+
+class PeopleIndexTestCase(unittest.TestCase):
+    """Prefix autocomplete, incremental sync and background compaction."""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        app.config['PEOPLE_INDEX_SYNC_SECONDS'] = 0
+        for i, (name, location, skill) in enumerate((('alice', 'New York', 'python'),
+                                                     ('bob', 'Berlin', 'rust'),
+                                                     ('alina', 'Boston', 'pytorch'))):
+            db.session.add(User(id=i + 1, username=name, email=f'{name}@e.com', password_hash='!'))
+            db.session.add(Profile(id=i + 1, user_id=i + 1, location=location))
+            db.session.add(Skill(profile_id=i + 1, name=skill))
+        db.session.commit()
+        people_index.rebuild_people_entries()
+        self.index = people_index.get_people_index()
+
+    def tearDown(self):
+        index = app.extensions.pop('people_index', None)
+        compactor = index and index.compactor
+        if compactor is not None:
+            compactor.join()
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def search(self, prefix, limit=10):
+        return [(user_id, field) for user_id, field, _ in self.index.search(prefix, limit)]
+
+    def test_fields_in_ranking_order(self):
+        self.assertEqual(self.search('al'), [(1, 'username'), (3, 'username')])
+        self.assertEqual(self.search('b'), [(2, 'username'), (3, 'location')])
+        self.assertEqual(self.search('py'), [(1, 'skill'), (3, 'skill')])
+        self.assertEqual(self.search('york'), [(1, 'location')])
+        self.assertEqual(self.search('al', limit=1), [(1, 'username')])
+
+    def test_deleted_user_leaves_a_tombstone(self):
+        db.session.delete(db.session.get(Skill, 2))
+        db.session.delete(db.session.get(Profile, 2))
+        db.session.delete(db.session.get(User, 2))
+        people_index.refresh_people_entries([2])
+        db.session.commit()
+        self.assertEqual(self.search('b'), [(3, 'location')])
+
+    def test_post_author_gets_an_entry(self):
+        with app.test_client() as client:
+            response = client.post('/posts/', data={'user_id': 'carol@e.com', 'content': 'hi'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([field for _, field in self.search('carol')], ['username'])
+
+    def test_compaction_runs_off_the_request_path(self):
+        before = self.index.arrays
+        release = threading.Event()
+        original = people_index._PrefixArray.__init__
+
+        def slow_init(array, pairs):
+            release.wait(5)
+            original(array, pairs)
+
+        with mock.patch.object(people_index, 'COMPACT_THRESHOLD', 0), \
+                mock.patch.object(people_index._PrefixArray, '__init__', slow_init):
+            db.session.get(User, 2).username = 'bobby'
+            people_index.refresh_people_entries([2])
+            db.session.commit()
+            # Starts the compaction and returns without waiting for it
+            self.assertEqual(self.search('bobby'), [(2, 'username')])
+            compactor = self.index.compactor
+            self.assertIsNotNone(compactor)
+            # An entry synced meanwhile stays in the delta after the swap
+            db.session.get(User, 1).username = 'zed'
+            people_index.refresh_people_entries([1])
+            db.session.commit()
+            self.assertEqual(self.search('al'), [(3, 'username')])
+            release.set()
+            compactor.join()
+        self.assertIsNot(self.index.arrays, before)
+        self.assertEqual(self.search('zed'), [(1, 'username')])
+        self.assertEqual(self.search('al'), [(3, 'username')])
+        self.assertEqual(self.search('bobby'), [(2, 'username')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'app', 'backend')))
+
+import io
+import unittest
+from unittest import mock
+from flask_jwt_extended import create_access_token
+from sqlalchemy.exc import IntegrityError
+from PIL import Image
+try:
+    from main import create_app, db
+    from config import TestingConfig
+    from models.user import User
+    from models.profile import Profile, Skill, Experience
+    from api import profile as profile_api
+except ImportError:
+    from app.backend.main import create_app, db
+    from app.backend.config import TestingConfig
+    from app.backend.models.user import User
+    from app.backend.models.profile import Profile, Skill, Experience
+    from app.backend.api import profile as profile_api
+
+app = create_app(TestingConfig, blueprints=('profile',))
+
+
+class ProfileWriteTestCase(unittest.TestCase):
+    """Profile saves: diffed child rows, If-Match, one profile per user."""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add(User(id=1, username='u', email='u@e.com', password_hash='!'))
+        db.session.commit()
+        self.client = app.test_client()
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity="1")}'}
+
+    def tearDown(self):
+        app.extensions.pop('match_index', None)
+        app.extensions.pop('people_index', None)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def save(self, method, body, etag=None):
+        headers = dict(self.headers, **({'If-Match': etag} if etag else {}))
+        return self.request(method, json=body, headers=headers)
+
+    def request(self, method, **kwargs):
+        # A context of its own, like a served request: batch loaders cache on g
+        with app.app_context():
+            return self.client.open('/api/profile', method=method, **kwargs)
+
+    def test_patch_writes_only_changes(self):
+        created = self.save('PATCH', {'skills': ['Python', 'Rust'],
+                                      'experiences': [{'title': 'Dev', 'company': 'A'},
+                                                      {'title': 'Lead', 'company': 'B'}]})
+        self.assertEqual(created.status_code, 200)
+        skill_ids = {s.name: s.id for s in Skill.query}
+        experiences = self.request('GET', headers=self.headers).get_json()['profile']['experiences']
+        dev, lead = sorted(experiences, key=lambda e: e['title'])
+        response = self.save('PATCH', {
+            'skills': ['python', 'Go'],
+            'experiences': [dict(dev, company='C')],
+        }, created.headers['ETag'])
+        self.assertEqual(response.status_code, 200)
+        db.session.expire_all()
+        # Python keeps its row (names match case-insensitively), Rust is gone
+        self.assertEqual({s.name: s.id for s in Skill.query if s.name != 'Go'}, {'python': skill_ids['Python']})
+        self.assertEqual([(e.id, e.company) for e in Experience.query], [(dev['id'], 'C')])
+        self.assertEqual(db.session.get(Profile, 1).version, 2)
+        self.assertNotEqual(response.headers['ETag'], created.headers['ETag'])
+
+    def test_stale_or_missing_if_match(self):
+        for method in ('PUT', 'PATCH'):
+            with self.subTest(method=method):
+                Profile.query.delete()
+                db.session.commit()
+                first = self.save(method, {'bio': 'one'})
+                self.assertEqual(first.status_code, 200)
+                etag = first.headers['ETag']
+                self.assertEqual(self.save(method, {'bio': 'two'}, etag).status_code, 200)
+                # A second save from the same stale copy is refused
+                self.assertEqual(self.save(method, {'bio': 'three'}, etag).status_code, 412)
+                db.session.expire_all()
+                self.assertEqual(Profile.query.one().bio, 'two')
+
+    def test_if_match_required_on_patch_only(self):
+        self.assertEqual(self.save('PATCH', {'bio': 'one'}).status_code, 200)
+        self.assertEqual(self.save('PATCH', {'bio': 'two'}).status_code, 428)
+        # PUT keeps working for clients that never send If-Match
+        response = self.save('PUT', {'bio': 'three'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['profile']['bio'], 'three')
+        self.assertEqual(db.session.get(Profile, 1).version, 2)
+
+    def test_write_losing_the_version_race(self):
+        etag = self.save('PUT', {'bio': 'one'}).headers['ETag']
+        original = profile_api.bump_version
+
+        def concurrent_save_first(profile_id, expected=None):
+            # Another save lands between the If-Match check and this write
+            original(profile_id)
+            return original(profile_id, expected)
+
+        for method in ('PUT', 'PATCH'):
+            with self.subTest(method=method), \
+                    mock.patch.object(profile_api, 'bump_version', concurrent_save_first):
+                self.assertEqual(self.save(method, {'bio': 'two'}, etag).status_code, 412)
+                db.session.expire_all()
+                self.assertEqual(Profile.query.one().bio, 'one')
+
+    def test_image_upload_moves_the_etag(self):
+        etag = self.save('PATCH', {'bio': 'one'}).headers['ETag']
+        image = io.BytesIO()
+        Image.new('RGB', (10, 10)).save(image, format='PNG')
+        image.seek(0)
+        with app.app_context():
+            response = self.client.post('/api/profile/image', headers=self.headers,
+                                        data={'image': (image, 'me.png')})
+        self.assertEqual(response.status_code, 200)
+        for url in response.get_json().values():
+            self.addCleanup(os.remove, os.path.join(profile_api.UPLOAD_FOLDER, url.rsplit('/', 1)[1]))
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(self.request('GET', headers=self.headers).headers['ETag'], response.headers['ETag'])
+        self.assertEqual(self.save('PATCH', {'bio': 'two'}, etag).status_code, 412)
+
+    def test_one_profile_per_user(self):
+        db.session.add(Profile(user_id=1))
+        db.session.commit()
+        db.session.add(Profile(user_id=1))
+        with self.assertRaises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+        self.assertEqual(Profile.query.count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'app', 'backend')))
+
+import unittest
+from sqlalchemy import text
+try:
+    from main import create_app, db
+    from config import TestingConfig
+    from api.posts import build_posts_query, build_archive_query
+    from commands.seed import seed_database
+except ImportError:
+    from app.backend.main import create_app, db
+    from app.backend.config import TestingConfig
+    from app.backend.api.posts import build_posts_query, build_archive_query
+    from app.backend.commands.seed import seed_database
+
+app = create_app(TestingConfig)
+
+# Every filter/sort combination list_posts promises to serve from an index.
+# Popularity sorts combined with a category or a non-public visibility are
+# deliberately not covered: they are rare and would need an index each.
+SUPPORTED_SHAPES = [
+    {'sort_by': 'created_at'},
+    {'sort_by': 'created_at', 'sort_order': 'asc'},
+    {'visibility': 'public'},
+    {'visibility': 'private'},
+    {'category': 'engineering'},
+    {'visibility': 'public', 'category': 'engineering'},
+    {'visibility': 'connections', 'category': 'design', 'sort_order': 'asc'},
+    {'sort_by': 'likes_count'},
+    {'sort_by': 'views_count'},
+    {'visibility': 'public', 'sort_by': 'likes_count'},
+    {'visibility': 'public', 'sort_by': 'views_count'},
+    {'sort_by': 'trending'},
+    {'visibility': 'public', 'sort_by': 'trending'},
+    {'visibility': 'public', 'search': 'hiring'},
+    {'visibility': 'public', 'tags': 'python,remote'},
+    {'sort_by': 'id'},
+]
+
+
+def query_plan(query):
+    """EXPLAIN QUERY PLAN detail lines for a query, with its real bound parameters."""
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    params = compiled.construct_params()
+    args = tuple(params[name] for name in compiled.positiontup)
+    rows = db.session.connection().exec_driver_sql(
+        'EXPLAIN QUERY PLAN ' + compiled.string, args).all()
+    return [row[-1] for row in rows]
+
+
+class QueryPlanTestCase(unittest.TestCase):
+    """list_posts query shapes must be answered by an index walk, not a sort."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Realistic statistics matter: without them SQLite never picks the
+        # partial indexes. Production databases get the same via ANALYZE.
+        with app.app_context():
+            seed_database(users=200, posts=3000, jobs=0, messages=0, reset=True)
+            db.session.execute(text('ANALYZE'))
+            db.session.commit()
+
+    @classmethod
+    def tearDownClass(cls):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_supported_shapes_avoid_temp_sort(self):
+        with app.app_context():
+            for shape in SUPPORTED_SHAPES:
+                with self.subTest(shape=shape):
+                    plan = query_plan(build_posts_query(shape).limit(20).offset(100))
+                    self.assertFalse(
+                        any('TEMP B-TREE' in line for line in plan),
+                        f'{shape} needs a sort: {plan}')
+                    if 'visibility' in shape or 'category' in shape:
+                        self.assertNotIn('SCAN posts', plan, f'{shape} scans the whole table: {plan}')
+
+    def test_filtered_created_at_uses_composite_index(self):
+        with app.app_context():
+            plan = query_plan(build_posts_query({'visibility': 'public', 'category': 'engineering'}))
+            self.assertTrue(any('idx_posts_visibility_category_created_at' in line for line in plan), plan)
+
+    def test_archive_listing_walks_created_at_index(self):
+        with app.app_context():
+            for shape in ({}, {'sort_order': 'asc'}, {'visibility': 'public', 'category': 'engineering'}):
+                with self.subTest(shape=shape):
+                    plan = query_plan(build_archive_query(shape).limit(20).offset(100))
+                    self.assertFalse(any('TEMP B-TREE' in line for line in plan), plan)
+                    self.assertTrue(any('idx_posts_archive_created_at' in line for line in plan), plan)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'app', 'backend')))
+
+import unittest
+from sqlalchemy import select
+try:
+    from main import create_app, db
+    from config import TestingConfig
+    from models.user import User
+    from models.profile import Profile, Skill
+    from models.job import Job
+    from models import Post
+    from models.match_vector import MatchVector
+    from models.comment import Comment, add_comment
+    from commands.users import purge_users
+    import matching
+    import people_index
+except ImportError:
+    from app.backend.main import create_app, db
+    from app.backend.config import TestingConfig
+    from app.backend.models.user import User
+    from app.backend.models.profile import Profile, Skill
+    from app.backend.models.job import Job
+    from app.backend.models import Post
+    from app.backend.models.match_vector import MatchVector
+    from app.backend.models.comment import Comment, add_comment
+    from app.backend.commands.users import purge_users
+    from app.backend import matching, people_index
+
+app = create_app(TestingConfig, blueprints=())
+
+
+class PurgeUsersTestCase(unittest.TestCase):
+    """`flask users delete|purge` removes users and everything that refers to them."""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        app.config['MATCH_SYNC_SECONDS'] = 0
+        app.config['PEOPLE_INDEX_SYNC_SECONDS'] = 0
+        for i in (1, 2):
+            db.session.add(User(id=i, username=f'u{i}', email=f'u{i}@e.com', password_hash='!'))
+            db.session.add(Profile(id=i, user_id=i))
+            db.session.add(Skill(profile_id=i, name='python'))
+        db.session.add(Job(id=1, title='Python developer', company='A', location='X', description='apis'))
+        db.session.commit()
+
+    def tearDown(self):
+        app.extensions.pop('match_index', None)
+        app.extensions.pop('people_index', None)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def purge(self, *user_ids):
+        return purge_users(select(User.id).where(User.id.in_(user_ids)), batch_size=10)
+
+    def test_purge_tombstones_match_vectors(self):
+        matching.rebuild_vectors()
+        self.assertEqual([p for p, _ in matching.candidates_for_job(1)], [1, 2])
+        self.purge(1)
+        self.assertEqual(db.session.get(MatchVector, 1).terms, {})
+        # An index loaded before the purge drops the profile on its next sync
+        self.assertEqual([p for p, _ in matching.candidates_for_job(1)], [2])
+
+    def test_purge_tombstones_people_entries(self):
+        people_index.rebuild_people_entries()
+        index = people_index.get_people_index()
+        self.assertEqual([user_id for user_id, _, _ in index.search('u', 10)], [1, 2])
+        self.purge(1)
+        self.assertEqual([user_id for user_id, _, _ in index.search('u', 10)], [2])
+
+    def test_purge_removes_comment_threads_and_repairs_counts(self):
+        theirs = Post(id=10, user_id=2, content='theirs')
+        own = Post(id=11, user_id=1, content='own')
+        db.session.add_all([theirs, own])
+        db.session.flush()
+        top = add_comment(theirs, 2, 'top')
+        reply = add_comment(theirs, 1, 'reply', top)
+        add_comment(theirs, 2, 'reply to the reply', reply)
+        other = add_comment(theirs, 2, 'other')
+        add_comment(own, 2, 'on the purged post')
+        db.session.commit()
+        self.assertEqual(theirs.comments_count, 4)
+
+        self.purge(1)
+        db.session.expire_all()
+        self.assertEqual(sorted(c.id for c in Comment.query), [top.id, other.id])
+        self.assertEqual(db.session.get(Post, 10).comments_count, 2)
+        self.assertEqual(db.session.get(Comment, top.id).reply_count, 0)
+        self.assertIsNone(db.session.get(Post, 11))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,54 +1,294 @@
 import os
-from flask import Flask, request, jsonify, send_from_directory
+import csv
+import io
+import gzip
+import json
+import base64
+import hashlib
+import tempfile
+import threading
+from datetime import datetime
+from flask import (Flask, Request, g, request, jsonify, send_file, send_from_directory,
+                   stream_with_context)
 from flask_cors import CORS
+from sqlalchemy import func, inspect, text, tuple_
+from werkzeug.utils import secure_filename
 from models import db, Submission
 
-UPLOAD_FOLDER = 'uploads'
+# Anchored to this file: send_file resolves relative paths against the app
+# root, not the working directory
+UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
+# Uploads are written here while they stream in, then renamed into place;
+# it must be on the same filesystem as UPLOAD_FOLDER for the rename to be atomic
+UPLOAD_TMP_FOLDER = os.path.join(UPLOAD_FOLDER, 'tmp')
+MAX_UPLOAD_SIZE = 100 * 1024 * 1024
+MAX_CONCURRENT_UPLOADS_PER_CLIENT = 2
+# Responses smaller than this are not worth gzipping
+COMPRESS_MIN_SIZE = 1024
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+EXPORT_BATCH_SIZE = 1000
+
+class HashingTempFile:
+    """Temp file that hashes everything written to it."""
+
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(dir=UPLOAD_TMP_FOLDER)
+        self.file = os.fdopen(fd, 'w+b')
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        # Werkzeug writes each uploaded file into this as it parses the body,
+        # instead of spooling it in memory first
+        stream = HashingTempFile()
+        g.setdefault('upload_temp_files', []).append(stream)
+        return stream
 
 app = Flask(__name__)
+app.request_class = UploadRequest
 CORS(app)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///app.db')
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_SIZE
 db.init_app(app)
 
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+os.makedirs(UPLOAD_TMP_FOLDER, exist_ok=True)
+
+@app.teardown_request
+def remove_upload_temp_files(exc):
+    # Anything not moved into place by the view (rejected or failed upload)
+    for stream in g.pop('upload_temp_files', []):
+        stream.file.close()
+        if os.path.exists(stream.path):
+            os.remove(stream.path)
+
+_upload_slots = {}
+_upload_slots_lock = threading.Lock()
+
+def acquire_upload_slot(client):
+    with _upload_slots_lock:
+        if _upload_slots.get(client, 0) >= MAX_CONCURRENT_UPLOADS_PER_CLIENT:
+            return False
+        _upload_slots[client] = _upload_slots.get(client, 0) + 1
+        return True
+
+def release_upload_slot(client):
+    with _upload_slots_lock:
+        _upload_slots[client] -= 1
+        if not _upload_slots[client]:
+            del _upload_slots[client]
+
+@app.after_request
+def compress(response):
+    if (response.status_code != 200 or response.direct_passthrough
+            or response.mimetype != 'application/json' or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    if request.accept_encodings.quality('gzip') <= 0:
+        return response
+    body = response.get_data()
+    if len(body) >= COMPRESS_MIN_SIZE:
+        response.set_data(gzip.compress(body, mtime=0))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
 
 # Remove @app.before_first_request and create tables before running the app
 # @app.before_first_request
 def create_tables():
     with app.app_context():
         db.create_all()
+        # create_all skips tables that already exist; add the (nullable)
+        # columns and the indexes that were added to the model later
+        table = Submission.__table__
+        existing = {c['name'] for c in inspect(db.engine).get_columns(table.name)}
+        with db.engine.begin() as conn:
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+def store_upload(stream, original_name):
+    """Move a finished upload to uploads/<aa>/<sha256><ext>; returns that path.
+
+    Identical documents share one file, and a name can never overwrite a
+    different document.
+    """
+    stream.file.close()
+    digest = stream.sha256.hexdigest()
+    extension = os.path.splitext(secure_filename(original_name))[1].lower()
+    storage_path = f'{digest[:2]}/{digest}{extension}'
+    destination = os.path.join(UPLOAD_FOLDER, storage_path)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    if os.path.exists(destination):
+        os.remove(stream.path)
+    else:
+        os.replace(stream.path, destination)
+    return storage_path
 
 @app.route('/api/submit', methods=['POST'])
 def submit():
-    name = request.form.get('name')
-    file = request.files.get('document')
-    if not name or not file or not file.filename:
-        return jsonify({'error': 'Name and document required'}), 400
-    filename = file.filename
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(filepath)
-    submission = Submission(name=name, filename=filename)
-    db.session.add(submission)
-    db.session.commit()
-    return jsonify({'message': 'Submitted successfully'})
+    # Checked before the body is read, so a rejected upload costs nothing
+    client = request.remote_addr
+    if not acquire_upload_slot(client):
+        return jsonify({'error': 'Too many uploads in progress'}), 429
+    try:
+        name = request.form.get('name')
+        file = request.files.get('document')
+        if not name or not file or not file.filename:
+            return jsonify({'error': 'Name and document required'}), 400
+        stream = file.stream
+        storage_path = store_upload(stream, file.filename)
+        submission = Submission(name=name, filename=file.filename, storage_path=storage_path,
+                                sha256=stream.sha256.hexdigest(), size=stream.size)
+        db.session.add(submission)
+        db.session.commit()
+    finally:
+        release_upload_slot(client)
+    return jsonify({'message': 'Submitted successfully', 'id': submission.id})
+
+def encode_cursor(submission):
+    raw = f'{submission.timestamp.isoformat()}|{submission.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    timestamp, submission_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(timestamp), int(submission_id)
+
+def filtered_submissions(search):
+    """Submissions newest first, optionally by case-insensitive name prefix."""
+    query = Submission.query
+    if search:
+        escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        query = query.filter(Submission.name.like(f'{escaped}%', escape='\\'))
+    return query.order_by(Submission.timestamp.desc(), Submission.id.desc())
+
+def after_cursor(query, timestamp, submission_id):
+    # Row-value comparison so the (timestamp, id) index can seek to the cursor
+    return query.filter(tuple_(Submission.timestamp, Submission.id) < (timestamp, submission_id))
 
 @app.route('/api/submissions', methods=['GET'])
 def get_submissions():
-    submissions = Submission.query.order_by(Submission.timestamp.desc()).all()
-    return jsonify([
-        {
-            'id': s.id,
-            'name': s.name,
-            'filename': s.filename,
-            'timestamp': s.timestamp.isoformat()
-        } for s in submissions
-    ])
+    """One page of submissions, newest first.
+
+    Query params: limit (max 200), cursor (next_cursor of the previous
+    page) and q (name prefix).
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    search = request.args.get('q', '').strip()
+    query = filtered_submissions(search)
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            query = after_cursor(query, *decode_cursor(cursor))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    # Weak ETag from count and max(id): submissions are only ever added or
+    # removed, so this changes exactly when the list does. Checked before
+    # the page is loaded so a re-poll costs one aggregate query.
+    count, last_id = db.session.query(func.count(Submission.id), func.max(Submission.id)).one()
+    etag = hashlib.blake2b(f'{request.full_path}:{count}:{last_id}'.encode(),
+                           digest_size=12).hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    # One extra row tells whether there is a next page
+    submissions = query.limit(limit + 1).all()
+    has_more = len(submissions) > limit
+    submissions = submissions[:limit]
+    response = jsonify({
+        'submissions': [s.to_dict() for s in submissions],
+        'next_cursor': encode_cursor(submissions[-1]) if has_more else None
+    })
+    response.set_etag(etag, weak=True)
+    return response
+
+EXPORT_FIELDS = ['id', 'name', 'filename', 'timestamp', 'size', 'sha256']
+
+def iter_all_submissions(search):
+    """Every matching submission, fetched in keyset batches."""
+    query = filtered_submissions(search)
+    batch = query.limit(EXPORT_BATCH_SIZE).all()
+    while batch:
+        yield from batch
+        if len(batch) < EXPORT_BATCH_SIZE:
+            break
+        last = batch[-1]
+        # Keep the identity map from growing with the export
+        db.session.expunge_all()
+        batch = after_cursor(query, last.timestamp, last.id).limit(EXPORT_BATCH_SIZE).all()
+
+@app.route('/api/submissions/export', methods=['GET'])
+def export_submissions():
+    """Stream every submission as NDJSON (default) or CSV (?format=csv)."""
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    search = request.args.get('q', '').strip()
+
+    def generate_ndjson():
+        for s in iter_all_submissions(search):
+            yield json.dumps(s.to_dict()) + '\n'
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for s in iter_all_submissions(search):
+            writer.writerow(s.to_dict())
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    if export_format == 'csv':
+        body, mimetype = generate_csv(), 'text/csv'
+    else:
+        body, mimetype = generate_ndjson(), 'application/x-ndjson'
+    response = app.response_class(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=submissions.{export_format}'
+    return response
+
+def send_submission(submission):
+    # conditional=True answers Range and If-None-Match requests
+    if submission.storage_path is None:
+        # Stored under its original name before content-addressed storage
+        return send_from_directory(app.config['UPLOAD_FOLDER'], submission.filename,
+                                   as_attachment=True)
+    return send_file(os.path.join(app.config['UPLOAD_FOLDER'], submission.storage_path),
+                     as_attachment=True, download_name=submission.filename,
+                     conditional=True, etag=submission.sha256)
+
+@app.route('/api/submissions/<int:submission_id>/download', methods=['GET'])
+def download_submission(submission_id):
+    return send_submission(db.get_or_404(Submission, submission_id))
 
 @app.route('/api/download/<filename>', methods=['GET'])
 def download_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename, as_attachment=True)
+    # Old links only carry the name; serve the latest submission with it
+    submission = Submission.query.filter_by(filename=filename).order_by(Submission.id.desc()).first()
+    if submission is None:
+        return send_from_directory(app.config['UPLOAD_FOLDER'], filename, as_attachment=True)
+    return send_submission(submission)
 
 if __name__ == '__main__':
     create_tables()
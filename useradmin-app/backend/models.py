@@ -7,4 +7,27 @@ class Submission(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     filename = db.Column(db.String(256), nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow) 
\ No newline at end of file
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # uploads/<aa>/<sha256><ext>; NULL for files saved under their own name
+    storage_path = db.Column(db.String(128))
+    sha256 = db.Column(db.String(64))
+    size = db.Column(db.Integer)
+
+    __table_args__ = (
+        # Newest-first listing and keyset pagination on (timestamp, id)
+        db.Index('idx_submission_timestamp_id', 'timestamp', 'id'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'filename': self.filename,
+            'timestamp': self.timestamp.isoformat(),
+            'size': self.size,
+            'sha256': self.sha256
+        }
+
+# Case-insensitive prefix search on name: SQLite only uses an index for
+# LIKE 'abc%' when the index has the NOCASE collation
+db.Index('idx_submission_name_nocase', Submission.name.collate('NOCASE'))
@@ -0,0 +1,112 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import io
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+import app as useradmin
+from app import app
+from models import db, Submission
+
+
+class SubmissionsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def add_submissions(self, timestamps):
+        db.session.add_all([Submission(name=f'name{i}', filename=f'f{i}.pdf', timestamp=ts)
+                            for i, ts in enumerate(timestamps)])
+        db.session.commit()
+
+    def test_cursor_pages_cover_every_submission_once(self):
+        now = datetime(2024, 1, 1)
+        # Ties on timestamp are ordered by id
+        self.add_submissions([now, now, now - timedelta(minutes=1), now, now + timedelta(minutes=1)])
+        expected = [s.id for s in Submission.query.order_by(
+            Submission.timestamp.desc(), Submission.id.desc())]
+        seen = []
+        url = '/api/submissions?limit=2'
+        while url:
+            page = self.client.get(url).get_json()
+            seen += [s['id'] for s in page['submissions']]
+            url = page['next_cursor'] and f"/api/submissions?limit=2&cursor={page['next_cursor']}"
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/submissions?cursor=bm90LWEtY3Vyc29y')
+        self.assertEqual(response.status_code, 400)
+
+
+
+class SubmitTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.client = app.test_client()
+        self.folder = tempfile.mkdtemp()
+        tmp_folder = os.path.join(self.folder, 'tmp')
+        os.makedirs(tmp_folder)
+        self.patches = [mock.patch.object(useradmin, 'UPLOAD_FOLDER', self.folder),
+                        mock.patch.object(useradmin, 'UPLOAD_TMP_FOLDER', tmp_folder),
+                        mock.patch.dict(app.config, {'UPLOAD_FOLDER': self.folder})]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.folder)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def submit(self, name, filename, content=b'%PDF-1.4 same document'):
+        return self.client.post('/api/submit', data={
+            'name': name, 'document': (io.BytesIO(content), filename)})
+
+    def test_identical_documents_are_stored_once(self):
+        for name, filename in (('ann', 'cv.pdf'), ('bob', 'resume.PDF')):
+            self.assertEqual(self.submit(name, filename).status_code, 200)
+        first, second = Submission.query.order_by(Submission.id).all()
+        self.assertEqual(first.storage_path, second.storage_path)
+        self.assertEqual(second.filename, 'resume.PDF')
+        stored = [os.path.join(root, f) for root, _, files in os.walk(self.folder) for f in files]
+        self.assertEqual(stored, [os.path.join(self.folder, first.storage_path)])
+        response = self.client.get(f'/api/submissions/{second.id}/download')
+        self.assertEqual(response.data, b'%PDF-1.4 same document')
+        self.assertIn('resume.PDF', response.headers['Content-Disposition'])
+        response.close()
+
+    def test_concurrent_uploads_per_client_are_capped(self):
+        for _ in range(useradmin.MAX_CONCURRENT_UPLOADS_PER_CLIENT):
+            self.assertTrue(useradmin.acquire_upload_slot('127.0.0.1'))
+        try:
+            self.assertEqual(self.submit('ann', 'cv.pdf').status_code, 429)
+            self.assertEqual(self.client.post('/api/submit', data={'name': 'ann'},
+                                              environ_base={'REMOTE_ADDR': '10.0.0.2'}
+                                              ).status_code, 400)
+        finally:
+            for _ in range(useradmin.MAX_CONCURRENT_UPLOADS_PER_CLIENT):
+                useradmin.release_upload_slot('127.0.0.1')
+        self.assertEqual(self.submit('ann', 'cv.pdf').status_code, 200)
+        self.assertEqual(useradmin._upload_slots, {})
+        self.assertEqual(os.listdir(os.path.join(self.folder, 'tmp')), [])
+
+if __name__ == '__main__':
+    unittest.main()
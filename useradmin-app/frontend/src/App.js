@@ -40,15 +40,29 @@ function UserDashboard() {
 
 function AdminDashboard() {
   const [submissions, setSubmissions] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [search, setSearch] = useState('');
+
+  const loadPage = (cursor, query) => {
+    const params = { q: query };
+    if (cursor) params.cursor = cursor;
+    axios.get('http://localhost:5000/api/submissions', { params })
+      .then(res => {
+        setSubmissions(prev => cursor ? [...prev, ...res.data.submissions] : res.data.submissions);
+        setNextCursor(res.data.next_cursor);
+      });
+  };
 
   useEffect(() => {
-    axios.get('http://localhost:5000/api/submissions')
-      .then(res => setSubmissions(res.data));
-  }, []);
+    loadPage(null, search);
+  }, [search]);
 
   return (
     <div>
       <h2>Admin Dashboard</h2>
+      <input type="text" placeholder="Search by name" value={search}
+        onChange={e => setSearch(e.target.value)} />
+      <a href={`http://localhost:5000/api/submissions/export?format=csv&q=${encodeURIComponent(search)}`}>Export CSV</a>
       <table>
         <thead>
           <tr>
@@ -62,7 +76,7 @@ function AdminDashboard() {
             <tr key={s.id}>
               <td>{s.name}</td>
               <td>
-                <a href={`http://localhost:5000/api/download/${s.filename}`} target="_blank" rel="noopener noreferrer">
+                <a href={`http://localhost:5000/api/submissions/${s.id}/download`} target="_blank" rel="noopener noreferrer">
                   {s.filename}
                 </a>
               </td>
@@ -71,6 +85,7 @@ function AdminDashboard() {
           ))}
         </tbody>
       </table>
+      {nextCursor && <button onClick={() => loadPage(nextCursor, search)}>Load more</button>}
     </div>
   );
 }